@@ -1,22 +1,38 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 
-db = SQLAlchemy()
+from app.utils.read_replica import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
     app.config.from_object('config.Config')
+    if test_config:
+        app.config.update(test_config)
     
     # Enable CORS
-    CORS(app, resources={r"/*": {"origins": "*"}})
+    CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=['X-Next-Cursor', 'Idempotent-Replayed'])
     
+    from app.utils import database, metrics, slow_queries
+
+    database.init_app(app)
     db.init_app(app)
+    database.install(app)
+    metrics.init_app(app)
+    slow_queries.init_app(app)
     jwt.init_app(app)
 
     from app.routes.routes import api_bp
     app.register_blueprint(api_bp)
 
+    from app.utils.hashing import HasherBusy
+
+    @app.errorhandler(HasherBusy)
+    def hasher_busy(_):
+        return jsonify({"msg": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+
     return app
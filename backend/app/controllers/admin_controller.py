@@ -1,13 +1,30 @@
-from flask import request, jsonify
+from flask import current_app, request, jsonify, url_for
+from sqlalchemy import select
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from app.model.models import User
 from app import db
 from app.utils.decorators import role_required
+from app.utils.read_replica import replica_reads
+from app.utils.query_budget import query_budget
 from app.model.transactionmodel import Transaction
 from app.model.kyc_request_model import KYCUpdateRequest
 from app.model.adminmodel import Admin
-
-
+from app.utils.money import from_paise
+from app.utils.principals import invalidate_principal, principal_claims
+from app.utils.hashing import rehash_if_needed
+from app.utils import importer
+from app.utils import checkpoints
+from app.utils import dashboard_stats
+from app.utils import ledger
+from app.utils import pagination
+from app.utils import transaction_history
+from app.utils import review_queue
+from app.utils import review_actions
+from app.utils import metrics as request_metrics
+from app.utils.kyc_store import DOCUMENTS as KYC_DOCUMENTS
+
+
+@query_budget(3)
 def admin_login():
     data = request.get_json()
     if not data or 'username' not in data or 'password' not in data:
@@ -15,7 +32,12 @@ def admin_login():
 
     admin = Admin.query.filter_by(username=data['username']).first()  # ✅ Use Admin model
     if admin and admin.check_password(data['password']):
-        token = create_access_token(identity=str(admin.id))
+        if rehash_if_needed(admin, data['password']):
+            db.session.commit()
+        token = create_access_token(
+            identity=str(admin.id),
+            additional_claims=principal_claims('admin', 'admin')
+        )
         return jsonify(access_token=token), 200
 
     return jsonify({"msg": "Invalid credentials"}), 401
@@ -23,67 +45,66 @@ def admin_login():
 
 
 
+@query_budget(3)
 @jwt_required()
 @role_required('admin')
+@replica_reads
 def list_kyc_requests():
-    requests = KYCUpdateRequest.query.filter_by(status='pending').all()
-    return jsonify([
-        {
-            "id": r.id,
-            "user_id": r.user_id,
-            "account_number": r.user.account_number if r.user else None,
-            "pancard_image": r.pancard_image,
-            "photo_image": r.photo_image,
-            "signature_image": r.signature_image,
-            "timestamp": r.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        } for r in requests
-    ]), 200
-
-
+    # ?status=pending|approved|rejected&from=&to=&limit=&cursor=
+    return review_queue.queue_response(KYCUpdateRequest, _kyc_request_json)
+
+
+def _kyc_request_json(r, account_number):
+    return {
+        "id": r.id,
+        "user_id": r.user_id,
+        "account_number": account_number,
+        "status": r.status,
+        **_kyc_document_urls(r),
+        "timestamp": r.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+def _kyc_document_urls(kyc_request):
+    # Links to the authenticated document endpoint instead of server paths;
+    # review screens should load the preview/thumb variants
+    urls = {}
+    for document in KYC_DOCUMENTS:
+        url = url_for('api.get_kyc_document', request_id=kyc_request.id, document=document)
+        urls[f"{document}_image"] = url
+        urls[f"{document}_preview"] = f"{url}?variant=preview"
+        urls[f"{document}_thumb"] = f"{url}?variant=thumb"
+        urls[f"{document}_size"] = getattr(kyc_request, f"{document}_size")
+    return urls
+
+
+@query_budget(5)
 @jwt_required()
 @role_required('admin')
 def process_kyc_request(request_id):
-    data = request.get_json()
+    data = request.get_json() or {}
     action = data.get('action')  # 'approve' or 'reject'
-
-    req = KYCUpdateRequest.query.get(request_id)
-    if not req or req.status != 'pending':
-        return jsonify({"msg": "Request not found or already processed"}), 404
-
-    if action == 'approve':
-        req.status = 'approved'
-        # Optionally update user's verified status or store approved KYC files
-    elif action == 'reject':
-        req.status = 'rejected'
-    else:
+    if action not in review_actions.ACTIONS:
         return jsonify({"msg": "Invalid action"}), 400
 
-    db.session.commit()
+    [result] = review_actions.process_kyc_requests([request_id], action)
+    if result['status'] == 'error':
+        return jsonify({"msg": result['msg']}), 404
     return jsonify({"msg": f"KYC request {action}ed successfully"}), 200
 
 
-
+@query_budget(5)
 @jwt_required()
 @role_required('admin')
-def list_users():
-    users = User.query.filter_by(role='user').all()
-    return jsonify([
-        {
-            "id": u.id,
-            "name": u.name,
-            "email": u.email,
-            "phone": u.phone,
-            "gender": u.gender,
-            "dob": u.dob,
-            "adhaar": u.adhaar,
-            "pan": u.pan,
-            "account_type": u.account_type,
-            "initial_balance": u.initial_balance,
-            "type_of_account": u.type_of_account
-        } for u in users
-    ]), 200
+def process_kyc_requests_bulk():
+    ids, action, error = review_actions.parse_batch(request.get_json(silent=True))
+    if error:
+        return jsonify({"msg": error}), 400
+    return jsonify(review_actions.summary(review_actions.process_kyc_requests(ids, action))), 200
+
 
 
+@query_budget(9)
 @jwt_required()
 @role_required('admin')
 def update_user(user_id):
@@ -92,6 +113,8 @@ def update_user(user_id):
     if not user or user.role != 'user':
         return jsonify({"msg": "User not found"}), 404
 
+    before = dashboard_stats.snapshot(user)
+    balance_before = user.balance_paise
     user.name = data.get('name', user.name)
     user.email = data.get('email', user.email)
     user.phone = data.get('phone', user.phone)
@@ -103,10 +126,17 @@ def update_user(user_id):
     user.initial_balance = data.get('initial_balance', user.initial_balance)
     user.type_of_account = data.get('type_of_account', user.type_of_account)
 
+    dashboard_stats.apply(dashboard_stats.diff(before, dashboard_stats.snapshot(user)), shard_key=user.id)
+    if user.balance_paise != balance_before:
+        # Edits to the balance are posted like any other movement
+        ledger.adjust(user.id, user.balance_paise - balance_before)
+        checkpoints.record([user.id])
     db.session.commit()
+    invalidate_principal('user', user.account_number)
     return jsonify({"msg": "User updated successfully"}), 200
 
 
+@query_budget(11)
 @jwt_required()
 @role_required('admin')
 def delete_user(user_id):
@@ -114,31 +144,54 @@ def delete_user(user_id):
     if not user or user.role != 'user':
         return jsonify({"msg": "User not found"}), 404
 
-    db.session.delete(user)
+    account_number = user.account_number
+    dashboard_stats.apply(dashboard_stats.negate(dashboard_stats.snapshot(user)), shard_key=user.id)
+    if db.session.execute(select(Transaction.id).where(Transaction.user_id == user.id).limit(1)).first():
+        # Ledger entries are never modified or removed, so an account that
+        # has any is closed instead: the balance is paid out by a closing
+        # entry and the row stays with a role that can neither sign in nor
+        # receive money
+        if user.balance_paise:
+            ledger.adjust(user.id, -user.balance_paise, ledger.CLOSING)
+            user.balance_paise = 0
+            checkpoints.record([user.id])
+        user.role = 'closed'
+    else:
+        db.session.delete(user)
     db.session.commit()
+    invalidate_principal('user', account_number)
     return jsonify({"msg": "User deleted successfully"}), 200
 
 
+@query_budget(3)  # counters, again on the primary if the replica lags, admin check
 @jwt_required()
 @role_required('admin')
+@replica_reads
 def dashboard():
-    total_users = User.query.filter_by(role='user').count()
-    total_balance = db.session.query(db.func.sum(User.initial_balance)).scalar() or 0.0
-    male_users = User.query.filter_by(gender='Male', role='user').count()
-    female_users = User.query.filter_by(gender='Female', role='user').count()
-    savings_accounts = User.query.filter_by(account_type='savings', role='user').count()
-    current_accounts = User.query.filter_by(account_type='current', role='user').count()
+    stats, updated_at = dashboard_stats.read()
 
     return jsonify({
-        "total_users": total_users,
-        "total_balance": total_balance,
-        "male_users": male_users,
-        "female_users": female_users,
-        "savings_accounts": savings_accounts,
-        "current_accounts": current_accounts
+        "total_users": stats['total_users'],
+        "total_balance": from_paise(stats['total_balance_paise']),
+        "male_users": stats['male_users'],
+        "female_users": stats['female_users'],
+        "savings_accounts": stats['savings_accounts'],
+        "current_accounts": stats['current_accounts'],
+        "stats_updated_at": updated_at.strftime("%Y-%m-%d %H:%M:%S") if updated_at else None
     }), 200
 
 
+@query_budget(1)
+@jwt_required()
+@role_required('admin')
+def metrics():
+    registry = request_metrics.get_metrics()
+    if registry is None:
+        return jsonify({"msg": "Metrics are disabled"}), 404
+    return current_app.response_class(registry.render(), content_type=request_metrics.CONTENT_TYPE)
+
+
+@query_budget(13)
 @jwt_required()
 @role_required('admin')
 def create_user():
@@ -179,94 +232,142 @@ def create_user():
     )
     user.set_password(data['password'])
     db.session.add(user)
+    db.session.flush()
+    ledger.open_accounts([(user.id, user.balance_paise)])
+    dashboard_stats.apply(dashboard_stats.snapshot(user), shard_key=user.id)
     db.session.commit()
 
     return jsonify({"msg": "User created successfully"}), 201
 
 
+@query_budget(16)
 @jwt_required()
 @role_required('admin')
-def list_update_requests():
-    from app.model.update_request_model import UserUpdateRequest
+def import_users():
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+        fmt = request.form.get('format') or importer.detect_format(upload.filename, upload.mimetype)
+    elif request.content_type and request.content_type.split(';')[0] in ('text/csv', 'application/x-ndjson'):
+        stream = request.stream
+        fmt = request.args.get('format') or importer.detect_format(None, request.content_type)
+    else:
+        return jsonify({"msg": "Upload a CSV or NDJSON file"}), 400
 
-    requests = UserUpdateRequest.query.filter_by(status='pending').all()
-    return jsonify([
-        {
-            "id": r.id,
-            "user_id": r.user_id,
-            "field": r.field,
-            "old_value": r.old_value,
-            "new_value": r.new_value,
-            "timestamp": r.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        } for r in requests
-    ]), 200
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"msg": "Format must be csv or ndjson"}), 400
 
+    chunk_size = request.args.get('chunk_size', importer.DEFAULT_CHUNK_SIZE, type=int)
+    report = importer.import_customers(importer.iter_rows(stream, fmt), chunk_size=max(1, min(chunk_size, 5000)))
+    return jsonify(report), 200
 
+
+@query_budget(3)
 @jwt_required()
 @role_required('admin')
-def process_update_request(request_id):
+@replica_reads
+def list_update_requests():
     from app.model.update_request_model import UserUpdateRequest
 
-    data = request.get_json()
-    action = data.get('action')  # 'approve' or 'reject'
+    return review_queue.queue_response(UserUpdateRequest, _update_request_json)
 
-    req = UserUpdateRequest.query.get(request_id)
-    if not req or req.status != 'pending':
-        return jsonify({"msg": "Request not found or already processed"}), 404
 
-    if action == 'approve':
-        user = User.query.get(req.user_id)
-        setattr(user, req.field, req.new_value)
-        req.status = 'approved'
-    elif action == 'reject':
-        req.status = 'rejected'
-    else:
-        return jsonify({"msg": "Invalid action"}), 400
+def _update_request_json(r, account_number):
+    return {
+        "id": r.id,
+        "user_id": r.user_id,
+        "account_number": account_number,
+        "field": r.field,
+        "old_value": r.old_value,
+        "new_value": r.new_value,
+        "status": r.status,
+        "timestamp": r.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+    }
 
-    db.session.commit()
-    return jsonify({"msg": f"Request {action}ed successfully"}), 200
 
+@query_budget(5)
+@jwt_required()
+@role_required('admin')
+def process_update_request(request_id):
+    data = request.get_json() or {}
+    action = data.get('action')  # 'approve' or 'reject'
+    if action not in review_actions.ACTIONS:
+        return jsonify({"msg": "Invalid action"}), 400
 
+    [result] = review_actions.process_update_requests([request_id], action)
+    if result['status'] == 'error':
+        status = 404 if result['msg'] == review_actions.NOT_FOUND else 400
+        return jsonify({"msg": result['msg']}), status
+    return jsonify({"msg": f"Request {action}ed successfully"}), 200
 
 
+@query_budget(8)
 @jwt_required()
 @role_required('admin')
+def process_update_requests_bulk():
+    ids, action, error = review_actions.parse_batch(request.get_json(silent=True))
+    if error:
+        return jsonify({"msg": error}), 400
+    return jsonify(review_actions.summary(review_actions.process_update_requests(ids, action))), 200
+
+
+USER_LIST_COLUMNS = (
+    User.id, User.name, User.email, User.phone, User.gender, User.dob, User.adhaar,
+    User.pan, User.account_number, User.account_type, User.balance_paise, User.type_of_account
+)
+
+
+def _user_list_json(u):
+    return {
+        "id": u.id,
+        "name": u.name,
+        "email": u.email,
+        "phone": u.phone,
+        "gender": u.gender,
+        "dob": u.dob,
+        "adhaar": u.adhaar,
+        "pan": u.pan,
+        "account_number": u.account_number,
+        "account_type": u.account_type,
+        "initial_balance": from_paise(u.balance_paise),
+        "type_of_account": u.type_of_account
+    }
+
+
+@query_budget(3)
+@jwt_required()
+@role_required('admin')
+@replica_reads
 def list_users():
-    users = User.query.filter_by(role='user').all()
-    return jsonify([
-        {
-            "id": u.id,
-            "name": u.name,
-            "email": u.email,
-            "phone": u.phone,
-            "gender": u.gender,
-            "dob": u.dob,
-            "adhaar": u.adhaar,
-            "pan": u.pan,
-            "account_number": u.account_number,
-            "account_type": u.account_type,
-            "initial_balance": u.initial_balance,
-            "type_of_account": u.type_of_account
-        } for u in users
-    ]), 200
+    query = select(*USER_LIST_COLUMNS).where(User.role == 'user').order_by(User.id)
+
+    # Full export: rows are streamed from a server-side cursor
+    if request.args.get('format') == 'ndjson':
+        rows = db.session.execute(query.execution_options(yield_per=1000))
+        return pagination.ndjson_response(rows, _user_list_json, filename='users.ndjson')
+
+    try:
+        cursor, limit = pagination.page_args()
+    except pagination.InvalidCursor:
+        return jsonify({"msg": "Invalid cursor"}), 400
+    if cursor and not isinstance(cursor[0], int):
+        return jsonify({"msg": "Invalid cursor"}), 400
+
+    if cursor:
+        query = query.where(User.id > cursor[0])
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    return pagination.page_response(rows, limit, _user_list_json, lambda u: [u.id])
 
 
 
+@query_budget(3)
 @jwt_required()
 @role_required('admin')
+@replica_reads
 def get_user_transactions(user_id):
     user = User.query.get(user_id)
     if not user or user.role != 'user':
         return jsonify({"msg": "User not found"}), 404
 
-    transactions = user.transactions.order_by(Transaction.timestamp.desc()).limit(10).all()
-
-    return jsonify([
-        {
-            "id": txn.id,
-            "amount": txn.amount,
-            "type": txn.type,
-            "description": txn.description,
-            "timestamp": txn.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        } for txn in transactions
-    ]), 200
+    # Defaults to the latest 10, as before; older pages via X-Next-Cursor
+    return transaction_history.history_response(user.id, default_limit=10)
@@ -1,14 +1,32 @@
-from flask import request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+import hashlib
+import os
+
+from flask import current_app, request, jsonify, send_file
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity
+from sqlalchemy import insert, select
+from werkzeug.http import is_resource_modified
 from app.model.models import User
-from app.model.transactionmodel import Transaction
 from app.model.update_request_model import UserUpdateRequest
 from app.model.kyc_request_model import KYCUpdateRequest
-import os
-from werkzeug.utils import secure_filename
-from flask import current_app
 from app import db
+from app.utils import transfers
+from app.utils.transfers import InsufficientFunds
+from app.utils.money import from_paise, parse_amount
+from app.utils.principals import principal_claims, resolve_role
+from app.utils.hashing import rehash_if_needed
+from app.utils import dashboard_stats
+from app.utils import transaction_history
+from app.utils import checkpoints
+from app.utils import ledger
+from app.utils import limits
+from app.model.transactionmodel import Transaction
+from app.utils.idempotency import idempotent
+from app.utils.query_budget import query_budget
+from app.utils.kyc_store import DOCUMENTS as KYC_DOCUMENTS, UploadRejected, get_kyc_store
+from app.utils.kyc_derivatives import VARIANTS, get_derivative_pipeline
+from datetime import datetime, time, timedelta
 
+@query_budget(12)
 def register():
     data = request.get_json()
 
@@ -46,73 +64,107 @@ def register():
     )
     user.set_password(data['password'])
     db.session.add(user)
+    db.session.flush()
+    ledger.open_accounts([(user.id, user.balance_paise)])
+    dashboard_stats.apply(dashboard_stats.snapshot(user), shard_key=user.id)
     db.session.commit()
 
     return jsonify({"msg": "Account created successfully"}), 201
 
+@query_budget(3)
 def login():
     data = request.get_json()
 
     if not data or 'phone' not in data or 'password' not in data:
         return jsonify({"msg": "Phone and password are required"}), 400
 
-    user = User.query.filter_by(phone=data['phone']).first()
+    user = User.query.filter_by(phone=data['phone'], role='user').first()
 
     if user and user.check_password(data['password']):
-        token = create_access_token(identity=str(user.account_number))
+        if rehash_if_needed(user, data['password']):
+            db.session.commit()
+        token = create_access_token(
+            identity=str(user.account_number),
+            additional_claims=principal_claims('user', user.role)
+        )
         return jsonify(access_token=token), 200
 
     return jsonify({"msg": "Invalid phone number or password"}), 401
 
-@jwt_required()
-def get_profile():
-    account_number = get_jwt_identity()
-    user = User.query.filter_by(account_number=account_number).first()
+PROFILE_COLUMNS = (
+    User.id, User.name, User.email, User.phone, User.gender, User.dob, User.adhaar,
+    User.account_number, User.pan, User.account_type, User.balance_paise,
+    User.type_of_account, User.role, User.updated_at
+)
 
-    if not user:
-        return jsonify({"msg": "User not found"}), 404
 
-    has_pending_update = UserUpdateRequest.query.filter_by(
-        user_id=user.id,
-        status='pending'
-    ).first() is not None
+def _profile_query(account_number):
+    # Profile plus request status in one statement; both subqueries are
+    # index probes on (user_id, ...)
+    has_pending_update = (
+        select(UserUpdateRequest.id)
+        .where(UserUpdateRequest.user_id == User.id, UserUpdateRequest.status == 'pending')
+        .exists()
+    )
+    kyc_status = (
+        select(KYCUpdateRequest.status)
+        .where(KYCUpdateRequest.user_id == User.id)
+        .order_by(KYCUpdateRequest.timestamp.desc(), KYCUpdateRequest.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return select(
+        *PROFILE_COLUMNS,
+        has_pending_update.label('has_pending_update'),
+        kyc_status.label('kyc_status')
+    ).where(User.account_number == account_number, User.role == 'user')
 
-    kyc_request = KYCUpdateRequest.query.filter_by(user_id=user.id).order_by(
-        KYCUpdateRequest.timestamp.desc()
-    ).first()
-    
-    kyc_status = 'not_submitted'  # Default status
-    if kyc_request:
-        if kyc_request.status == 'pending':
-            kyc_status = 'pending'
-        elif kyc_request.status == 'approved':
-            kyc_status = 'approved'
-        elif kyc_request.status == 'rejected':
-            kyc_status = 'rejected'
 
-    return jsonify({
-        "id": user.id,
-        "name": user.name,
-        "email": user.email,
-        "phone": user.phone,
-        "gender": user.gender,
-        "dob": user.dob,
-        "adhaar": user.adhaar,
-        "account_number": user.account_number,
-        "pan": user.pan,
-        "account_type": user.account_type,
-        "initial_balance": user.initial_balance,
-        "type_of_account": user.type_of_account,
-        "role": user.role,
-        "has_pending_update_request": has_pending_update,
-        "kyc_status": kyc_status
-    }), 200
+@query_budget(2)
+@jwt_required()
+def get_profile():
+    account_number = get_jwt_identity()
+    row = db.session.execute(_profile_query(account_number)).first()
 
+    if not row:
+        return jsonify({"msg": "User not found"}), 404
 
+    # The ETag covers every value in the row, so it changes even when two
+    # updates land within updated_at's one-second resolution
+    etag = hashlib.sha1(repr(tuple(row)).encode()).hexdigest()
+    if not is_resource_modified(request.environ, etag=etag, last_modified=row.updated_at):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify({
+            "id": row.id,
+            "name": row.name,
+            "email": row.email,
+            "phone": row.phone,
+            "gender": row.gender,
+            "dob": row.dob,
+            "adhaar": row.adhaar,
+            "account_number": row.account_number,
+            "pan": row.pan,
+            "account_type": row.account_type,
+            "initial_balance": from_paise(row.balance_paise),
+            "type_of_account": row.type_of_account,
+            "role": row.role,
+            "has_pending_update_request": bool(row.has_pending_update),
+            "kyc_status": row.kyc_status or 'not_submitted'
+        })
+
+    response.set_etag(etag)
+    response.last_modified = row.updated_at
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # always revalidate; the browser turns 304s into cached 200s
+    return response
+
+
+@query_budget(5)
 @jwt_required()
 def request_kyc_update():
     account_number = get_jwt_identity()
-    user = User.query.filter_by(account_number=account_number).first()
+    user = User.query.filter_by(account_number=account_number, role='user').first()
 
     existing_kyc = KYCUpdateRequest.query.filter_by(user_id=user.id).filter(
         KYCUpdateRequest.status.in_(['pending', 'approved'])
@@ -128,151 +180,317 @@ def request_kyc_update():
                 "msg": "Your KYC has already been approved. No further updates needed."
             }), 400
 
-    pancard = request.files.get('pancard')
-    photo = request.files.get('photo')
-    signature = request.files.get('signature')
-
-    if not pancard or not photo or not signature:
-        return jsonify({"msg": "All three files are required"}), 400
-
-    upload_folder = os.path.join(current_app.root_path, 'uploads', 'kyc')
-    os.makedirs(upload_folder, exist_ok=True)
-
-    pancard_path = os.path.join(upload_folder, secure_filename(pancard.filename))
-    photo_path = os.path.join(upload_folder, secure_filename(photo.filename))
-    signature_path = os.path.join(upload_folder, secure_filename(signature.filename))
-
-    pancard.save(pancard_path)
-    photo.save(photo_path)
-    signature.save(signature_path)
+    # Files are streamed, hashed and size/type-checked while the body is read
+    try:
+        docs = get_kyc_store().receive(request.environ, KYC_DOCUMENTS)
+    except UploadRejected as e:
+        return jsonify({"msg": e.msg}), e.status
 
     kyc_request = KYCUpdateRequest(
         user_id=user.id,
-        pancard_image=pancard_path,
-        photo_image=photo_path,
-        signature_image=signature_path
+        pancard_image=docs['pancard'].path,
+        pancard_sha256=docs['pancard'].sha256,
+        pancard_size=docs['pancard'].size,
+        photo_image=docs['photo'].path,
+        photo_sha256=docs['photo'].sha256,
+        photo_size=docs['photo'].size,
+        signature_image=docs['signature'].path,
+        signature_sha256=docs['signature'].sha256,
+        signature_size=docs['signature'].size
     )
     db.session.add(kyc_request)
+    User.touch(user.id)
     db.session.commit()
+    get_derivative_pipeline().submit(docs.values())
 
     return jsonify({"msg": "KYC update request submitted"}), 200
 
 
+@query_budget(2)
 @jwt_required()
+def get_kyc_document(request_id, document):
+    variant = request.args.get('variant', 'original')
+    if document not in KYC_DOCUMENTS:
+        return jsonify({"msg": "Unknown document"}), 404
+    if variant != 'original' and variant not in VARIANTS:
+        return jsonify({"msg": "Invalid variant"}), 400
+
+    kyc_request = db.session.get(KYCUpdateRequest, request_id)
+    if not kyc_request:
+        return jsonify({"msg": "KYC request not found"}), 404
+    identity = get_jwt_identity()
+    if resolve_role(identity, get_jwt()) != 'admin':
+        if not kyc_request.user or kyc_request.user.account_number != identity:
+            return jsonify({"msg": "Access denied"}), 403
+
+    path, etag, exact = get_kyc_store().locate(
+        getattr(kyc_request, f'{document}_image'),
+        getattr(kyc_request, f'{document}_sha256'),
+        variant
+    )
+    if not os.path.isfile(path):
+        return jsonify({"msg": "Document not found"}), 404
+
+    # conditional=True answers If-None-Match with 304 and Range with 206;
+    # the file body goes out through wsgi.file_wrapper (sendfile) when the
+    # server offers it. A fallback for a derivative still being built must
+    # not be cached under the derivative's URL.
+    response = send_file(
+        path,
+        conditional=True,
+        etag=etag or True,
+        max_age=current_app.config.get('KYC_DOCUMENT_MAX_AGE', 86400) if exact else 0
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if not exact:
+        response.cache_control.no_cache = True
+    return response
+
+
+@query_budget(11)
+@jwt_required()
+@idempotent
 def deposit():
     data = request.get_json()
     amount = data.get('amount')
+    amount_paise = parse_amount(amount)
 
-    if not amount or amount <= 0:
+    if not amount_paise:
         return jsonify({"msg": "Invalid deposit amount"}), 400
 
     account_number = get_jwt_identity()
-    user = User.query.filter_by(account_number=account_number).first()
-    user.initial_balance += amount
-    transaction = Transaction(
-        user_id=user.id,
-        amount=amount,
-        type='credit',
-        description='Deposit'
-    )
-    db.session.add(transaction)
-    db.session.commit()
+    user = User.query.filter_by(account_number=account_number, role='user').first()
+    new_balance = transfers.deposit(user, amount_paise)
 
-    return jsonify({"msg": f"Deposited ₹{amount} successfully", "new_balance": user.initial_balance}), 200
+    return jsonify({"msg": f"Deposited ₹{from_paise(amount_paise):,.2f} successfully", "new_balance": from_paise(new_balance)}), 200
 
+@query_budget(12)
 @jwt_required()
+@idempotent
 def withdraw():
     data = request.get_json()
     amount = data.get('amount')
+    amount_paise = parse_amount(amount)
 
-    if not amount or amount <= 0:
+    if not amount_paise:
         return jsonify({"msg": "Invalid withdrawal amount"}), 400
 
     account_number = get_jwt_identity()
-    user = User.query.filter_by(account_number=account_number).first()
+    user = User.query.filter_by(account_number=account_number, role='user').first()
+
+    refusal = limits.reserve_debit(user, amount_paise)
+    if refusal:
+        return jsonify({"msg": refusal.msg}), refusal.status, refusal.headers()
 
-    if user.initial_balance < amount:
+    try:
+        new_balance = transfers.withdraw(user, amount_paise)
+    except InsufficientFunds:
+        limits.release_debit(user, amount_paise)
         return jsonify({"msg": "Insufficient funds"}), 400
 
-    user.initial_balance -= amount
-    transaction = Transaction(
-        user_id=user.id,
-        amount=amount,
-        type='debit',
-        description='Withdrawal'
-    )
-    db.session.add(transaction)
-    db.session.commit()
+    return jsonify({"msg": f"Withdrew ₹{from_paise(amount_paise):,.2f} successfully", "new_balance": from_paise(new_balance)}), 200
+
+
+MAX_BATCH_PAYMENTS = 500
+
+
+def _transfer_request_error(amount, recipient_account):
+    if not parse_amount(amount):
+        return "Invalid transfer amount"
+    if not recipient_account:
+        return "Recipient account number is required"
+    if isinstance(recipient_account, bool) or not isinstance(recipient_account, (str, int)):
+        return "Invalid recipient account number"
+    return None
+
 
-    return jsonify({"msg": f"Withdrew ₹{amount} successfully", "new_balance": user.initial_balance}), 200
+def _transfer_recipient_error(sender, recipient):
+    if not recipient:
+        return "Recipient account not found", 404
+    if sender.account_number == recipient.account_number:
+        return "Cannot transfer to your own account", 400
+    return None
 
 
+@query_budget(13)
 @jwt_required()
+@idempotent
 def transfer():
     data = request.get_json()
     amount = data.get('amount')
     recipient_account = data.get('recipient_account')
 
     # Validation
-    if not amount or amount <= 0:
-        return jsonify({"msg": "Invalid transfer amount"}), 400
-    
-    if not recipient_account:
-        return jsonify({"msg": "Recipient account number is required"}), 400
+    error = _transfer_request_error(amount, recipient_account)
+    if error:
+        return jsonify({"msg": error}), 400
 
     # Get sender
     sender_account_number = get_jwt_identity()
-    sender = User.query.filter_by(account_number=sender_account_number).first()
+    sender = User.query.filter_by(account_number=sender_account_number, role='user').first()
+
+    amount_paise = parse_amount(amount)
 
     # Check if sender has sufficient balance
-    if sender.initial_balance < amount:
+    if sender.balance_paise < amount_paise:
         return jsonify({"msg": "Insufficient funds"}), 400
 
     # Find recipient
-    recipient = User.query.filter_by(account_number=recipient_account).first()
-    
-    if not recipient:
-        return jsonify({"msg": "Recipient account not found"}), 404
-    
-    # Prevent self-transfer
-    if sender.account_number == recipient.account_number:
-        return jsonify({"msg": "Cannot transfer to your own account"}), 400
-
-    # Perform transfer
-    sender.initial_balance -= amount
-    recipient.initial_balance += amount
-
-    # Record sender transaction (debit)
-    sender_transaction = Transaction(
-        user_id=sender.id,
-        amount=amount,
-        type='debit',
-        description=f'Transfer to {recipient.account_number}'
-    )
-    
-    # Record recipient transaction (credit)
-    recipient_transaction = Transaction(
-        user_id=recipient.id,
-        amount=amount,
-        type='credit',
-        description=f'Transfer from {sender.account_number}'
-    )
+    recipient = User.query.filter_by(account_number=recipient_account, role='user').first()
+
+    error = _transfer_recipient_error(sender, recipient)
+    if error:
+        msg, status = error
+        return jsonify({"msg": msg}), status
+
+    refusal = limits.reserve_debit(sender, amount_paise)
+    if refusal:
+        return jsonify({"msg": refusal.msg}), refusal.status, refusal.headers()
+
+    # Perform transfer; the balance check is repeated atomically by the
+    # conditional UPDATE in case a concurrent debit got there first
+    try:
+        new_balance = transfers.transfer(sender, recipient, amount_paise)
+    except InsufficientFunds:
+        limits.release_debit(sender, amount_paise)
+        return jsonify({"msg": "Insufficient funds"}), 400
 
-    db.session.add(sender_transaction)
-    db.session.add(recipient_transaction)
-    db.session.commit()
+    return jsonify({
+        "msg": f"Transferred ₹{from_paise(amount_paise):,.2f} to account {recipient_account} successfully",
+        "new_balance": from_paise(new_balance)
+    }), 200
+
+
+@query_budget(13)
+@jwt_required()
+@idempotent
+def transfer_batch():
+    data = request.get_json() or {}
+    payments = data.get('payments')
+
+    if not isinstance(payments, list) or not payments:
+        return jsonify({"msg": "A non-empty list of payments is required"}), 400
+    if len(payments) > MAX_BATCH_PAYMENTS:
+        return jsonify({"msg": f"At most {MAX_BATCH_PAYMENTS} payments per batch"}), 400
+
+    sender_account_number = get_jwt_identity()
+    sender = User.query.filter_by(account_number=sender_account_number, role='user').first()
+
+    results = []
+    for item in payments:
+        item = item if isinstance(item, dict) else {}
+        results.append({
+            "recipient_account": item.get('recipient_account'),
+            "amount": item.get('amount'),
+            "status": "pending"
+        })
+        error = _transfer_request_error(item.get('amount'), item.get('recipient_account'))
+        if error:
+            results[-1].update(status="failed", msg=error)
+
+    # Resolve every recipient with a single IN query
+    wanted = {r['recipient_account'] for r in results if r['status'] == 'pending'}
+    recipients = {
+        u.account_number: u
+        for u in User.query.filter(User.account_number.in_(wanted), User.role == 'user').all()
+    } if wanted else {}
+
+    accepted = []
+    for result in results:
+        if result['status'] != 'pending':
+            continue
+        error = _transfer_recipient_error(sender, recipients.get(result['recipient_account']))
+        if error:
+            result.update(status="failed", msg=error[0])
+        else:
+            accepted.append(result)
+
+    if not accepted:
+        return jsonify({"msg": "No valid payments in batch", "results": results}), 400
+
+    payments = [(recipients[r['recipient_account']], parse_amount(r['amount'])) for r in accepted]
+    total_paise = sum(amount_paise for _, amount_paise in payments)
+    total = from_paise(total_paise)
+    if sender.balance_paise < total_paise:
+        return jsonify({"msg": "Insufficient funds", "total": total}), 400
+
+    # The batch is one debit for the per-minute limit, however many payments
+    refusal = limits.reserve_debit(sender, total_paise)
+    if refusal:
+        return jsonify({"msg": refusal.msg, "total": total}), refusal.status, refusal.headers()
+
+    try:
+        new_balance = transfers.transfer_batch(sender, payments)
+    except InsufficientFunds:
+        limits.release_debit(sender, total_paise)
+        return jsonify({"msg": "Insufficient funds", "total": total}), 400
+
+    for result, (_, amount_paise) in zip(accepted, payments):
+        result.update(status="ok",
+                      msg=f"Transferred ₹{from_paise(amount_paise):,.2f} to account {result['recipient_account']}")
 
     return jsonify({
-        "msg": f"Transferred ₹{amount} to account {recipient_account} successfully",
-        "new_balance": sender.initial_balance
+        "msg": f"Transferred ₹{total:,.2f} in {len(accepted)} of {len(results)} payments",
+        "total": total,
+        "new_balance": from_paise(new_balance),
+        "results": results
     }), 200
 
 
 
+@query_budget(3)
+@jwt_required()
+def get_transactions():
+    account_number = get_jwt_identity()
+    user_id = db.session.query(User.id).filter_by(account_number=account_number, role='user').scalar()
+    if user_id is None:
+        return jsonify({"msg": "User not found"}), 404
+
+    return transaction_history.history_response(user_id)
+
+
+@query_budget(8)
+@jwt_required()
+def get_statement(month):
+    try:
+        start = datetime.strptime(month, '%Y-%m').date()
+    except ValueError:
+        return jsonify({"msg": "Month must be in YYYY-MM format"}), 400
+    if start > checkpoints.today():
+        return jsonify({"msg": "Statement period has not started"}), 400
+
+    account_number = get_jwt_identity()
+    user = User.query.filter_by(account_number=account_number, role='user').first()
+    if not user:
+        return jsonify({"msg": "User not found"}), 404
+
+    end = (start + timedelta(days=32)).replace(day=1)
+    opening = checkpoints.closing_balance(user, start - timedelta(days=1))
+    closing = checkpoints.closing_balance(user, end - timedelta(days=1))
+
+    transactions = Transaction.query.filter(
+        Transaction.user_id == user.id,
+        Transaction.timestamp >= datetime.combine(start, time.min),
+        Transaction.timestamp < datetime.combine(end, time.min)
+    ).order_by(Transaction.timestamp, Transaction.id).all()
+
+    return jsonify({
+        "account_number": user.account_number,
+        "month": month,
+        "opening_balance": from_paise(opening),
+        "closing_balance": from_paise(closing),
+        "total_credits": from_paise(sum(t.amount_paise for t in transactions if t.type == 'credit')),
+        "total_debits": from_paise(sum(t.amount_paise for t in transactions if t.type == 'debit')),
+        "transactions": [transaction_history.transaction_json(t) for t in transactions]
+    }), 200
+
+
+@query_budget(5)
 @jwt_required()
 def request_update():
     account_number = get_jwt_identity()
-    user = User.query.filter_by(account_number=account_number).first()
+    user = User.query.filter_by(account_number=account_number, role='user').first()
     
     pending_requests = UserUpdateRequest.query.filter_by(
         user_id=user.id, 
@@ -291,18 +509,20 @@ def request_update():
 
     for field in allowed_fields:
         if field in data and getattr(user, field) != data[field]:
-            req = UserUpdateRequest(
-                user_id=user.id,
-                field=field,
-                old_value=getattr(user, field),
-                new_value=data[field]
-            )
-            requests.append(req)
+            requests.append({
+                'user_id': user.id,
+                'field': field,
+                'old_value': getattr(user, field),
+                'new_value': data[field],
+                'status': 'pending'
+            })
 
     if not requests:
         return jsonify({"msg": "No changes submitted"}), 400
 
-    db.session.add_all(requests)
+    # One multi-row INSERT however many fields changed
+    db.session.execute(insert(UserUpdateRequest.__table__), requests)
+    User.touch(user.id)
     db.session.commit()
 
     return jsonify({"msg": "Update request submitted for approval"}), 200
@@ -0,0 +1,7 @@
+from app import db
+
+class AccountNumberSequence(db.Model):
+    __tablename__ = 'account_number_sequence'
+
+    name = db.Column(db.String(32), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False)  # first number not yet handed out
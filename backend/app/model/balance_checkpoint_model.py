@@ -0,0 +1,10 @@
+from app import db
+
+class BalanceCheckpoint(db.Model):
+    __tablename__ = 'balance_checkpoint'
+
+    # Balance at the close of `day` (UTC) for every day the account posted
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    closing_balance_paise = db.Column(db.BigInteger, nullable=False)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
@@ -0,0 +1,11 @@
+from app import db
+
+class DashboardCounter(db.Model):
+    __tablename__ = 'dashboard_counter'
+
+    # Each statistic is split over a few shard rows so concurrent postings
+    # don't all queue on one row lock; readers add the shards up.
+    name = db.Column(db.String(40), primary_key=True)
+    shard = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
@@ -0,0 +1,14 @@
+from app import db
+
+class IdempotencyRecord(db.Model):
+    __tablename__ = 'idempotency_record'
+
+    # Outcome of the first request made with an Idempotency-Key; status_code
+    # stays NULL while that request is still executing
+    principal = db.Column(db.String(64), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -1,14 +1,26 @@
+from datetime import datetime
+
 from app import db
 
 class KYCUpdateRequest(db.Model):
     __tablename__ = 'kyc_update_request'
+    __table_args__ = (
+        db.Index('ix_kyc_update_request_status_timestamp', 'status', 'timestamp', 'id'),
+        db.Index('ix_kyc_update_request_user_timestamp', 'user_id', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     pancard_image = db.Column(db.String(255), nullable=False)
     photo_image = db.Column(db.String(255), nullable=False)
     signature_image = db.Column(db.String(255), nullable=False)
+    pancard_sha256 = db.Column(db.String(64))
+    pancard_size = db.Column(db.Integer)
+    photo_sha256 = db.Column(db.String(64))
+    photo_size = db.Column(db.Integer)
+    signature_sha256 = db.Column(db.String(64))
+    signature_size = db.Column(db.Integer)
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())  # see Transaction.timestamp
 
     user = db.relationship('User', backref=db.backref('kyc_requests', lazy='dynamic'))
@@ -1,5 +1,8 @@
+from sqlalchemy import update
+
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.hashing import hash_password, verify_password
+from app.utils.money import from_paise, to_paise
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -12,33 +15,44 @@ class User(db.Model):
     adhaar = db.Column(db.String(12), unique=True, nullable=False)
     pan = db.Column(db.String(10), unique=True, nullable=False)
     account_type = db.Column(db.String(20), nullable=False)  # e.g., Savings, Current
-    initial_balance = db.Column(db.Float, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    balance_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(10), default='user')
     type_of_account = db.Column(db.String(20), nullable=True)
-    account_number = db.Column(db.String(7), unique=True, nullable=False)
+    account_number = db.Column(db.String(16), unique=True, nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
 
-    transactions = db.relationship('Transaction', backref='user', lazy='dynamic')
+    # The ORM never touches ledger entries when a user is deleted
+    transactions = db.relationship('Transaction', backref='user', lazy='dynamic', passive_deletes='all')
+
+    @property
+    def initial_balance(self):
+        return from_paise(self.balance_paise)
+
+    @initial_balance.setter
+    def initial_balance(self, rupees):
+        self.balance_paise = to_paise(rupees)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    @staticmethod
+    def touch(*user_ids):
+        # Moves updated_at for changes stored outside the user row (KYC and
+        # update requests) so the profile's Last-Modified follows them
+        db.session.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(updated_at=db.func.now())
+            .execution_options(synchronize_session=False)
+        )
 
     @staticmethod
     def generate_account_number():
-        last_user = User.query.order_by(User.account_number.desc()).first()
-        
-        if last_user and last_user.account_number:
-            try:
-                last_number = int(last_user.account_number.replace('AVS', ''))
-                next_number = last_number + 1
-            except (ValueError, AttributeError):
-                next_number = 1001
-        else:
-            next_number = 1001
-        
-        return f"AVS{next_number}"
+        from app.utils.account_numbers import allocate_account_number
+
+        return allocate_account_number()
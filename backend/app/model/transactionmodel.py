@@ -1,14 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import event
+
 from app import db
+from app.utils.money import from_paise, to_paise
 
 class Transaction(db.Model):
     __tablename__ = 'transaction'
+    __table_args__ = (
+        db.Index('ix_transaction_user_timestamp_id', 'user_id', 'timestamp', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount_paise = db.Column(db.BigInteger, nullable=False)
     type = db.Column(db.String(10), nullable=False)  # 'credit' or 'debit'
     description = db.Column(db.String(200))
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    # Set in Python so SQLite stores microseconds like the keyset cursors it is
+    # compared with; the server default only covers rows inserted outside the app
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
+
+    @property
+    def amount(self):
+        return from_paise(self.amount_paise)
+
+    @amount.setter
+    def amount(self, rupees):
+        self.amount_paise = to_paise(rupees)
 
     def __repr__(self):
         return f"<Transaction {self.id} | User {self.user_id} | {self.type} ₹{self.amount}>"
+
+
+@event.listens_for(Transaction, 'before_update')
+def _entries_are_append_only(mapper, connection, target):
+    # Transactions are the ledger; corrections are new entries
+    raise ValueError(f"Ledger entry {target.id} cannot be modified")
@@ -1,7 +1,13 @@
+from datetime import datetime
+
 from app import db
 
 class UserUpdateRequest(db.Model):
     __tablename__ = 'user_update_request'
+    __table_args__ = (
+        db.Index('ix_user_update_request_status_timestamp', 'status', 'timestamp', 'id'),
+        db.Index('ix_user_update_request_user_status', 'user_id', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -9,6 +15,6 @@ class UserUpdateRequest(db.Model):
     old_value = db.Column(db.String(255))
     new_value = db.Column(db.String(255), nullable=False)
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())  # see Transaction.timestamp
 
     user = db.relationship('User', backref=db.backref('update_requests', lazy='dynamic'))
@@ -9,21 +9,29 @@ api_bp.route('/profile', methods=['GET'])(user_controller.get_profile)
 api_bp.route('/deposit', methods=['POST'])(user_controller.deposit)
 api_bp.route('/withdraw', methods=['POST'])(user_controller.withdraw)
 api_bp.route('/transfer', methods=['POST'])(user_controller.transfer)
+api_bp.route('/transfer/batch', methods=['POST'])(user_controller.transfer_batch)
+api_bp.route('/transactions', methods=['GET'])(user_controller.get_transactions)
+api_bp.route('/statements/<month>', methods=['GET'])(user_controller.get_statement)
 api_bp.route('/request-update', methods=['POST'])(user_controller.request_update)
 api_bp.route('/request-kyc-update', methods=['POST'])(user_controller.request_kyc_update)
+api_bp.route('/kyc-requests/<int:request_id>/documents/<document>', methods=['GET'])(user_controller.get_kyc_document)
 
 
 
 
 api_bp.route('/admin/kyc-requests', methods=['GET'])(admin_controller.list_kyc_requests)
 api_bp.route('/admin/kyc-requests/<int:request_id>', methods=['POST'])(admin_controller.process_kyc_request)
+api_bp.route('/admin/kyc-requests/bulk', methods=['POST'])(admin_controller.process_kyc_requests_bulk)
 api_bp.route('/admin/login', methods=['POST'])(admin_controller.admin_login)  # login via username
 api_bp.route('/admin/users', methods=['GET'])(admin_controller.list_users)
 api_bp.route('/admin/users/<int:user_id>', methods=['PUT'])(admin_controller.update_user)
 api_bp.route('/admin/users/<int:user_id>', methods=['DELETE'])(admin_controller.delete_user)
 api_bp.route('/admin/dashboard', methods=['GET'])(admin_controller.dashboard)
+api_bp.route('/admin/metrics', methods=['GET'])(admin_controller.metrics)
 api_bp.route('/admin/create-user', methods=['POST'])(admin_controller.create_user)
+api_bp.route('/admin/import-users', methods=['POST'])(admin_controller.import_users)
 api_bp.route('/admin/users/<int:user_id>/transactions', methods=['GET'])(admin_controller.get_user_transactions)
 api_bp.route('/admin/update-requests', methods=['GET'])(admin_controller.list_update_requests)
 api_bp.route('/admin/update-requests/<int:request_id>', methods=['POST'])(admin_controller.process_update_request)
+api_bp.route('/admin/update-requests/bulk', methods=['POST'])(admin_controller.process_update_requests_bulk)
 
@@ -0,0 +1,109 @@
+import os
+import threading
+
+from flask import current_app
+from sqlalchemy import Integer, cast, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.model.account_sequence_model import AccountNumberSequence
+
+PREFIX = 'AVS'
+FIRST_NUMBER = 1001
+
+
+class AccountNumberAllocator:
+    # Hands out account numbers from a block reserved in the
+    # account_number_sequence table. Each process reserves block_size numbers
+    # with one atomic UPDATE and serves them from memory, so registration never
+    # scans the user table and two workers can never get the same number.
+    # Numbers left in a block when a process exits are skipped, not reused.
+
+    def __init__(self, name='account_number', prefix=PREFIX, block_size=20):
+        self.name = name
+        self.prefix = prefix
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._next = 0
+        self._end = 0
+
+    def allocate(self):
+        with self._lock:
+            # A forked worker must not keep serving its parent's block
+            if self._pid != os.getpid() or self._next >= self._end:
+                self._next, self._end = self._reserve_block(self.block_size)
+                self._pid = os.getpid()
+            value = self._next
+            self._next += 1
+        return f"{self.prefix}{value}"
+
+    def allocate_many(self, count):
+        # Bulk imports: one reservation sized to the request rather than
+        # count / block_size round trips
+        with self._lock:
+            if self._pid != os.getpid():
+                self._next = self._end = 0
+                self._pid = os.getpid()
+            values = list(range(self._next, min(self._end, self._next + count)))
+            self._next += len(values)
+            missing = count - len(values)
+            if missing:
+                start, end = self._reserve_block(missing)
+                values.extend(range(start, end))
+        return [f"{self.prefix}{value}" for value in values]
+
+    def _reserve_block(self, size):
+        table = AccountNumberSequence.__table__
+        while True:
+            with db.engine.begin() as conn:
+                result = conn.execute(
+                    update(table)
+                    .where(table.c.name == self.name)
+                    .values(next_value=table.c.next_value + size)
+                )
+                if result.rowcount == 1:
+                    end = conn.execute(
+                        select(table.c.next_value).where(table.c.name == self.name)
+                    ).scalar_one()
+                    return end - size, end
+            self.create_sequence()
+
+    def create_sequence(self):
+        # One-off: continue numbering after the highest number already issued.
+        # scripts/init_db.py runs it so that no registration pays for it.
+        from app.model.models import User
+
+        table = AccountNumberSequence.__table__
+        suffix = cast(func.substr(User.account_number, len(self.prefix) + 1), Integer)
+        try:
+            with db.engine.begin() as conn:
+                highest = conn.execute(
+                    select(func.max(suffix)).where(User.account_number.like(f'{self.prefix}%'))
+                ).scalar()
+                start = highest + 1 if highest else FIRST_NUMBER
+                conn.execute(insert(table).values(name=self.name, next_value=start))
+        except IntegrityError:
+            pass  # another process created it first
+
+
+def get_allocator():
+    allocator = current_app.extensions.get('account_numbers')
+    if allocator is None:
+        allocator = AccountNumberAllocator(
+            block_size=current_app.config.get('ACCOUNT_NUMBER_BLOCK_SIZE', 20)
+        )
+        current_app.extensions['account_numbers'] = allocator
+    return allocator
+
+
+def create_sequence():
+    get_allocator().create_sequence()
+
+
+def allocate_account_number():
+    return get_allocator().allocate()
+
+
+def allocate_account_numbers(count):
+    return get_allocator().allocate_many(count)
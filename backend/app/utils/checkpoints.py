@@ -0,0 +1,132 @@
+from datetime import date, datetime, time
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.model.balance_checkpoint_model import BalanceCheckpoint
+from app.model.models import User
+from app.model.transactionmodel import Transaction
+
+# Daily closing-balance checkpoints. Every posting rewrites today's row for the
+# accounts it touched, so "balance as of the end of day D" is the newest
+# checkpoint on or before D: one index lookup instead of replaying history.
+# Month-end balances are the same lookup at the month's last day.
+BATCH_SIZE = 5000
+SIGNED_AMOUNT = case((Transaction.type == 'credit', Transaction.amount_paise), else_=-Transaction.amount_paise)
+
+
+def today():
+    return datetime.utcnow().date()
+
+
+def _upsert(rows):
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = dialect_insert(BalanceCheckpoint).values(rows)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['user_id', 'day'],
+            set_={'closing_balance_paise': stmt.excluded.closing_balance_paise, 'updated_at': func.now()}
+        ))
+        return
+    for row in rows:
+        existing = db.session.get(BalanceCheckpoint, (row['user_id'], row['day']))
+        if existing:
+            existing.closing_balance_paise = row['closing_balance_paise']
+        else:
+            db.session.add(BalanceCheckpoint(**row))
+
+
+def record(user_ids):
+    # Called inside a posting transaction after the balances changed.
+    # Returns {user_id: balance_paise} so callers don't re-read them.
+    balances = dict(db.session.execute(
+        select(User.id, User.balance_paise).where(User.id.in_(set(user_ids)))
+    ).all())
+    day = today()
+    _upsert([
+        {'user_id': user_id, 'day': day, 'closing_balance_paise': balance}
+        for user_id, balance in sorted(balances.items())
+    ])
+    return balances
+
+
+def _net_since(user_id, after, until=None):
+    query = select(func.coalesce(func.sum(SIGNED_AMOUNT), 0)).where(
+        Transaction.user_id == user_id, Transaction.timestamp > after
+    )
+    if until is not None:
+        query = query.where(Transaction.timestamp <= until)
+    return db.session.execute(query).scalar()
+
+
+def balance_as_of(user, at):
+    # Balance in paise at datetime `at` (naive UTC). Reads the last checkpoint
+    # closed before that day plus the same-day tail of transactions.
+    if user.created_at and at < user.created_at:
+        return 0
+
+    checkpoint = db.session.execute(
+        select(BalanceCheckpoint.day, BalanceCheckpoint.closing_balance_paise)
+        .where(BalanceCheckpoint.user_id == user.id, BalanceCheckpoint.day < at.date())
+        .order_by(BalanceCheckpoint.day.desc())
+        .limit(1)
+    ).first()
+    if checkpoint is not None:
+        closed_at = datetime.combine(checkpoint.day, time.max)
+        return checkpoint.closing_balance_paise + _net_since(user.id, closed_at, at)
+
+    # No checkpoint yet: walk back from the current balance instead
+    current = db.session.execute(select(User.balance_paise).where(User.id == user.id)).scalar()
+    return current - _net_since(user.id, at)
+
+
+def closing_balance(user, day):
+    return balance_as_of(user, datetime.combine(day, time.max))
+
+
+def rebuild(user_ids=None, since=None):
+    # Bulk job: recompute daily checkpoints from the transaction history,
+    # anchored on each account's current balance and walking backwards.
+    day_column = func.date(Transaction.timestamp)
+    query = (
+        select(Transaction.user_id, day_column, func.sum(SIGNED_AMOUNT))
+        .group_by(Transaction.user_id, day_column)
+        .order_by(Transaction.user_id, day_column.desc())
+    )
+    balances_query = select(User.id, User.balance_paise)
+    if user_ids is not None:
+        query = query.where(Transaction.user_id.in_(user_ids))
+        balances_query = balances_query.where(User.id.in_(user_ids))
+    balances = dict(db.session.execute(balances_query).all())
+
+    cleanup = delete(BalanceCheckpoint)
+    if user_ids is not None:
+        cleanup = cleanup.where(BalanceCheckpoint.user_id.in_(user_ids))
+    if since is not None:
+        cleanup = cleanup.where(BalanceCheckpoint.day >= since)
+    db.session.execute(cleanup)
+
+    written = 0
+    rows = []
+    running_user, running_balance = None, None
+    for user_id, day, net in db.session.execute(query.execution_options(yield_per=BATCH_SIZE)):
+        if user_id not in balances:
+            continue
+        if user_id != running_user:
+            running_user, running_balance = user_id, balances[user_id]
+        day = day if isinstance(day, date) else date.fromisoformat(day)
+        if since is None or day >= since:
+            rows.append({'user_id': user_id, 'day': day, 'closing_balance_paise': running_balance})
+        running_balance -= net
+        if len(rows) >= BATCH_SIZE:
+            db.session.execute(insert(BalanceCheckpoint), rows)
+            written += len(rows)
+            rows = []
+
+    if rows:
+        db.session.execute(insert(BalanceCheckpoint), rows)
+        written += len(rows)
+    db.session.commit()
+    return written
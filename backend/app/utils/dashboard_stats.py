@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import bindparam, case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.utils.read_replica import primary
+from app.model.dashboard_stats_model import DashboardCounter
+from app.model.models import User
+
+# Counters behind /admin/dashboard. They are adjusted in the same transaction
+# as every change that affects them (registration, deletion, profile edits,
+# deposits and withdrawals), so the dashboard reads a few dozen rows instead
+# of scanning the user table. rebuild() recomputes them in one grouped pass.
+# scripts/init_db.py builds them; a read that still finds them missing builds
+# them once.
+STATS = [
+    'total_users',
+    'total_balance_paise',
+    'male_users',
+    'female_users',
+    'savings_accounts',
+    'current_accounts',
+]
+BUILD_MARKER = '_built'  # value 1 once the counters are complete, 0 while a rebuild runs, -1 before
+REBUILD_TIMEOUT = 300  # seconds before an unfinished rebuild is taken over
+
+
+def _shards():
+    return current_app.config.get('DASHBOARD_COUNTER_SHARDS', 8)
+
+
+def snapshot(user):
+    # The contribution of one account to every counter
+    if user is None or user.role != 'user':
+        return dict.fromkeys(STATS, 0)
+    return {
+        'total_users': 1,
+        'total_balance_paise': user.balance_paise or 0,
+        'male_users': int(user.gender == 'Male'),
+        'female_users': int(user.gender == 'Female'),
+        'savings_accounts': int(user.account_type == 'savings'),
+        'current_accounts': int(user.account_type == 'current'),
+    }
+
+
+def diff(before, after):
+    return {name: after.get(name, 0) - before.get(name, 0) for name in STATS}
+
+
+def negate(deltas):
+    return {name: -value for name, value in deltas.items()}
+
+
+def combine(*deltas):
+    return {name: sum(d.get(name, 0) for d in deltas) for name in STATS}
+
+
+def apply(deltas, shard_key=0):
+    # Must run inside the caller's transaction. Counters that were never
+    # built are left alone; the first dashboard read rebuilds them.
+    shard = shard_key % _shards()
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        db.session.execute(
+            update(DashboardCounter)
+            .where(DashboardCounter.name == name, DashboardCounter.shard == shard)
+            .values(value=DashboardCounter.value + delta, updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+
+
+def record_balance_change(user_id, delta_paise):
+    apply({'total_balance_paise': delta_paise}, shard_key=user_id)
+
+
+def compute():
+    row = db.session.execute(
+        select(
+            func.count(User.id),
+            func.coalesce(func.sum(User.balance_paise), 0),
+            func.coalesce(func.sum(case((User.gender == 'Male', 1), else_=0)), 0),
+            func.coalesce(func.sum(case((User.gender == 'Female', 1), else_=0)), 0),
+            func.coalesce(func.sum(case((User.account_type == 'savings', 1), else_=0)), 0),
+            func.coalesce(func.sum(case((User.account_type == 'current', 1), else_=0)), 0),
+        ).where(User.role == 'user')
+    ).one()
+    return dict(zip(STATS, (int(v) for v in row)))
+
+
+def _ensure_rows():
+    # Every counter row (and the build marker) must exist before a rebuild
+    # takes its lock, so postings that run meanwhile have rows to update
+    wanted = {(name, shard) for name in STATS for shard in range(_shards())} | {(BUILD_MARKER, 0)}
+    existing = set(db.session.execute(select(DashboardCounter.name, DashboardCounter.shard)).all())
+    missing = sorted(wanted - existing)
+    if not missing:
+        return
+    try:
+        db.session.execute(insert(DashboardCounter), [
+            {'name': name, 'shard': shard, 'value': -1 if name == BUILD_MARKER else 0} for name, shard in missing
+        ])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # a concurrent rebuild created them
+
+
+def rebuild(ensure_rows=True):
+    if ensure_rows:
+        _ensure_rows()
+    # Touching every counter row first locks them (the whole database on
+    # SQLite) before the totals are read: postings that committed earlier are
+    # in compute(), postings still running wait and add their delta on top.
+    db.session.execute(
+        update(DashboardCounter).values(value=DashboardCounter.value)
+        .execution_options(synchronize_session=False)
+    )
+    totals = compute()
+    db.session.execute(delete(DashboardCounter).where(
+        DashboardCounter.name != BUILD_MARKER,
+        (DashboardCounter.shard >= _shards()) | DashboardCounter.name.notin_(STATS)
+    ))
+    counters = DashboardCounter.__table__
+    db.session.execute(
+        counters.update()
+        .where(counters.c.name == bindparam('stat'), counters.c.shard == bindparam('shard_no'))
+        .values(value=bindparam('total'), updated_at=func.now()),
+        [{'stat': name, 'shard_no': shard, 'total': totals[name] if shard == 0 else 0}
+         for name in STATS for shard in range(_shards())]
+    )
+    db.session.execute(
+        update(DashboardCounter).where(DashboardCounter.name == BUILD_MARKER)
+        .values(value=1, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return totals
+
+
+def _claim_rebuild():
+    # Only one process rebuilds: whoever moves the marker to "rebuilding".
+    # A rebuild that never finished is taken over after REBUILD_TIMEOUT.
+    stale = datetime.utcnow() - timedelta(seconds=REBUILD_TIMEOUT)
+    _ensure_rows()
+    claimed = db.session.execute(
+        update(DashboardCounter)
+        .where(DashboardCounter.name == BUILD_MARKER,
+               (DashboardCounter.value != 0) | (DashboardCounter.updated_at < stale))
+        .values(value=0, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def _read_counters():
+    # (stats, updated_at), or None unless a rebuild has completed
+    rows = db.session.execute(
+        select(
+            DashboardCounter.name,
+            func.sum(DashboardCounter.value),
+            func.max(DashboardCounter.updated_at),
+            func.count(),
+        ).group_by(DashboardCounter.name)
+    ).all()
+    counters = {name: (value, updated_at, shards) for name, value, updated_at, shards in rows}
+    marker = counters.get(BUILD_MARKER)
+    if marker is None or marker[0] != 1 or any(counters.get(name, (0, None, 0))[2] != _shards() for name in STATS):
+        return None
+    return {name: int(counters[name][0]) for name in STATS}, max(counters[name][1] for name in STATS)
+
+
+def ensure_built():
+    # For deploy scripts: builds the counters unless they are built or being built
+    if _read_counters() is None and _claim_rebuild():
+        rebuild(ensure_rows=False)
+
+
+def read():
+    counters = _read_counters()
+    if counters is not None:
+        return counters
+    # A replica may not have the counters yet: the primary is asked next and
+    # builds them once; while that runs, readers get a full count instead
+    with primary():
+        counters = _read_counters()
+        if counters is not None:
+            return counters
+        if not _claim_rebuild():
+            return compute(), None
+        try:
+            rebuild(ensure_rows=False)  # the claim created them
+        except Exception:
+            db.session.rollback()
+            raise
+        return _read_counters()
@@ -0,0 +1,179 @@
+import os
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
+
+from app import db
+from app.utils.read_replica import REPLICA_ENGINE
+
+# Engine settings derived from config.Config. Server databases get a sized,
+# pre-pinged connection pool; SQLite gets WAL journaling (readers no longer
+# block the writer), synchronous=NORMAL (safe with WAL, no fsync per commit),
+# a busy timeout so writers wait for the lock instead of failing with
+# "database is locked", and memory-mapped reads. Explicit
+# SQLALCHEMY_ENGINE_OPTIONS always win over the derived values.
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'SQLITE_JOURNAL_MODE'),
+    ('synchronous', 'SQLITE_SYNCHRONOUS'),
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT_MS'),
+    ('mmap_size', 'SQLITE_MMAP_SIZE'),
+)
+SYNCHRONOUS_NAMES = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def engine_options(config):
+    options = {}
+    if not is_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        options = {
+            'pool_size': config.get('DB_POOL_SIZE', 10),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        }
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def sqlite_pragmas(config):
+    return [(pragma, config[key]) for pragma, key in SQLITE_PRAGMAS if config.get(key) is not None]
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas:
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+
+def _resolve_sqlite_path(app, url):
+    # Same rule Flask-SQLAlchemy applies to the primary: relative SQLite
+    # paths live in the instance folder
+    if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') \
+            and not os.path.isabs(url.database):
+        os.makedirs(app.instance_path, exist_ok=True)
+        url = url.set(database=os.path.join(app.instance_path, url.database))
+    return url
+
+
+def init_app(app):
+    # Called by create_app around db.init_app(): options must be in place
+    # before the engines are built, pragmas are hooked onto them afterwards
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+    # The replica is not a Flask-SQLAlchemy bind: binds map tables to
+    # engines, while the replica serves the same tables as the primary
+    replica_url = app.config.get('REPLICA_DATABASE_URL')
+    if replica_url:
+        options = engine_options({**app.config, 'SQLALCHEMY_DATABASE_URI': replica_url,
+                                  'SQLALCHEMY_ENGINE_OPTIONS': None})
+        app.extensions[REPLICA_ENGINE] = create_engine(_resolve_sqlite_path(app, make_url(replica_url)), **options)
+
+
+def engines(app):
+    # {name: engine} for the primary (and its binds) plus the replica
+    with app.app_context():
+        found = {bind or 'default': engine for bind, engine in db.engines.items()}
+    if REPLICA_ENGINE in app.extensions:
+        found[REPLICA_ENGINE] = app.extensions[REPLICA_ENGINE]
+    return found
+
+
+def install(app):
+    pragmas = sqlite_pragmas(app.config)
+    for engine in engines(app).values():
+        if engine.dialect.name == 'sqlite' and pragmas:
+            install_sqlite_pragmas(engine, pragmas)
+
+
+# Columns compared with keyset cursors and date bounds, which are bound with
+# microseconds. Rows stamped by the SQLite server default ('YYYY-MM-DD
+# HH:MM:SS') compare as strings below any bound in the same second.
+PADDED_TIMESTAMPS = (
+    ('transaction', 'timestamp'),
+    ('kyc_update_request', 'timestamp'),
+    ('user_update_request', 'timestamp'),
+)
+
+
+def pad_sqlite_timestamps(engine):
+    # Gives second-precision values the stored form the app now writes;
+    # returns [(table, column, rows padded)]
+    if engine.dialect.name != 'sqlite':
+        return []
+    padded = []
+    with engine.begin() as conn:
+        for table, column in PADDED_TIMESTAMPS:
+            count = conn.exec_driver_sql(
+                f'UPDATE "{table}" SET "{column}" = "{column}" || \'.000000\' WHERE length("{column}") = 19'
+            ).rowcount
+            if count:
+                padded.append((table, column, count))
+    return padded
+
+
+# VARCHAR columns declared wider than databases created earlier have them.
+# SQLite does not enforce lengths; server databases would truncate or reject
+# the longer values.
+WIDENED_COLUMNS = (
+    ('user', 'account_number'),  # block-allocated numbers, was VARCHAR(7)
+    ('user', 'password_hash'),  # hashes with their method parameters, was VARCHAR(128)
+    ('admin', 'password_hash'),
+)
+
+
+def widen_column_ddl(dialect_name, table, column):
+    # table, column: the model's sqlalchemy Table and Column
+    if dialect_name == 'mysql':
+        null = 'NULL' if column.nullable else 'NOT NULL'
+        return f'ALTER TABLE `{table.name}` MODIFY `{column.name}` VARCHAR({column.type.length}) {null}'
+    return f'ALTER TABLE "{table.name}" ALTER COLUMN "{column.name}" TYPE VARCHAR({column.type.length})'
+
+
+def widen_columns(engine):
+    # Returns [(table, column, old length, new length)] of the columns widened
+    if engine.dialect.name == 'sqlite':
+        return []
+    inspector = inspect(engine)
+    widened = []
+    with engine.begin() as conn:
+        for table_name, column_name in WIDENED_COLUMNS:
+            table = db.metadata.tables[table_name]
+            column = table.c[column_name]
+            current = {c['name']: c['type'] for c in inspector.get_columns(table_name)}[column_name]
+            length = getattr(current, 'length', None)
+            if length is None or length >= column.type.length:
+                continue
+            conn.exec_driver_sql(widen_column_ddl(engine.dialect.name, table, column))
+            widened.append((table_name, column_name, length, column.type.length))
+    return widened
+
+
+def report(app):
+    # Effective settings as seen by a live connection, one line per item
+    lines = []
+    for name, engine in engines(app).items():
+        lines.append(f"database[{name}]: {engine.url.render_as_string(hide_password=True)}")
+        if engine.dialect.name == 'sqlite':
+            with engine.connect() as conn:
+                for pragma, _ in SQLITE_PRAGMAS:
+                    value = conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+                    if pragma == 'synchronous':
+                        value = SYNCHRONOUS_NAMES.get(value, value)
+                    lines.append(f"  {pragma} = {value}")
+        else:
+            lines.append(f"  pool = {type(engine.pool).__name__}")
+            for attribute, option in (('size', 'pool_size'), ('_max_overflow', 'max_overflow'),
+                                      ('_timeout', 'pool_timeout'), ('_recycle', 'pool_recycle'),
+                                      ('_pre_ping', 'pool_pre_ping')):
+                value = getattr(engine.pool, attribute, None)
+                lines.append(f"  {option} = {value() if callable(value) else value}")
+    return lines
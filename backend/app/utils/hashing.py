@@ -0,0 +1,123 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    # Raised instead of queueing when every hashing slot is taken
+    pass
+
+
+def _generate(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _method_of(password_hash):
+    return password_hash.split('$', 1)[0]
+
+
+class PasswordHasher:
+    # Runs werkzeug's key derivation on a bounded pool. hashlib releases the
+    # GIL while hashing, so a thread pool already hashes in parallel; the
+    # process pool isolates the CPU work completely. At most max_pending
+    # hashes are in flight per worker process, anything beyond that is
+    # rejected immediately so a login storm degrades to fast 503s.
+
+    def __init__(self, method='scrypt', salt_length=16, workers=4,
+                 executor='thread', max_pending=32, timeout=30):
+        self.method = method
+        self.salt_length = salt_length
+        self.timeout = timeout
+        self.workers = workers
+        pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+        self._executor = pool_class(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._normalized_method = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def hash(self, password):
+        return self._run(_generate, password, self.method, self.salt_length)
+
+    def hash_many(self, passwords):
+        # Bulk callers wait for capacity instead of failing, and keep at most
+        # `workers` hashes in flight so logins still find free slots
+        window = threading.Semaphore(self.workers)
+
+        def done(_):
+            self._slots.release()
+            window.release()
+
+        futures = []
+        for password in passwords:
+            window.acquire()
+            self._slots.acquire()
+            future = self._executor.submit(_generate, password, self.method, self.salt_length)
+            future.add_done_callback(done)
+            futures.append(future)
+        return [future.result(timeout=self.timeout) for future in futures]
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    @property
+    def normalized_method(self):
+        # "scrypt" is stored as "scrypt:32768:8:1", "pbkdf2" as
+        # "pbkdf2:sha256:<iterations>"; ask werkzeug once for the full form.
+        if self._normalized_method is None:
+            self._normalized_method = _method_of(_generate('', self.method, 1))
+        return self._normalized_method
+
+    def needs_rehash(self, password_hash):
+        return _method_of(password_hash) != self.normalized_method
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def get_hasher():
+    hasher = current_app.extensions.get('password_hasher')
+    if hasher is None:
+        config = current_app.config
+        hasher = PasswordHasher(
+            method=config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            salt_length=config.get('PASSWORD_HASH_SALT_LENGTH', 16),
+            workers=config.get('PASSWORD_HASH_WORKERS', 4),
+            executor=config.get('PASSWORD_HASH_EXECUTOR', 'thread'),
+            max_pending=config.get('PASSWORD_HASH_MAX_PENDING', 32),
+            timeout=config.get('PASSWORD_HASH_TIMEOUT', 30),
+        )
+        current_app.extensions['password_hasher'] = hasher
+    return hasher
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def hash_passwords(passwords):
+    return get_hasher().hash_many(passwords)
+
+
+def verify_password(password_hash, password):
+    return get_hasher().verify(password_hash, password)
+
+
+def rehash_if_needed(principal, password):
+    # Call after a successful check_password(); upgrades hashes made with
+    # older parameters. The caller commits.
+    if get_hasher().needs_rehash(principal.password_hash):
+        principal.set_password(password)
+        return True
+    return False
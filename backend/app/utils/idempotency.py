@@ -0,0 +1,155 @@
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.model.idempotency_model import IdempotencyRecord
+from app.utils.cache import TTLCache
+from app.utils.transfers import run_in_transaction
+
+# Requests carrying an Idempotency-Key are executed once per (principal, key).
+# The first execution claims the key in its own committed row, runs the view
+# and stores the response; retries with the same key and body get that
+# response back without running the view. Finished outcomes are also kept in
+# a per-process LRU so a retry storm is answered without touching the
+# database. If the process dies between posting and storing the outcome the
+# claim stays "in progress" until it expires: retries get 409, never a
+# second posting.
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+def get_replay_cache():
+    cache = current_app.extensions.get('idempotency_cache')
+    if cache is None:
+        cache = TTLCache(
+            maxsize=current_app.config.get('IDEMPOTENCY_CACHE_SIZE', 10000),
+            ttl=current_app.config.get('IDEMPOTENCY_TTL', 86400)
+        )
+        current_app.extensions['idempotency_cache'] = cache
+    return cache
+
+
+def _fingerprint():
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _record(principal, key):
+    return (IdempotencyRecord.principal == principal) & (IdempotencyRecord.key == key)
+
+
+def _lookup(principal, key):
+    return db.session.execute(
+        select(
+            IdempotencyRecord.request_hash,
+            IdempotencyRecord.status_code,
+            IdempotencyRecord.response_body,
+            IdempotencyRecord.expires_at
+        ).where(_record(principal, key), IdempotencyRecord.expires_at > datetime.utcnow())
+    ).first()
+
+
+def _claim(principal, key, fingerprint):
+    now = datetime.utcnow()
+    db.session.execute(delete(IdempotencyRecord).where(_record(principal, key), IdempotencyRecord.expires_at <= now))
+    db.session.add(IdempotencyRecord(
+        principal=principal,
+        key=key,
+        request_hash=fingerprint,
+        created_at=now,
+        expires_at=now + timedelta(seconds=current_app.config.get('IDEMPOTENCY_TTL', 86400))
+    ))
+
+
+def _finish(principal, key, status_code, body):
+    db.session.execute(
+        update(IdempotencyRecord)
+        .where(_record(principal, key))
+        .values(status_code=status_code, response_body=body)
+    )
+
+
+def _release(principal, key):
+    db.session.execute(delete(IdempotencyRecord).where(_record(principal, key)))
+
+
+def purge_expired():
+    result = db.session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= datetime.utcnow()))
+    db.session.commit()
+    return result.rowcount
+
+
+def _replay(status_code, body):
+    response = current_app.response_class(body, status=status_code, mimetype='application/json')
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _key_reused():
+    return jsonify({"msg": f"{HEADER} was already used for a different request"}), 422
+
+
+def _execute(view, args, kwargs, principal, key, fingerprint):
+    try:
+        response = make_response(view(*args, **kwargs))
+    except Exception:
+        run_in_transaction(_release, principal, key)
+        raise
+
+    # Server errors and rate limiting are not remembered so the client's
+    # retry runs again
+    if response.status_code >= 500 or response.status_code == 429:
+        run_in_transaction(_release, principal, key)
+        return response
+
+    body = response.get_data(as_text=True)
+    run_in_transaction(_finish, principal, key, response.status_code, body)
+    get_replay_cache().set((principal, key), (fingerprint, response.status_code, body))
+    return response
+
+
+def idempotent(view):
+    # Use below @jwt_required(); keys are scoped to the token's identity
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({"msg": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"}), 400
+
+        principal = str(get_jwt_identity())
+        fingerprint = _fingerprint()
+        cache = get_replay_cache()
+        outcome = cache.get((principal, key))
+
+        if outcome is None:
+            stored = _lookup(principal, key)
+            if stored is None:
+                try:
+                    run_in_transaction(_claim, principal, key, fingerprint)
+                except IntegrityError:
+                    stored = _lookup(principal, key)  # a concurrent request claimed it first
+                else:
+                    return _execute(view, args, kwargs, principal, key, fingerprint)
+
+            if stored is not None and stored.request_hash != fingerprint:
+                return _key_reused()
+            if stored is None or stored.status_code is None:
+                return jsonify({"msg": "A request with this Idempotency-Key is still in progress"}), 409, {"Retry-After": "1"}
+            outcome = (stored.request_hash, stored.status_code, stored.response_body)
+            remaining = (stored.expires_at - datetime.utcnow()).total_seconds()
+            cache.set((principal, key), outcome, ttl=max(remaining, 0))
+
+        if outcome[0] != fingerprint:
+            return _key_reused()
+        return _replay(outcome[1], outcome[2])
+    return wrapper
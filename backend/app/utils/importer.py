@@ -0,0 +1,189 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.model.models import User
+from app.utils import dashboard_stats, ledger
+from app.utils.account_numbers import allocate_account_numbers
+from app.utils.hashing import hash_passwords
+from app.utils.money import to_paise
+
+REQUIRED_FIELDS = ['name', 'phone', 'gender', 'dob', 'adhaar', 'pan',
+                   'account_type', 'initial_balance', 'type_of_account', 'password']
+OPTIONAL_FIELDS = ['email', 'username']
+UNIQUE_FIELDS = [
+    ('phone', "Phone number already registered"),
+    ('email', "Email already registered"),
+    ('adhaar', "Adhaar already registered"),
+    ('pan', "PAN already registered"),
+    ('username', "Username already registered"),
+]
+DEFAULT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+def detect_format(filename, content_type=None):
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in (content_type or ''):
+        return 'ndjson'
+    return 'csv'
+
+
+def iter_rows(stream, fmt):
+    # Reads the binary stream incrementally; never holds the whole file
+    text = codecs.getreader('utf-8-sig')(stream)
+    if fmt == 'ndjson':
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else None
+    else:
+        for row in csv.DictReader(text):
+            yield row
+
+
+def _chunks(rows, size):
+    numbered = enumerate(rows, start=1)
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _clean(row):
+    if row is None:
+        return None, "Malformed row"
+    missing = [f for f in REQUIRED_FIELDS if row.get(f) in (None, '')]
+    if missing:
+        return None, f"Missing fields: {', '.join(missing)}"
+
+    record = {f: str(row[f]).strip() for f in REQUIRED_FIELDS if f not in ('initial_balance', 'password')}
+    for field in OPTIONAL_FIELDS:
+        record[field] = str(row[field]).strip() if row.get(field) not in (None, '') else None
+    try:
+        record['balance_paise'] = to_paise(row['initial_balance'])
+    except ValueError:
+        return None, "Invalid initial_balance"
+    if record['balance_paise'] < 0:
+        return None, "Invalid initial_balance"
+    record['password'] = str(row['password'])
+    return record, None
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row_number, msg):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "msg": msg})
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _existing_values(field, values):
+    column = getattr(User, field)
+    values = [v for v in values if v]
+    if not values:
+        return set()
+    return set(db.session.execute(select(column).where(column.in_(values))).scalars())
+
+
+def _import_chunk(chunk, report):
+    accepted = []
+    seen = set()  # earlier chunks are already committed and found by the IN queries
+    for row_number, row in chunk:
+        record, error = _clean(row)
+        if error:
+            report.error(row_number, error)
+            continue
+        accepted.append((row_number, record))
+
+    # One IN query per unique column for the whole chunk
+    taken = {field: _existing_values(field, [r[field] for _, r in accepted]) for field, _ in UNIQUE_FIELDS}
+
+    valid = []
+    for row_number, record in accepted:
+        error = None
+        for field, msg in UNIQUE_FIELDS:
+            value = record[field]
+            if value and (value in taken[field] or (field, value) in seen):
+                error = msg
+                break
+        if error:
+            report.error(row_number, error)
+            continue
+        for field, _ in UNIQUE_FIELDS:
+            if record[field]:
+                seen.add((field, record[field]))
+        valid.append((row_number, record))
+
+    if not valid:
+        return
+
+    account_numbers = allocate_account_numbers(len(valid))
+    password_hashes = hash_passwords([record.pop('password') for _, record in valid])
+    for (_, record), account_number, password_hash in zip(valid, account_numbers, password_hashes):
+        record.update(account_number=account_number, password_hash=password_hash, role='user')
+
+    try:
+        ledger.open_accounts(_insert_users([record for _, record in valid]))
+        dashboard_stats.apply(_chunk_deltas(record for _, record in valid), shard_key=report.created)
+        db.session.commit()
+        report.created += len(valid)
+    except IntegrityError:
+        # Lost a race with a concurrent registration: redo the chunk row by
+        # row so only the conflicting rows are reported
+        db.session.rollback()
+        for row_number, record in valid:
+            try:
+                with db.session.begin_nested():
+                    ledger.open_accounts(_insert_users([record]))
+                    dashboard_stats.apply(_chunk_deltas([record]), shard_key=report.created)
+                report.created += 1
+            except IntegrityError:
+                report.error(row_number, "Duplicate phone, email, Adhaar, PAN or username")
+        db.session.commit()
+
+
+def _insert_users(records):
+    # [(id, balance_paise)] of the new rows. MySQL has no RETURNING; there the
+    # rows are read back by their freshly allocated account numbers.
+    if db.session.get_bind().dialect.insert_executemany_returning:
+        return db.session.execute(insert(User).returning(User.id, User.balance_paise), records).all()
+    db.session.execute(insert(User), records)
+    return db.session.execute(
+        select(User.id, User.balance_paise)
+        .where(User.account_number.in_([record['account_number'] for record in records]))
+    ).all()
+
+
+def _chunk_deltas(records):
+    return dashboard_stats.combine(*(dashboard_stats.snapshot(User(**record)) for record in records))
+
+
+def import_customers(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    report = ImportReport()
+    for chunk in _chunks(rows, chunk_size):
+        _import_chunk(chunk, report)
+    return report.as_dict()
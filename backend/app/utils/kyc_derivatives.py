@@ -0,0 +1,102 @@
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.utils.kyc_store import get_kyc_store
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it only originals are served
+    Image = None
+
+log = logging.getLogger(__name__)
+
+# variant -> (max width/height, JPEG quality)
+VARIANTS = {
+    'thumb': (256, 70),
+    'preview': (1280, 82),
+}
+RENDERABLE = ('jpg', 'png')
+
+
+def render_derivative(source, target, max_side, quality):
+    with Image.open(source) as image:
+        image.draft('RGB', (max_side, max_side))  # lets libjpeg decode at reduced scale
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image.thumbnail((max_side, max_side))
+        image.save(target, 'JPEG', quality=quality, optimize=True, progressive=True)
+
+
+class DerivativePipeline:
+    # Builds thumbnails/previews of stored KYC images on a small thread pool
+    # after the upload has been committed, so the request never waits on
+    # image decoding. Derivatives sit next to the content-addressed original
+    # and are written via temp file + rename, so readers never see half a file.
+
+    def __init__(self, store, workers=2, render=None):
+        self.store = store
+        if render is None and Image is not None:
+            render = render_derivative
+        self._render = render
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kyc-derivatives') if render else None
+        self._lock = threading.Lock()
+        self._in_flight = set()
+
+    @property
+    def enabled(self):
+        return self._executor is not None
+
+    def submit(self, documents):
+        # documents: StoredDocument tuples from KYCDocumentStore.receive()
+        futures = []
+        if not self.enabled:
+            return futures
+        for doc in documents:
+            if doc.extension not in RENDERABLE:
+                continue
+            with self._lock:
+                if doc.sha256 in self._in_flight:
+                    continue
+                self._in_flight.add(doc.sha256)
+            futures.append(self._executor.submit(self._build, doc.sha256, doc.extension))
+        return futures
+
+    def _build(self, sha256, extension):
+        try:
+            source = self.store.path_for(sha256, extension)
+            for variant, (max_side, quality) in VARIANTS.items():
+                target = self.store.derivative_path(sha256, variant)
+                if os.path.exists(target):
+                    continue
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.derivative-')
+                os.close(fd)
+                try:
+                    self._render(source, temp_path, max_side, quality)
+                    os.replace(temp_path, target)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+        except Exception:
+            log.exception("Could not build KYC derivatives for %s", sha256)
+        finally:
+            with self._lock:
+                self._in_flight.discard(sha256)
+
+    def shutdown(self, wait=False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+
+def get_derivative_pipeline():
+    pipeline = current_app.extensions.get('kyc_derivatives')
+    if pipeline is None:
+        pipeline = DerivativePipeline(
+            get_kyc_store(),
+            workers=current_app.config.get('KYC_DERIVATIVE_WORKERS', 2),
+        )
+        current_app.extensions['kyc_derivatives'] = pipeline
+    return pipeline
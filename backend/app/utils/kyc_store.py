@@ -0,0 +1,148 @@
+import hashlib
+import os
+import tempfile
+from collections import namedtuple
+
+from flask import current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+
+# Content-addressed store for KYC uploads. Files are streamed straight from
+# the multipart parser into a temp file in the store while being hashed and
+# checked, then renamed to <root>/<sha256[:2]>/<sha256>.<ext>. Identical
+# documents are stored once and two customers' "pan.jpg" never collide.
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'%PDF-', 'pdf'),
+]
+SNIFF_BYTES = 8
+DOCUMENTS = ('pancard', 'photo', 'signature')
+
+StoredDocument = namedtuple('StoredDocument', ['path', 'sha256', 'size', 'extension'])
+
+
+class UploadRejected(Exception):
+    # Not a ValueError: werkzeug's form parser would silently swallow those
+    def __init__(self, msg, status=400):
+        super().__init__(msg)
+        self.msg = msg
+        self.status = status
+
+
+def sniff_extension(head):
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+class _HashingSpool:
+    # Write target handed to werkzeug for each uploaded file part
+
+    def __init__(self, directory, max_size):
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        self._file = os.fdopen(fd, 'w+b')
+        self._max_size = max_size
+        self._head = b''
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.extension = None
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self._max_size:
+            raise UploadRejected(f"Each file must be at most {self._max_size // (1024 * 1024)} MB", 413)
+        if self.extension is None:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self._check_type()
+        self.sha256.update(data)
+        return self._file.write(data)
+
+    def _check_type(self):
+        self.extension = sniff_extension(self._head)
+        if self.extension is None:
+            raise UploadRejected("Only JPEG, PNG or PDF files are accepted", 415)
+
+    def finish(self):
+        if self.extension is None:
+            self._check_type()  # files shorter than SNIFF_BYTES
+        self._file.close()
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.temp_path):
+            os.unlink(self.temp_path)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class KYCDocumentStore:
+    def __init__(self, root, max_file_size):
+        self.root = root
+        self.max_file_size = max_file_size
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, sha256, extension):
+        return os.path.join(self.root, sha256[:2], f"{sha256}.{extension}")
+
+    def derivative_path(self, sha256, variant):
+        return os.path.join(self.root, sha256[:2], f"{sha256}.{variant}.jpg")
+
+    def locate(self, path, sha256, variant='original'):
+        # Returns (path, etag, exact) for the requested variant. Derivatives
+        # that are not built yet (or cannot be, e.g. PDFs) fall back to the
+        # original with exact=False. Pre-store uploads have no sha256/etag.
+        if variant != 'original' and sha256:
+            derivative = self.derivative_path(sha256, variant)
+            if os.path.exists(derivative):
+                return derivative, f"{sha256}-{variant}", True
+        return path, sha256, variant == 'original'
+
+    def receive(self, environ, fields):
+        # Parses the multipart body of the current request, storing the named
+        # file fields. Returns {field: StoredDocument}; raises UploadRejected.
+        spools = []
+
+        def stream_factory(total_content_length, content_type, filename, content_length=None):
+            spool = _HashingSpool(self.root, self.max_file_size)
+            spools.append(spool)
+            return spool
+
+        try:
+            _, _, files = parse_form_data(
+                environ,
+                stream_factory=stream_factory,
+                max_content_length=self.max_file_size * len(fields) + 64 * 1024,
+            )
+            received = {name: files.get(name) for name in fields}
+            if not all(received.values()):
+                raise UploadRejected("All three files are required")
+            return {name: self._commit(upload.stream) for name, upload in received.items()}
+        except RequestEntityTooLarge:
+            raise UploadRejected("Upload too large", 413)
+        finally:
+            for spool in spools:
+                spool.discard()
+
+    def _commit(self, spool):
+        spool.finish()
+        digest = spool.sha256.hexdigest()
+        path = self.path_for(digest, spool.extension)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(spool.temp_path, path)
+        return StoredDocument(path, digest, spool.size, spool.extension)
+
+
+def get_kyc_store():
+    store = current_app.extensions.get('kyc_store')
+    if store is None:
+        store = KYCDocumentStore(
+            root=current_app.config.get('KYC_STORAGE_DIR') or os.path.join(current_app.root_path, 'uploads', 'kyc'),
+            max_file_size=current_app.config.get('KYC_MAX_FILE_SIZE', 5 * 1024 * 1024),
+        )
+        current_app.extensions['kyc_store'] = store
+    return store
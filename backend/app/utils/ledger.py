@@ -0,0 +1,44 @@
+from sqlalchemy import insert
+
+from app import db
+from app.model.transactionmodel import Transaction
+
+# The transaction table is the ledger: every change to a balance is posted as
+# an entry, so a balance always equals the signed sum of its account's
+# entries (see app.utils.reconciliation). Postings go through the helpers
+# below or app.utils.transfers; entries are never updated.
+OPENING = 'Account opening balance'
+OPENING_BACKFILLED = 'Opening balance (backfilled)'
+OPENING_DESCRIPTIONS = (OPENING, OPENING_BACKFILLED)
+ADJUSTMENT = 'Balance adjustment by bank'
+CLOSING = 'Account closed by bank'
+
+
+def entry(user_id, amount_paise, description, timestamp=None):
+    # Row for insert(Transaction) from a signed amount
+    row = {
+        'user_id': user_id,
+        'amount_paise': abs(amount_paise),
+        'type': 'credit' if amount_paise >= 0 else 'debit',
+        'description': description,
+    }
+    if timestamp is not None:
+        row['timestamp'] = timestamp
+    return row
+
+
+def post(entries):
+    # Zero amounts change nothing and are not posted
+    rows = [row for row in entries if row['amount_paise']]
+    if rows:
+        db.session.execute(insert(Transaction), rows)
+    return len(rows)
+
+
+def open_accounts(balances):
+    # balances: [(user_id, balance_paise)] of accounts just created
+    return post(entry(user_id, balance, OPENING) for user_id, balance in balances)
+
+
+def adjust(user_id, delta_paise, description=ADJUSTMENT):
+    return post([entry(user_id, delta_paise, description)])
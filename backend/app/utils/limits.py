@@ -0,0 +1,304 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.model.transactionmodel import Transaction
+from app.utils import ledger
+from app.utils.money import from_paise, to_paise
+
+# Per-account debit limits (withdrawals and outgoing transfers): an amount per
+# rolling 24 hours and a number of debits per rolling minute, configured per
+# account type in DEBIT_LIMITS (rupees). Each account's usage lives in two
+# bucketed sliding windows whose running totals make a check O(1); nothing is
+# summed over the transaction table per request. The windows live in a small
+# SQLite file (LIMITS_STORE, relative paths in the instance folder) shared by
+# all worker processes on the host: one row per account, updated under an
+# immediate transaction so two workers cannot both spend the same headroom.
+# LIMITS_STORE=':memory:' keeps them per process instead, which is only right
+# for a single process. They are rebuilt from the last 24 hours of the ledger
+# when a store starts empty or was built for another database.
+DAY_SECONDS = 86400
+DAY_BUCKETS = 96  # 15-minute buckets
+MINUTE_SECONDS = 60
+MINUTE_BUCKETS = 12  # 5-second buckets
+
+
+class SlidingWindow:
+    # Ring of fixed-width buckets covering the last `span` seconds, with the
+    # running total kept up to date as buckets expire
+    __slots__ = ('width', 'values', 'head', 'total')
+
+    def __init__(self, span, buckets, state=None):
+        self.width = span / buckets
+        self.values = [0] * buckets
+        self.head = None  # absolute index of the newest bucket
+        self.total = 0
+        if state is not None:
+            self.head, self.values = state[0], list(state[1])
+            self.total = sum(self.values)
+
+    def _advance(self, now):
+        index = int(now // self.width)
+        if self.head is None or index - self.head >= len(self.values):
+            self.values = [0] * len(self.values)
+            self.total = 0
+        elif index > self.head:
+            for i in range(self.head + 1, index + 1):
+                slot = i % len(self.values)
+                self.total -= self.values[slot]
+                self.values[slot] = 0
+        if self.head is None or index > self.head:
+            self.head = index
+
+    def current(self, now):
+        self._advance(now)
+        return self.total
+
+    def add(self, now, value, at=None):
+        self._advance(now)
+        index = int((now if at is None else at) // self.width)
+        if index <= self.head - len(self.values) or index > self.head:
+            return  # outside the window
+        self.values[index % len(self.values)] += value
+        self.total += value
+
+    def seconds_until_below(self, now, limit):
+        # How long until expiring buckets bring the total down to `limit`
+        self._advance(now)
+        total = self.total
+        n = len(self.values)
+        for i in range(self.head - n + 1, self.head + 1):
+            if total <= limit:
+                # buckets older than i are gone once bucket i - 1 + n opens
+                return max(1, int((i - 1 + n) * self.width - now + 1))
+            total -= self.values[i % n]
+        return max(1, int((self.head + n) * self.width - now + 1))
+
+    def state(self):
+        return [self.head, self.values]
+
+
+class AccountUsage:
+    __slots__ = ('amount', 'count')
+
+    def __init__(self, state=None):
+        amount_state, count_state = state or (None, None)
+        self.amount = SlidingWindow(DAY_SECONDS, DAY_BUCKETS, amount_state)
+        self.count = SlidingWindow(MINUTE_SECONDS, MINUTE_BUCKETS, count_state)
+
+    def state(self):
+        return [self.amount.state(), self.count.state()]
+
+
+class LimitExceeded:
+    def __init__(self, msg, status, retry_after):
+        self.msg = msg
+        self.status = status
+        self.retry_after = retry_after
+
+    def headers(self):
+        # No Retry-After for requests that can never fit: retrying won't help
+        return {"Retry-After": str(self.retry_after)} if self.retry_after is not None else {}
+
+
+class MemoryStore:
+    # Usage for this process only
+    def __init__(self):
+        self._usage = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def account(self, user_id):
+        with self._lock:
+            usage = self._usage.get(user_id)
+            if usage is None:
+                usage = self._usage[user_id] = AccountUsage()
+            yield usage
+
+    def rebuild(self, usages, force=True, source=None):
+        with self._lock:
+            self._usage = dict(usages())
+        return True
+
+
+class SQLiteStore:
+    # Usage shared by every process that opens the same file. The contents
+    # can always be rebuilt from the ledger, so durability is traded for speed.
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS account_usage (user_id INTEGER PRIMARY KEY, state TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS store_meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    def _connection(self):
+        # One connection per thread, never inherited across a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _immediate(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def account(self, user_id):
+        with self._immediate() as conn:
+            row = conn.execute("SELECT state FROM account_usage WHERE user_id = ?", (user_id,)).fetchone()
+            usage = AccountUsage(json.loads(row[0]) if row else None)
+            yield usage
+            conn.execute("INSERT OR REPLACE INTO account_usage (user_id, state) VALUES (?, ?)",
+                         (user_id, json.dumps(usage.state())))
+
+    def rebuild(self, usages, force=False, source=None):
+        # The first process to find the store empty (or built from another
+        # database) fills it; the others wait on the lock and leave it alone
+        with self._immediate() as conn:
+            meta = dict(conn.execute("SELECT name, value FROM store_meta"))
+            if not force and 'built_at' in meta and meta.get('source') == source:
+                return False
+            conn.execute("DELETE FROM account_usage")
+            conn.executemany(
+                "INSERT INTO account_usage (user_id, state) VALUES (?, ?)",
+                ((user_id, json.dumps(usage.state())) for user_id, usage in usages())
+            )
+            conn.executemany("INSERT OR REPLACE INTO store_meta (name, value) VALUES (?, ?)",
+                             [('built_at', datetime.utcnow().isoformat()), ('source', source)])
+        return True
+
+
+class LimitsEngine:
+    def __init__(self, rules, store, clock=time.time):
+        # rules: {account_type: {'daily_amount': rupees, 'per_minute': debits}}
+        self.rules = {
+            account_type.lower(): (
+                to_paise(rule['daily_amount']) if rule.get('daily_amount') is not None else None,
+                rule.get('per_minute')
+            )
+            for account_type, rule in (rules or {}).items()
+        }
+        self.store = store
+        self.clock = clock
+
+    def rule_for(self, account_type):
+        return self.rules.get((account_type or '').lower())
+
+    def reserve(self, user_id, account_type, amount, count=1):
+        # Counts the debit against the account's windows if it fits; returns
+        # a LimitExceeded otherwise
+        rule = self.rule_for(account_type)
+        if rule is None:
+            return None
+        daily_amount, per_minute = rule
+        if per_minute is not None and count > per_minute:
+            return LimitExceeded(f"At most {per_minute} payments can be debited per minute", 403, None)
+        if daily_amount is not None and amount > daily_amount:
+            return LimitExceeded(f"Daily debit limit of ₹{from_paise(daily_amount):,.2f} exceeded", 403, None)
+        now = self.clock()
+        with self.store.account(user_id) as usage:
+            if per_minute is not None and usage.count.current(now) + count > per_minute:
+                return LimitExceeded(
+                    f"Too many debits: at most {per_minute} per minute",
+                    429, usage.count.seconds_until_below(now, per_minute - count)
+                )
+            if daily_amount is not None and usage.amount.current(now) + amount > daily_amount:
+                return LimitExceeded(
+                    f"Daily debit limit of ₹{from_paise(daily_amount):,.2f} exceeded",
+                    403, usage.amount.seconds_until_below(now, daily_amount - amount)
+                )
+            usage.count.add(now, count)
+            usage.amount.add(now, amount)
+        return None
+
+    def release(self, user_id, account_type, amount, count=1):
+        # Gives back a reservation whose debit did not happen
+        if self.rule_for(account_type) is None:
+            return
+        now = self.clock()
+        with self.store.account(user_id) as usage:
+            usage.count.add(now, -count)
+            usage.amount.add(now, -amount)
+
+    def rebuild(self, debits, force=False, source=None):
+        # debits: iterable of (user_id, epoch seconds, amount_paise); source
+        # names the database they come from
+        def usages():
+            now = self.clock()
+            built = {}
+            for user_id, at, amount in debits():
+                usage = built.get(user_id)
+                if usage is None:
+                    usage = built[user_id] = AccountUsage()
+                usage.amount.add(now, amount, at=at)
+                usage.count.add(now, 1, at=at)
+            return built.items()
+        return self.store.rebuild(usages, force=force, source=source)
+
+
+def recent_debits(now=None):
+    # Customer-initiated debits of the last 24 hours from the ledger. A batch
+    # posts its entries with one timestamp and counts as one debit.
+    since = (now or datetime.utcnow()) - timedelta(seconds=DAY_SECONDS)
+    rows = db.session.execute(
+        select(Transaction.user_id, Transaction.timestamp, db.func.sum(Transaction.amount_paise))
+        .where(Transaction.type == 'debit', Transaction.timestamp >= since,
+               Transaction.description.notin_((ledger.ADJUSTMENT, ledger.CLOSING, *ledger.OPENING_DESCRIPTIONS)))
+        .group_by(Transaction.user_id, Transaction.timestamp)
+        .execution_options(yield_per=5000)
+    )
+    for user_id, timestamp, amount in rows:
+        yield user_id, timestamp.replace(tzinfo=timezone.utc).timestamp(), amount
+
+
+def _source():
+    return db.engine.url.render_as_string(hide_password=True)
+
+
+def rebuild(force=False):
+    return get_limits().rebuild(recent_debits, force=force, source=_source())
+
+
+def _store(path):
+    if not path or path == ':memory:':
+        return MemoryStore()
+    if not os.path.isabs(path):
+        path = os.path.join(current_app.instance_path, path)
+    return SQLiteStore(path)
+
+
+def get_limits():
+    engine = current_app.extensions.get('debit_limits')
+    if engine is None:
+        engine = LimitsEngine(current_app.config.get('DEBIT_LIMITS'), _store(current_app.config.get('LIMITS_STORE')))
+        if engine.rules:
+            engine.rebuild(recent_debits, source=_source())
+        current_app.extensions['debit_limits'] = engine
+    return engine
+
+
+def reserve_debit(user, amount, count=1):
+    return get_limits().reserve(user.id, user.account_type, amount, count)
+
+
+def release_debit(user, amount, count=1):
+    get_limits().release(user.id, user.account_type, amount, count)
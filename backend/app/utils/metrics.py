@@ -0,0 +1,293 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, request
+from sqlalchemy import event
+
+# Per-endpoint request metrics in Prometheus text format. Each request leaves
+# one sample tuple on a deque (appends are atomic, so the request path never
+# waits on a lock); whichever request finds a full backlog, or the scrape,
+# folds the samples into per-endpoint aggregates, skipping the fold if
+# another thread is already doing it. SQL statements are counted and timed
+# through cursor events on every engine. Aggregates are per worker process;
+# with METRICS_DIR set, workers also leave snapshots there and a scrape of any
+# worker reports the sum over all of them.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED = '<unmatched>'
+FOLD_AT = 256  # pending samples that trigger an inline fold
+SNAPSHOT_INTERVAL = 5  # seconds between METRICS_DIR snapshots
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_sql = threading.local()
+
+
+def _bucket_index(buckets, value):
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            return i
+    return len(buckets)
+
+
+class EndpointStats:
+    __slots__ = ('requests', 'seconds', 'latency', 'statements', 'statement_seconds',
+                 'statement_counts', 'request_bytes', 'response_bytes', 'statuses')
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.statements = 0
+        self.statement_seconds = 0.0
+        self.statement_counts = [0] * (len(STATEMENT_BUCKETS) + 1)
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.statuses = {}
+
+    def add(self, status, seconds, statements, statement_seconds, request_bytes, response_bytes):
+        self.requests += 1
+        self.seconds += seconds
+        self.latency[_bucket_index(LATENCY_BUCKETS, seconds)] += 1
+        self.statements += statements
+        self.statement_seconds += statement_seconds
+        self.statement_counts[_bucket_index(STATEMENT_BUCKETS, statements)] += 1
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.seconds += other.seconds
+        self.latency = [a + b for a, b in zip(self.latency, other.latency)]
+        self.statements += other.statements
+        self.statement_seconds += other.statement_seconds
+        self.statement_counts = [a + b for a, b in zip(self.statement_counts, other.statement_counts)]
+        self.request_bytes += other.request_bytes
+        self.response_bytes += other.response_bytes
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for slot in cls.__slots__:
+            setattr(stats, slot, data[slot])
+        stats.statuses = {str(k): v for k, v in data['statuses'].items()}
+        return stats
+
+
+class MetricsRegistry:
+    def __init__(self, snapshot_dir=None, clock=time.monotonic):
+        self.snapshot_dir = snapshot_dir
+        self._clock = clock
+        self._pending = deque()
+        self._fold_lock = threading.Lock()
+        self._endpoints = {}  # (method, endpoint) -> EndpointStats
+        self._last_snapshot = 0.0
+
+    def record(self, method, endpoint, status, seconds, statements=0, statement_seconds=0.0,
+               request_bytes=0, response_bytes=0):
+        self._pending.append((method, endpoint, str(status), seconds, statements, statement_seconds,
+                              request_bytes, response_bytes))
+        due = len(self._pending) >= FOLD_AT or (
+            self.snapshot_dir and self._clock() - self._last_snapshot >= SNAPSHOT_INTERVAL)
+        if due and self._fold_lock.acquire(blocking=False):
+            try:
+                self._fold()
+            finally:
+                self._fold_lock.release()
+
+    def _fold(self):
+        pending = self._pending
+        endpoints = self._endpoints
+        while pending:
+            try:
+                method, endpoint, *sample = pending.popleft()
+            except IndexError:
+                break
+            stats = endpoints.get((method, endpoint))
+            if stats is None:
+                stats = endpoints[(method, endpoint)] = EndpointStats()
+            stats.add(*sample)
+        if self.snapshot_dir and self._clock() - self._last_snapshot >= SNAPSHOT_INTERVAL:
+            self._write_snapshot()
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.snapshot_dir, f"metrics-{pid}.json")
+
+    def _write_snapshot(self):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = self._snapshot_path(os.getpid())
+        data = {f"{method} {endpoint}": stats.to_dict() for (method, endpoint), stats in self._endpoints.items()}
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+        self._last_snapshot = self._clock()
+
+    def _other_workers(self):
+        own = self._snapshot_path(os.getpid())
+        for name in sorted(os.listdir(self.snapshot_dir)):
+            path = os.path.join(self.snapshot_dir, name)
+            if not name.endswith('.json') or path == own:
+                continue
+            try:
+                with open(path) as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue  # a worker is replacing it right now
+
+    def collect(self):
+        # {(method, endpoint): EndpointStats}, summed over workers if configured
+        with self._fold_lock:
+            self._last_snapshot = float('-inf')  # a scrape always refreshes our snapshot
+            self._fold()
+            merged = {}
+            for key, stats in self._endpoints.items():
+                merged[key] = EndpointStats()
+                merged[key].merge(stats)
+        if self.snapshot_dir:
+            for snapshot in self._other_workers():
+                for key, data in snapshot.items():
+                    method, endpoint = key.split(' ', 1)
+                    merged.setdefault((method, endpoint), EndpointStats()).merge(EndpointStats.from_dict(data))
+        return merged
+
+    def render(self):
+        return render(self.collect())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, labels, buckets, counts, total):
+    cumulative = 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {cumulative + counts[-1]}")
+    lines.append(f"{name}_sum{_labels(**labels)} {total}")
+    lines.append(f"{name}_count{_labels(**labels)} {cumulative + counts[-1]}")
+
+
+def render(endpoints):
+    items = sorted(endpoints.items(), key=lambda item: (item[0][1], item[0][0]))
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family('avs_http_requests_total', 'counter', 'Requests by route, method and status code.')
+    for (method, endpoint), stats in items:
+        for status, count in sorted(stats.statuses.items()):
+            lines.append(f"avs_http_requests_total{_labels(method=method, endpoint=endpoint, status=status)} {count}")
+
+    family('avs_http_request_duration_seconds', 'histogram', 'Time spent handling the request.')
+    for (method, endpoint), stats in items:
+        _histogram(lines, 'avs_http_request_duration_seconds', {'method': method, 'endpoint': endpoint},
+                   LATENCY_BUCKETS, stats.latency, stats.seconds)
+
+    family('avs_db_statements_per_request', 'histogram', 'SQL statements issued per request.')
+    for (method, endpoint), stats in items:
+        _histogram(lines, 'avs_db_statements_per_request', {'method': method, 'endpoint': endpoint},
+                   STATEMENT_BUCKETS, stats.statement_counts, stats.statements)
+
+    family('avs_db_statement_seconds_total', 'counter', 'Time spent executing SQL statements.')
+    for (method, endpoint), stats in items:
+        lines.append(f"avs_db_statement_seconds_total{_labels(method=method, endpoint=endpoint)} "
+                     f"{stats.statement_seconds}")
+
+    family('avs_http_request_bytes_total', 'counter', 'Request body bytes received.')
+    for (method, endpoint), stats in items:
+        lines.append(f"avs_http_request_bytes_total{_labels(method=method, endpoint=endpoint)} "
+                     f"{stats.request_bytes}")
+
+    family('avs_http_response_bytes_total', 'counter', 'Response body bytes sent (known lengths only).')
+    for (method, endpoint), stats in items:
+        lines.append(f"avs_http_response_bytes_total{_labels(method=method, endpoint=endpoint)} "
+                     f"{stats.response_bytes}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def get_metrics():
+    return current_app.extensions.get('metrics')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['metrics_started'].pop()
+    counters = getattr(_sql, 'counters', None)
+    if counters is not None:
+        counters[0] += 1
+        counters[1] += elapsed
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    started = context.connection.info.get('metrics_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def install_engine(engine):
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+
+
+def statement_counters():
+    # [statements, seconds] for the current request on this thread, or None
+    return getattr(_sql, 'counters', None)
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    _sql.counters = [0, 0.0]
+
+
+def _finish_request(response):
+    started = g.pop('metrics_started', None)
+    counters = getattr(_sql, 'counters', None)
+    _sql.counters = None
+    if started is None:
+        return response
+    rule = request.url_rule
+    get_metrics().record(
+        request.method,
+        rule.rule if rule is not None else UNMATCHED,
+        response.status_code,
+        time.perf_counter() - started,
+        counters[0] if counters else 0,
+        counters[1] if counters else 0.0,
+        request.content_length or 0,
+        response.content_length or 0,
+    )
+    return response
+
+
+def init_app(app):
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.extensions['metrics'] = MetricsRegistry(app.config.get('METRICS_DIR'))
+    from app.utils import database
+
+    for engine in database.engines(app).values():
+        install_engine(engine)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,37 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Balances and transaction amounts are stored as integer paise (1 ₹ = 100 paise)
+# so additions and SUM() are exact. The API keeps speaking rupees.
+PAISE_PER_RUPEE = 100
+
+
+def to_paise(amount):
+    if isinstance(amount, bool):
+        raise ValueError("Invalid amount")
+    try:
+        rupees = Decimal(str(amount))
+    except (InvalidOperation, ValueError):
+        raise ValueError("Invalid amount")
+    if not rupees.is_finite():
+        raise ValueError("Invalid amount")
+    return int((rupees * PAISE_PER_RUPEE).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def from_paise(paise):
+    if paise is None:
+        return None
+    return paise / PAISE_PER_RUPEE
+
+
+def parse_amount(amount):
+    # Positive request amount in paise, or None when the value is unusable or
+    # finer than a paisa (refused rather than rounded)
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        return None
+    try:
+        paise = to_paise(amount)
+    except ValueError:
+        return None
+    if Decimal(str(amount)) * PAISE_PER_RUPEE != paise:
+        return None
+    return paise if paise > 0 else None
@@ -0,0 +1,76 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from flask import Response, jsonify, request, stream_with_context
+
+# Keyset pagination: a page is "rows after the last key of the previous page",
+# so every page costs one index range scan no matter how deep the client is.
+# The body stays a plain JSON list; the cursor for the next page (if any) is
+# returned in the X-Next-Cursor header and passed back as ?cursor=.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def page_args(default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    limit = request.args.get('limit', default, type=int)
+    limit = max(1, min(limit, maximum))
+    cursor = request.args.get('cursor')
+    return (decode_cursor(cursor) if cursor else None), limit
+
+
+def date_filters(column):
+    # ?from= / ?to= as ISO dates or datetimes; a bare YYYY-MM-DD `to` runs
+    # through the end of that day. Raises ValueError on bad input.
+    conditions = []
+    if request.args.get('from'):
+        conditions.append(column >= datetime.fromisoformat(request.args['from']))
+    end = request.args.get('to')
+    if end and len(end) == 10:
+        conditions.append(column < datetime.fromisoformat(end) + timedelta(days=1))
+    elif end:
+        conditions.append(column <= datetime.fromisoformat(end))
+    return conditions
+
+
+def page_response(rows, limit, serialize, cursor_of):
+    # rows must have been fetched with LIMIT limit + 1 to detect a next page
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    response = jsonify([serialize(row) for row in rows])
+    if has_more:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(cursor_of(rows[-1]))
+    return response, 200
+
+
+def ndjson_response(rows, serialize, filename=None):
+    def generate():
+        for row in rows:
+            yield json.dumps(serialize(row)) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
@@ -0,0 +1,65 @@
+from flask import current_app
+
+from app import db
+from app.model.models import User
+from app.model.adminmodel import Admin
+from app.utils.cache import TTLCache
+
+# Tokens carry the principal type ('user' or 'admin') and role as signed
+# claims. With the principal cache enabled the role is re-read from the
+# database at most once per PRINCIPAL_CACHE_TTL seconds per worker, so a
+# deleted account loses access within the TTL; with the cache disabled the
+# signed claim alone is trusted.
+_UNKNOWN = object()
+
+
+def principal_claims(principal_type, role):
+    return {'ptype': principal_type, 'role': role}
+
+
+def get_principal_cache():
+    if not current_app.config.get('PRINCIPAL_CACHE_TTL'):
+        return None
+    cache = current_app.extensions.get('principal_cache')
+    if cache is None:
+        cache = TTLCache(
+            maxsize=current_app.config.get('PRINCIPAL_CACHE_SIZE', 1024),
+            ttl=current_app.config['PRINCIPAL_CACHE_TTL']
+        )
+        current_app.extensions['principal_cache'] = cache
+    return cache
+
+
+def invalidate_principal(principal_type, identity):
+    # Only clears this worker's cache; other workers catch up within the TTL
+    cache = get_principal_cache()
+    if cache is not None:
+        cache.pop((principal_type, str(identity)))
+
+
+def _load_role(principal_type, identity):
+    if principal_type in (None, 'user'):
+        role = db.session.query(User.role).filter_by(account_number=identity).scalar()
+        if role or principal_type == 'user':
+            return role
+    if principal_type in (None, 'admin') and str(identity).isdigit():
+        if db.session.query(Admin.id).filter_by(id=int(identity)).scalar() is not None:
+            return 'admin'
+    return None
+
+
+def resolve_role(identity, claims):
+    principal_type = claims.get('ptype')
+    cache = get_principal_cache()
+
+    if cache is None:
+        if principal_type:
+            return claims.get('role')
+        return _load_role(None, identity)  # token issued before role claims
+
+    key = (principal_type, str(identity))
+    role = cache.get(key, _UNKNOWN)
+    if role is _UNKNOWN:
+        role = _load_role(principal_type, identity)
+        cache.set(key, role)
+    return role
@@ -0,0 +1,125 @@
+import re
+import threading
+from collections import defaultdict
+
+from flask import request, request_finished, request_started
+from sqlalchemy import event
+
+# Each route declares the most SQL statements one request may issue with
+# @query_budget(n). Nothing is checked at runtime: QueryRecorder (used by the
+# test suite's query_budget fixture) captures the statements of every request
+# and reports the routes that went over, and SELECTs repeated with different
+# parameters in one request, the usual shape of an N+1 loop.
+N_PLUS_ONE_THRESHOLD = 3  # identical statements per request before it is reported
+
+_PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)'
+_IN_LIST = re.compile(rf'\bIN \({_PLACEHOLDER}(?:, ?{_PLACEHOLDER})*\)', re.IGNORECASE)
+
+
+def query_budget(max_statements):
+    def decorator(view):
+        # functools.wraps copies __dict__, so the budget survives any
+        # decorator stacked on top of this one
+        view.query_budget = max_statements
+        return view
+    return decorator
+
+
+def budget_of(view):
+    return getattr(view, 'query_budget', None)
+
+
+def normalize(statement):
+    # Same statement shape regardless of IN-list length or whitespace
+    return _IN_LIST.sub('IN (...)', ' '.join(statement.split()))
+
+
+def repeated_statements(statements, threshold=N_PLUS_ONE_THRESHOLD):
+    # [(statement, times)] for SELECTs run at least `threshold` times with
+    # different parameters; executemany batches count once. Repeated writes
+    # (e.g. one UPDATE per dashboard counter) are bounded, not per row.
+    runs = defaultdict(list)
+    for statement, parameters in statements:
+        statement = normalize(statement)
+        if statement[:6].upper() == 'SELECT':
+            runs[statement].append(repr(parameters))
+    return [
+        (statement, len(params))
+        for statement, params in runs.items()
+        if len(params) >= threshold and len(set(params)) > 1
+    ]
+
+
+class RequestQueries:
+    def __init__(self, method, path, endpoint, budget):
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.budget = budget
+        self.statements = []  # [(statement, parameters)]
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and len(self.statements) > self.budget
+
+    def describe(self):
+        return f"{self.method} {self.path} ({self.endpoint})"
+
+
+class QueryRecorder:
+    # Captures the SQL of every request handled by `app` while active
+    def __init__(self, app, engines):
+        self.app = app
+        self.engines = list(engines)
+        self.requests = []
+        self._current = threading.local()
+
+    def __enter__(self):
+        for engine in self.engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        request_started.connect(self._request_started, self.app)
+        request_finished.connect(self._request_finished, self.app)
+        return self
+
+    def __exit__(self, *exc):
+        request_finished.disconnect(self._request_finished, self.app)
+        request_started.disconnect(self._request_started, self.app)
+        for engine in self.engines:
+            event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+
+    def _request_started(self, sender, **extra):
+        # The route is not matched yet when request_started fires; the
+        # endpoint and budget are filled in when the request finishes
+        record = RequestQueries(request.method, request.full_path.rstrip('?'), None, None)
+        self._current.record = record
+        self.requests.append(record)
+
+    def _request_finished(self, sender, response, **extra):
+        record = getattr(self._current, 'record', None)
+        if record is not None:
+            record.endpoint = request.endpoint
+            record.budget = budget_of(self.app.view_functions.get(request.endpoint))
+        self._current.record = None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        record = getattr(self._current, 'record', None)
+        if record is not None:
+            record.statements.append((statement, parameters))
+
+    def unbudgeted(self):
+        return sorted({r.endpoint for r in self.requests if r.endpoint and r.budget is None})
+
+    def violations(self):
+        # Human-readable report of every request over its budget or with a
+        # likely N+1
+        report = []
+        for record in self.requests:
+            repeated = repeated_statements(record.statements)
+            if not record.over_budget and not repeated:
+                continue
+            lines = [f"{record.describe()} issued {len(record.statements)} SQL statements"
+                     + (f", budget is {record.budget}" if record.budget is not None else "")]
+            for statement, times in repeated:
+                lines.append(f"  likely N+1: {times}x {statement}")
+            report.append('\n'.join(lines))
+        return report
@@ -0,0 +1,65 @@
+import sqlite3
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.selectable import CompoundSelect
+
+# Read/write splitting for admin and reporting views. Views decorated with
+# @replica_reads send their SELECTs to the replica engine (REPLICA_DATABASE_URL)
+# while anything that writes, and every flush, stays on the primary. Replica
+# data may lag: clients that must see their own writes send
+# "X-Read-Your-Writes: 1", and code that reads in order to write wraps that
+# in `with primary():`. Without a configured replica everything is primary.
+REPLICA_ENGINE = 'read_replica'  # app.extensions key
+READ_YOUR_WRITES_HEADER = 'X-Read-Your-Writes'
+
+
+def _use_replica():
+    return has_request_context() and g.get('read_replica', False)
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and _use_replica()
+                and isinstance(clause, (Select, CompoundSelect))):
+            engine = current_app.extensions.get(REPLICA_ENGINE)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_reads(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = request.headers.get(READ_YOUR_WRITES_HEADER, '').lower() not in ('1', 'true', 'yes')
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def primary():
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('read_replica', False)
+    g.read_replica = False
+    try:
+        yield
+    finally:
+        g.read_replica = previous
+
+
+def snapshot_sqlite(source_path, target_path):
+    # Consistent online copy of a SQLite primary for use as a local stand-in
+    # replica; safe while the primary is being written to
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        with target:
+            source.backup(target)
+    finally:
+        source.close()
+        target.close()
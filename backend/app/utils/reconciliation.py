@@ -0,0 +1,139 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import distinct, func, select
+
+from app import db
+from app.model.models import User
+from app.model.transactionmodel import Transaction
+from app.utils import ledger
+from app.utils.checkpoints import SIGNED_AMOUNT
+
+try:
+    import numpy as np
+except ImportError:  # optional: the pure-Python comparison gives the same report, slower
+    np = None
+
+# Checks every stored balance against the signed sum of its ledger entries.
+# Accounts are walked in id order, one chunk at a time: one query reads the
+# chunk's balances, one GROUP BY over the (user_id, ...) index reads its ledger
+# sums, and the two are compared as int64 arrays when NumPy is available.
+CHUNK_SIZE = 50000
+MAX_REPORTED = 1000
+
+
+class ReconciliationReport:
+    def __init__(self, engine):
+        self.engine = engine  # 'numpy' or 'python'
+        self.accounts = 0
+        self.drifted = 0
+        self.net_drift_paise = 0
+        self.drifts = []  # [(user_id, balance_paise, ledger_paise)], first MAX_REPORTED
+        self.seconds = 0.0
+
+    def add(self, user_id, balance, ledger_sum):
+        self.drifted += 1
+        self.net_drift_paise += balance - ledger_sum
+        if len(self.drifts) < MAX_REPORTED:
+            self.drifts.append((user_id, balance, ledger_sum))
+
+    def as_dict(self):
+        return {
+            "accounts": self.accounts,
+            "drifted": self.drifted,
+            "net_drift_paise": self.net_drift_paise,
+            "drifts": [
+                {"user_id": user_id, "balance_paise": balance, "ledger_paise": ledger_sum,
+                 "drift_paise": balance - ledger_sum}
+                for user_id, balance, ledger_sum in self.drifts
+            ],
+            "drifts_truncated": self.drifted > len(self.drifts),
+            "seconds": round(self.seconds, 3),
+            "engine": self.engine,
+        }
+
+
+def _chunks(chunk_size):
+    # Yields ([(user_id, balance_paise)], [(user_id, ledger_paise)]) in id order
+    after = 0
+    while True:
+        balances = db.session.execute(
+            select(User.id, User.balance_paise).where(User.id > after).order_by(User.id).limit(chunk_size)
+        ).all()
+        if not balances:
+            return
+        first, last = balances[0][0], balances[-1][0]
+        sums = db.session.execute(
+            select(Transaction.user_id, func.sum(SIGNED_AMOUNT))
+            .where(Transaction.user_id.between(first, last))
+            .group_by(Transaction.user_id)
+        ).all()
+        yield balances, sums
+        after = last
+
+
+def _compare_numpy(balances, sums):
+    accounts = np.array(balances, dtype=np.int64).reshape(-1, 2)
+    ids, stored = accounts[:, 0], accounts[:, 1]
+    ledger_sums = np.zeros(len(ids), dtype=np.int64)
+    if sums:
+        posted = np.array(sums, dtype=np.int64).reshape(-1, 2)
+        # ids are sorted; entries of ids missing from the chunk (deleted
+        # accounts) are dropped by the equality check
+        slots = np.searchsorted(ids, posted[:, 0])
+        slots = np.minimum(slots, len(ids) - 1)
+        known = ids[slots] == posted[:, 0]
+        ledger_sums[slots[known]] = posted[known, 1]
+    bad = np.flatnonzero(stored != ledger_sums)
+    return [(int(ids[i]), int(stored[i]), int(ledger_sums[i])) for i in bad]
+
+
+def _compare_python(balances, sums):
+    ledger_sums = dict(sums)
+    return [
+        (user_id, balance, ledger_sums.get(user_id, 0))
+        for user_id, balance in balances
+        if balance != ledger_sums.get(user_id, 0)
+    ]
+
+
+def reconcile(chunk_size=CHUNK_SIZE, use_numpy=None):
+    use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+    compare = _compare_numpy if use_numpy else _compare_python
+    report = ReconciliationReport('numpy' if use_numpy else 'python')
+    started = time.perf_counter()
+    for balances, sums in _chunks(chunk_size):
+        report.accounts += len(balances)
+        for user_id, balance, ledger_sum in compare(balances, sums):
+            report.add(user_id, balance, ledger_sum)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def backfill_openings(chunk_size=CHUNK_SIZE):
+    # One-off for accounts opened before openings were posted: gives every
+    # account without an opening entry one for the amount its ledger is
+    # missing, dated at account creation. Accounts that already have an
+    # opening entry are left alone, so real drift on them stays visible.
+    posted = 0
+    for balances, sums in _chunks(chunk_size):
+        first, last = balances[0][0], balances[-1][0]
+        opened = set(db.session.execute(
+            select(distinct(Transaction.user_id))
+            .where(Transaction.user_id.between(first, last),
+                   Transaction.description.in_(ledger.OPENING_DESCRIPTIONS))
+        ).scalars())
+        missing = [(user_id, balance, ledger_sum) for user_id, balance, ledger_sum in _compare_python(balances, sums)
+                   if user_id not in opened]
+        if not missing:
+            continue
+        created_at = dict(db.session.execute(
+            select(User.id, User.created_at).where(User.id.in_([user_id for user_id, _, _ in missing]))
+        ).all())
+        posted += ledger.post(
+            ledger.entry(user_id, balance - ledger_sum, ledger.OPENING_BACKFILLED,
+                         created_at.get(user_id) or datetime.utcnow())
+            for user_id, balance, ledger_sum in missing
+        )
+        db.session.commit()
+    return posted
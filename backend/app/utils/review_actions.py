@@ -0,0 +1,125 @@
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.model.kyc_request_model import KYCUpdateRequest
+from app.model.models import User
+from app.model.update_request_model import UserUpdateRequest
+from app.utils import dashboard_stats
+
+# Approve/reject many KYC or profile-update requests in one transaction. The
+# targets are loaded with a single query, new phone/email values are checked
+# against the database with one IN query per column, and the caller gets a
+# result per id. Single-request endpoints go through the same code.
+ACTIONS = {'approve': 'approved', 'reject': 'rejected'}
+MAX_BATCH_IDS = 1000
+UNIQUE_FIELDS = {
+    'phone': "Phone number already registered",
+    'email': "Email already registered",
+}
+NOT_FOUND = "Request not found or already processed"
+
+
+def parse_batch(data):
+    # Returns (ids, action, error)
+    data = data if isinstance(data, dict) else {}
+    ids, action = data.get('ids'), data.get('action')
+    if action not in ACTIONS:
+        return None, None, "Invalid action"
+    if not isinstance(ids, list) or not ids:
+        return None, None, "A non-empty list of ids is required"
+    if len(ids) > MAX_BATCH_IDS:
+        return None, None, f"At most {MAX_BATCH_IDS} ids per batch"
+    if any(isinstance(i, bool) or not isinstance(i, int) for i in ids):
+        return None, None, "ids must be integers"
+    return list(dict.fromkeys(ids)), action, None
+
+
+def _load_pending(model, ids, with_user=False):
+    query = select(model).where(model.id.in_(ids), model.status == 'pending')
+    if with_user:
+        query = query.options(joinedload(model.user))
+    return {r.id: r for r in db.session.execute(query).scalars()}
+
+
+def _result(request_id, status, msg=None):
+    result = {"id": request_id, "status": status}
+    if msg:
+        result["msg"] = msg
+    return result
+
+
+def _taken_values(requests):
+    # {(field, value): owner user id} for every unique value being approved
+    wanted = {}
+    for r in requests:
+        if r.field in UNIQUE_FIELDS and r.new_value:
+            wanted.setdefault(r.field, set()).add(r.new_value)
+    taken = {}
+    for field, values in wanted.items():
+        column = getattr(User, field)
+        for user_id, value in db.session.execute(select(User.id, column).where(column.in_(values))):
+            taken[(field, value)] = user_id
+    return taken
+
+
+def process_update_requests(ids, action):
+    pending = _load_pending(UserUpdateRequest, ids, with_user=(action == 'approve'))
+    taken = _taken_values(pending.values()) if action == 'approve' else {}
+
+    results, touched, deltas = [], set(), []
+    for request_id in ids:
+        req = pending.get(request_id)
+        if req is None:
+            results.append(_result(request_id, 'error', NOT_FOUND))
+            continue
+
+        if action == 'approve':
+            owner = taken.get((req.field, req.new_value))
+            if req.field in UNIQUE_FIELDS and owner not in (None, req.user_id):
+                results.append(_result(request_id, 'error', UNIQUE_FIELDS[req.field]))
+                continue
+            user = req.user
+            if req.field in UNIQUE_FIELDS:
+                # Later ids in the batch conflict with this one. Values freed by
+                # this change are not reused in the same batch: the flush order
+                # of the UPDATEs could trip the unique index.
+                taken[(req.field, req.new_value)] = user.id
+            before = dashboard_stats.snapshot(user)
+            setattr(user, req.field, req.new_value)
+            deltas.append(dashboard_stats.diff(before, dashboard_stats.snapshot(user)))
+
+        req.status = ACTIONS[action]
+        touched.add(req.user_id)
+        results.append(_result(request_id, ACTIONS[action]))
+
+    if deltas:
+        dashboard_stats.apply(dashboard_stats.combine(*deltas), shard_key=min(touched))
+    if touched:
+        User.touch(*touched)
+    db.session.commit()
+    return results
+
+
+def process_kyc_requests(ids, action):
+    pending = _load_pending(KYCUpdateRequest, ids)
+
+    results, touched = [], set()
+    for request_id in ids:
+        req = pending.get(request_id)
+        if req is None:
+            results.append(_result(request_id, 'error', NOT_FOUND))
+            continue
+        req.status = ACTIONS[action]
+        touched.add(req.user_id)
+        results.append(_result(request_id, ACTIONS[action]))
+
+    if touched:
+        User.touch(*touched)
+    db.session.commit()
+    return results
+
+
+def summary(results):
+    failed = sum(1 for r in results if r['status'] == 'error')
+    return {"processed": len(results) - failed, "failed": failed, "results": results}
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from flask import jsonify, request
+from sqlalchemy import select, tuple_
+
+from app import db
+from app.model.models import User
+from app.utils import pagination
+
+# Oldest-first admin review queues (KYC and profile update requests). A page
+# is a single query: the request rows joined to their owner's account number,
+# read as a range scan on the model's (status, timestamp, id) index.
+STATUSES = ('pending', 'approved', 'rejected')
+
+
+def queue_response(model, serialize):
+    # serialize(request_row, account_number) -> dict
+    try:
+        cursor, limit = pagination.page_args()
+        dates = pagination.date_filters(model.timestamp)
+        if cursor:
+            cursor_key = (datetime.fromisoformat(cursor[0]), int(cursor[1]))
+    except (ValueError, TypeError, IndexError):
+        return jsonify({"msg": "Invalid cursor or date filter"}), 400
+
+    status = request.args.get('status', 'pending')
+    if status not in STATUSES:
+        return jsonify({"msg": f"status must be one of {', '.join(STATUSES)}"}), 400
+
+    query = (
+        select(model, User.account_number)
+        .outerjoin(User, model.user_id == User.id)
+        .where(model.status == status, *dates)
+    )
+    if cursor:
+        query = query.where(tuple_(model.timestamp, model.id) > cursor_key)
+    query = query.order_by(model.timestamp, model.id).limit(limit + 1)
+
+    rows = db.session.execute(query).all()
+    return pagination.page_response(
+        rows, limit,
+        lambda row: serialize(*row),
+        lambda row: [row[0].timestamp.isoformat(sep=' '), row[0].id]
+    )
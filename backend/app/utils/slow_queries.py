@@ -0,0 +1,83 @@
+import logging
+import time
+
+from sqlalchemy import event
+
+# Development aid: statements slower than SLOW_QUERY_MS are logged with their
+# parameters and the database's query plan, so a missing index shows up as a
+# table scan next to the statement that needed it. Off unless configured.
+log = logging.getLogger(__name__)
+
+EXPLAIN_PREFIX = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+    'mariadb': 'EXPLAIN ',
+}
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def explain(conn, statement, parameters):
+    prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip()[:6].upper().startswith(EXPLAINABLE):
+        return None
+    # Servers abort the whole transaction on a failed statement; the
+    # savepoint keeps a failed EXPLAIN from taking the request down with it
+    savepoint = conn.dialect.name != 'sqlite'
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            raise
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    finally:
+        cursor.close()
+    if conn.dialect.name == 'sqlite':
+        # (id, parent, notused, detail)
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(' | '.join(str(column) for column in row) for row in rows)
+
+
+def install(engine, threshold_ms):
+    threshold = threshold_ms / 1000
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def log_slow_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['slow_query_started'].pop()
+        if elapsed < threshold:
+            return
+        plan = None
+        if not executemany:
+            try:
+                plan = explain(conn, statement, parameters)
+            except Exception as exc:  # the plan is a nicety; never fail the query
+                plan = f"(EXPLAIN failed: {exc})"
+        log.warning("Slow query (%.1f ms): %s\nparameters: %r\nplan:\n%s",
+                    elapsed * 1000, ' '.join(statement.split()), parameters, plan or '(not available)')
+
+    @event.listens_for(engine, 'handle_error')
+    def discard_timer(context):
+        started = context.connection.info.get('slow_query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def init_app(app):
+    threshold_ms = app.config.get('SLOW_QUERY_MS')
+    if threshold_ms is None:
+        return
+    from app.utils import database
+
+    for engine in database.engines(app).values():
+        install(engine, threshold_ms)
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from flask import jsonify, request
+from sqlalchemy import select, tuple_
+
+from app import db
+from app.model.transactionmodel import Transaction
+from app.utils import pagination
+
+# Newest-first history pages for one account. Every page is a range scan on
+# ix_transaction_user_timestamp_id: (user_id, timestamp, id) < cursor.
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+TRANSACTION_TYPES = ('credit', 'debit')
+
+
+def transaction_json(txn):
+    return {
+        "id": txn.id,
+        "amount": txn.amount,
+        "type": txn.type,
+        "description": txn.description,
+        "timestamp": txn.timestamp.strftime(TIMESTAMP_FORMAT)
+    }
+
+
+def history_response(user_id, default_limit=pagination.DEFAULT_PAGE_SIZE):
+    try:
+        cursor, limit = pagination.page_args(default=default_limit)
+        dates = pagination.date_filters(Transaction.timestamp)
+        if cursor:
+            cursor_key = (datetime.fromisoformat(cursor[0]), int(cursor[1]))
+    except (ValueError, TypeError, IndexError):
+        return jsonify({"msg": "Invalid cursor or date filter"}), 400
+
+    txn_type = request.args.get('type')
+    if txn_type and txn_type not in TRANSACTION_TYPES:
+        return jsonify({"msg": "type must be credit or debit"}), 400
+
+    query = select(Transaction).where(Transaction.user_id == user_id, *dates)
+    if txn_type:
+        query = query.where(Transaction.type == txn_type)
+    if cursor:
+        query = query.where(tuple_(Transaction.timestamp, Transaction.id) < cursor_key)
+
+    query = query.order_by(Transaction.timestamp.desc(), Transaction.id.desc()).limit(limit + 1)
+    rows = db.session.execute(query).scalars().all()
+    return pagination.page_response(
+        rows, limit, transaction_json,
+        lambda txn: [txn.timestamp.isoformat(sep=' '), txn.id]
+    )
@@ -0,0 +1,182 @@
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.model.models import User
+from app.model.transactionmodel import Transaction
+from app.utils import checkpoints, dashboard_stats
+
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 0.02
+
+# Lowercased fragments of driver messages that mean "try the transaction again"
+RETRYABLE_ERRORS = (
+    'database is locked',       # SQLite busy
+    'database table is locked',
+    'deadlock',                 # PostgreSQL / MySQL
+    'could not serialize',
+    'lock wait timeout',
+)
+
+
+# All amounts and balances handled here are integer paise (see app.utils.money)
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+def is_retryable(exc):
+    message = str(getattr(exc, 'orig', exc)).lower()
+    return any(fragment in message for fragment in RETRYABLE_ERRORS)
+
+
+def run_in_transaction(work, *args, **kwargs):
+    # Runs work() and commits; on deadlock/busy errors the whole unit is rolled
+    # back and replayed with jittered exponential backoff.
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            result = work(*args, **kwargs)
+            db.session.commit()
+            return result
+        except OperationalError as exc:
+            db.session.rollback()
+            if attempt == MAX_ATTEMPTS or not is_retryable(exc):
+                raise
+            time.sleep(BACKOFF_SECONDS * (2 ** (attempt - 1)) * (1 + random.random()))
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def credit(user_id, amount):
+    db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(balance_paise=User.balance_paise + amount)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def debit(user_id, amount):
+    result = db.session.execute(
+        update(User)
+        .where(User.id == user_id, User.balance_paise >= amount)
+        .values(balance_paise=User.balance_paise - amount)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise InsufficientFunds()
+
+
+def _deposit(user_id, amount):
+    credit(user_id, amount)
+    dashboard_stats.record_balance_change(user_id, amount)
+    db.session.add(Transaction(user_id=user_id, amount_paise=amount, type='credit', description='Deposit'))
+    return checkpoints.record([user_id])[user_id]
+
+
+def _withdraw(user_id, amount):
+    debit(user_id, amount)
+    dashboard_stats.record_balance_change(user_id, -amount)
+    db.session.add(Transaction(user_id=user_id, amount_paise=amount, type='debit', description='Withdrawal'))
+    return checkpoints.record([user_id])[user_id]
+
+
+def _transfer(sender_id, sender_account, recipient_id, recipient_account, amount):
+    # Row locks are always taken in ascending id order so two opposite
+    # transfers between the same pair of accounts can never deadlock.
+    for user_id in sorted((sender_id, recipient_id)):
+        if user_id == sender_id:
+            debit(sender_id, amount)
+        else:
+            credit(recipient_id, amount)
+
+    db.session.add_all([
+        Transaction(
+            user_id=sender_id,
+            amount_paise=amount,
+            type='debit',
+            description=f'Transfer to {recipient_account}'
+        ),
+        Transaction(
+            user_id=recipient_id,
+            amount_paise=amount,
+            type='credit',
+            description=f'Transfer from {sender_account}'
+        ),
+    ])
+    return checkpoints.record([sender_id, recipient_id])[sender_id]
+
+
+def _transfer_batch(sender_id, sender_account, payments):
+    # payments: [(recipient_id, recipient_account, amount), ...]
+    credits = {}
+    for recipient_id, _, amount in payments:
+        credits[recipient_id] = credits.get(recipient_id, 0) + amount
+    total = sum(amount for _, _, amount in payments)
+
+    # Same lock order as _transfer: lower ids first, sender debited in its slot
+    before = [{'rid': rid, 'amt': amt} for rid, amt in sorted(credits.items()) if rid < sender_id]
+    after = [{'rid': rid, 'amt': amt} for rid, amt in sorted(credits.items()) if rid > sender_id]
+    credit_stmt = (
+        update(User.__table__)
+        .where(User.__table__.c.id == bindparam('rid'))
+        .values(balance_paise=User.__table__.c.balance_paise + bindparam('amt'))
+    )
+    if before:
+        db.session.execute(credit_stmt, before)
+    debit(sender_id, total)
+    if after:
+        db.session.execute(credit_stmt, after)
+
+    # One timestamp for the whole batch: the debit limits count it as one debit
+    now = datetime.utcnow()
+    rows = []
+    for recipient_id, recipient_account, amount in payments:
+        rows.append({
+            'user_id': sender_id,
+            'amount_paise': amount,
+            'type': 'debit',
+            'description': f'Transfer to {recipient_account}',
+            'timestamp': now,
+        })
+        rows.append({
+            'user_id': recipient_id,
+            'amount_paise': amount,
+            'type': 'credit',
+            'description': f'Transfer from {sender_account}',
+            'timestamp': now,
+        })
+    db.session.execute(insert(Transaction), rows)
+    return checkpoints.record([sender_id, *credits])[sender_id]
+
+
+def deposit(user, amount):
+    return run_in_transaction(_deposit, user.id, amount)
+
+
+def withdraw(user, amount):
+    return run_in_transaction(_withdraw, user.id, amount)
+
+
+def transfer(sender, recipient, amount):
+    return run_in_transaction(
+        _transfer,
+        sender.id, sender.account_number,
+        recipient.id, recipient.account_number,
+        amount
+    )
+
+
+def transfer_batch(sender, payments):
+    # payments: [(recipient, amount), ...] with recipients already resolved
+    return run_in_transaction(
+        _transfer_batch,
+        sender.id, sender.account_number,
+        [(recipient.id, recipient.account_number, amount) for recipient, amount in payments]
+    )
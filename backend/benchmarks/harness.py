@@ -0,0 +1,392 @@
+import http.client
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert, select
+import serve
+from app import create_app, db
+from app.model.adminmodel import Admin
+from app.model.models import User
+from app.model.transactionmodel import Transaction
+from app.utils import dashboard_stats, ledger
+from app.utils.account_numbers import allocate_account_numbers
+from app.utils.hashing import hash_password
+from app.utils.principals import principal_claims
+
+# Drives the real application with a weighted mix of customer and admin
+# calls and reports throughput and latency percentiles per endpoint. The same
+# scenario runs in-process (Flask test client: application cost only) or over
+# HTTP against the production prefork server (serve.py) or any running
+# deployment.
+PASSWORD = 'Bench#1234'
+ADMIN_USERNAME = 'bench-admin'
+DEFAULT_MIX = {
+    'profile': 30,
+    'deposit': 10,
+    'withdraw': 10,
+    'transfer': 15,
+    'login': 8,
+    'register': 2,
+    'admin_dashboard': 10,
+    'admin_users': 15,
+}
+SEED_CHUNK = 5000
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+class Dataset:
+    def __init__(self, accounts, user_tokens, admin_token):
+        self.accounts = accounts  # [(account_number, phone)]
+        self.user_tokens = user_tokens  # {account_number: token}
+        self.admin_token = admin_token
+        self.run_id = random.randrange(10000)
+        self._registrations = itertools.count()
+
+    def next_registration(self):
+        return next(self._registrations)
+
+
+def make_app(config):
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(app, customers=1000, transactions_per_customer=20, rng_seed=42):
+    # Bulk-inserts customers (sharing one password hash), a transaction
+    # history and an admin, then hands out long-lived tokens
+    rng = random.Random(rng_seed)
+    with app.app_context():
+        password_hash = hash_password(PASSWORD)
+        start = db.session.query(db.func.count(User.id)).scalar()
+        numbers = allocate_account_numbers(customers)
+        rows = []
+        for n, account_number in enumerate(numbers, start=start):
+            rows.append({
+                'name': f'Bench Customer {n}',
+                'phone': f'7{n:09d}',
+                'gender': rng.choice(['Male', 'Female']),
+                'dob': '1990-01-01',
+                'adhaar': f'5{n:011d}',
+                'pan': f'BN{n:07d}X',
+                'account_type': rng.choice(['savings', 'current']),
+                'balance_paise': rng.randint(10_000_00, 1_000_000_00),
+                'password_hash': password_hash,
+                'role': 'user',
+                'type_of_account': 'individual',
+                'account_number': account_number,
+            })
+        for i in range(0, len(rows), SEED_CHUNK):
+            db.session.execute(insert(User), rows[i:i + SEED_CHUNK])
+
+        accounts = db.session.execute(
+            select(User.id, User.account_number, User.phone).where(User.account_number.in_(numbers))
+        ).all()
+        now = datetime.utcnow()
+        balances = {row['account_number']: row['balance_paise'] for row in rows}
+        history = []
+        for user_id, account_number, _ in accounts:
+            # The opening entry makes the seeded ledger add up to the balance
+            net = 0
+            for _ in range(transactions_per_customer):
+                entry = ledger.entry(user_id, rng.choice([1, -1]) * rng.randint(100, 50_000_00), 'Seeded',
+                                     now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)))
+                net += entry['amount_paise'] if entry['type'] == 'credit' else -entry['amount_paise']
+                history.append(entry)
+            history.append(ledger.entry(user_id, balances[account_number] - net, ledger.OPENING,
+                                        now - timedelta(days=91)))
+            if len(history) >= SEED_CHUNK:
+                db.session.execute(insert(Transaction), history)
+                history = []
+        if history:
+            db.session.execute(insert(Transaction), history)
+
+        admin = Admin.query.filter_by(username=ADMIN_USERNAME).first()
+        if admin is None:
+            admin = Admin(username=ADMIN_USERNAME, name='Benchmark Admin', password_hash=password_hash)
+            db.session.add(admin)
+        db.session.commit()
+        dashboard_stats.rebuild()
+
+        user_tokens = {
+            account_number: create_access_token(
+                identity=account_number,
+                additional_claims=principal_claims('user', 'user'),
+                expires_delta=False
+            )
+            for _, account_number, _ in accounts
+        }
+        admin_token = create_access_token(
+            identity=str(admin.id),
+            additional_claims=principal_claims('admin', 'admin'),
+            expires_delta=False
+        )
+        # Forked server workers must not inherit the seeding connections
+        db.session.remove()
+        db.engine.dispose()
+
+    return Dataset([(a, p) for _, a, p in accounts], user_tokens, admin_token)
+
+
+# Each operation returns (method, path, json_body, headers)
+
+def _customer(dataset, rng):
+    account_number, phone = rng.choice(dataset.accounts)
+    return account_number, phone, {'Authorization': f'Bearer {dataset.user_tokens[account_number]}'}
+
+
+def _op_profile(dataset, rng):
+    _, _, headers = _customer(dataset, rng)
+    return 'GET', '/profile', None, headers
+
+
+def _op_deposit(dataset, rng):
+    _, _, headers = _customer(dataset, rng)
+    return 'POST', '/deposit', {'amount': rng.randint(1, 5000)}, headers
+
+
+def _op_withdraw(dataset, rng):
+    _, _, headers = _customer(dataset, rng)
+    return 'POST', '/withdraw', {'amount': rng.randint(1, 500)}, headers
+
+
+def _op_transfer(dataset, rng):
+    sender, _, headers = _customer(dataset, rng)
+    recipient = sender
+    while recipient == sender:
+        recipient = rng.choice(dataset.accounts)[0]
+    return 'POST', '/transfer', {'amount': rng.randint(1, 500), 'recipient_account': recipient}, headers
+
+
+def _op_login(dataset, rng):
+    _, phone, _ = _customer(dataset, rng)
+    return 'POST', '/login', {'phone': phone, 'password': PASSWORD}, {}
+
+
+def _base36(n, width):
+    digits = ''
+    while n:
+        n, d = divmod(n, 36)
+        digits = DIGITS[d] + digits
+    return digits.rjust(width, '0')
+
+
+def _op_register(dataset, rng):
+    n = dataset.next_registration()
+    run = dataset.run_id
+    return 'POST', '/register', {
+        'name': f'Bench Signup {n}',
+        'phone': f'6{run:04d}{n:06d}',
+        'gender': rng.choice(['Male', 'Female']),
+        'dob': '1995-05-05',
+        'adhaar': f'6{run:04d}{n:07d}',
+        'pan': f'R{_base36(run * 36 ** 5 + n, 8)}X',  # distinct for 60M signups per run
+        'account_type': 'savings',
+        'initial_balance': 1000,
+        'type_of_account': 'individual',
+        'password': PASSWORD,
+        'confirm_password': PASSWORD,
+    }, {}
+
+
+def _op_admin_dashboard(dataset, rng):
+    return 'GET', '/admin/dashboard', None, {'Authorization': f'Bearer {dataset.admin_token}'}
+
+
+def _op_admin_users(dataset, rng):
+    return 'GET', '/admin/users?limit=100', None, {'Authorization': f'Bearer {dataset.admin_token}'}
+
+
+OPERATIONS = {
+    'profile': _op_profile,
+    'deposit': _op_deposit,
+    'withdraw': _op_withdraw,
+    'transfer': _op_transfer,
+    'login': _op_login,
+    'register': _op_register,
+    'admin_dashboard': _op_admin_dashboard,
+    'admin_users': _op_admin_users,
+}
+
+
+class TestClientDriver:
+    # In-process: measures the application without sockets or HTTP parsing
+    __test__ = False  # not a pytest class
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=headers or {})
+        response.close()
+        return response.status_code
+
+
+class HTTPDriver:
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            payload = json.dumps(body) if body is not None else None
+            conn.request(method, path, body=payload, headers={'Content-Type': 'application/json', **(headers or {})})
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        finally:
+            conn.close()
+
+
+def _arbiter(listener, config, workers):
+    # The benchmark's server process is the production master (serve.py)
+    arbiter = serve.Arbiter(lambda: serve.load_app(True, config), listener, workers=workers)
+    raise SystemExit(arbiter.run())
+
+
+class LocalServer:
+    # serve.Arbiter in a child process: `workers` preforked processes sharing
+    # one listening socket, exactly as in production. Debit limits and metrics
+    # are shared through the config's LIMITS_STORE and METRICS_DIR.
+    def __init__(self, config, workers=4):
+        self.config = config
+        self.workers = workers
+        self.process = None
+
+    def __enter__(self):
+        listener = serve.bind('127.0.0.1', 0)
+        self.url = f'http://127.0.0.1:{listener.getsockname()[1]}'
+        context = multiprocessing.get_context('fork')
+        self.process = context.Process(target=_arbiter, args=(listener, self.config, self.workers))
+        self.process.start()
+        listener.close()  # the arbiter has its own copy
+        self._wait_ready()
+        return self
+
+    def _wait_ready(self, timeout=30):
+        driver = HTTPDriver(self.url, timeout=1)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                driver.request('GET', '/profile')
+                return
+            except OSError:
+                if time.monotonic() > deadline or not self.process.is_alive():
+                    raise
+                time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        self.process.terminate()  # SIGTERM: graceful shutdown of the arbiter and its workers
+        self.process.join(35)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+def run(driver, dataset, mix=None, requests=1000, concurrency=8, rng_seed=1):
+    mix = mix or DEFAULT_MIX
+    names, weights = list(mix), list(mix.values())
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    lock = threading.Lock()
+    issued = itertools.count()
+
+    def worker(n):
+        rng = random.Random(rng_seed + n)
+        while next(issued) < requests:
+            name = rng.choices(names, weights)[0]
+            method, path, body, headers = OPERATIONS[name](dataset, rng)
+            start = time.perf_counter()
+            try:
+                status = driver.request(method, path, body, headers)
+            except OSError:
+                status = 'connection error'
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[name].append(elapsed)
+                statuses[name][status] += 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return summarize(latencies, statuses, wall)
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile of an unsorted list
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _is_error(status):
+    return not isinstance(status, int) or status >= 500
+
+
+def summarize(latencies, statuses, wall):
+    endpoints = {}
+    for name, values in sorted(latencies.items()):
+        endpoints[name] = {
+            'requests': len(values),
+            'rps': round(len(values) / wall, 2),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'errors': sum(n for status, n in statuses[name].items() if _is_error(status)),
+            'statuses': {str(status): n for status, n in sorted(statuses[name].items(), key=str)},
+        }
+    total = sum(e['requests'] for e in endpoints.values())
+    return {
+        'wall_seconds': round(wall, 3),
+        'requests': total,
+        'rps': round(total / wall, 2) if wall else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+def compare(report, baseline, tolerance=0.2):
+    # Regressions against a saved report: an endpoint's p95 grew, or its
+    # throughput dropped, by more than `tolerance`
+    regressions = []
+    for name, base in baseline.get('endpoints', {}).items():
+        current = report['endpoints'].get(name)
+        if current is None:
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms > baseline {base['p95_ms']}ms")
+        if current['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: {current['rps']} req/s < baseline {base['rps']} req/s")
+        if current['errors'] > base.get('errors', 0):
+            regressions.append(f"{name}: {current['errors']} errors (baseline {base.get('errors', 0)})")
+    return regressions
+
+
+def format_report(report):
+    lines = [f"{'endpoint':<16} {'requests':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"]
+    for name, e in report['endpoints'].items():
+        lines.append(
+            f"{name:<16} {e['requests']:>8} {e['rps']:>9.1f} {e['p50_ms']:>9.2f} "
+            f"{e['p95_ms']:>9.2f} {e['p99_ms']:>9.2f} {e['errors']:>7}"
+        )
+    lines.append(f"total: {report['requests']} requests in {report['wall_seconds']}s = {report['rps']} req/s")
+    return '\n'.join(lines)
@@ -1,5 +1,62 @@
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
 class Config:
     SECRET_KEY = 'your-secret-key'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///bank.db'
+    # e.g. postgresql+psycopg2://bank:secret@db/bank; relative SQLite paths live in instance/
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///bank.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Admin/reporting reads go here when set (see app/utils/read_replica.py)
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    # SQLite connections (applied by a connect event on every pooled connection)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    SQLITE_MMAP_SIZE = _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    # Server databases (PostgreSQL/MySQL) connection pool, per worker process
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 20)
+    DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 30)
+    DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)
+    DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)
     JWT_SECRET_KEY = 'your-jwt-secret'
+    ACCOUNT_NUMBER_BLOCK_SIZE = 20  # account numbers reserved per worker at a time
+    PRINCIPAL_CACHE_TTL = 60  # seconds; 0 trusts the signed role claim without rechecking
+    PRINCIPAL_CACHE_SIZE = 1024
+    PASSWORD_HASH_METHOD = 'scrypt'  # any werkzeug method, e.g. 'pbkdf2:sha256:600000'
+    PASSWORD_HASH_SALT_LENGTH = 16
+    PASSWORD_HASH_EXECUTOR = 'thread'  # or 'process'
+    PASSWORD_HASH_WORKERS = 4
+    PASSWORD_HASH_MAX_PENDING = 32  # hashes in flight before /login answers 503
+    PASSWORD_HASH_TIMEOUT = 30
+    DASHBOARD_COUNTER_SHARDS = 8
+    KYC_STORAGE_DIR = None  # defaults to app/uploads/kyc
+    KYC_MAX_FILE_SIZE = 5 * 1024 * 1024
+    KYC_DERIVATIVE_WORKERS = 2  # thumbnail/preview threads per worker process (needs Pillow)
+    KYC_DOCUMENT_MAX_AGE = 86400  # browser cache for served documents; content-addressed, so safe
+    IDEMPOTENCY_TTL = 86400  # seconds an Idempotency-Key outcome is replayed
+    IDEMPOTENCY_CACHE_SIZE = 10000  # outcomes kept in memory per worker process
+    METRICS_ENABLED = _env_bool('METRICS_ENABLED', True)  # per-route timings at /admin/metrics
+    METRICS_DIR = os.environ.get('METRICS_DIR')  # shared by worker processes to report combined totals
+    SLOW_QUERY_MS = _env_int('SLOW_QUERY_MS', None)  # development: log slower statements with their plan
+    # Customer debits (withdrawals, outgoing transfers) per account type: rupees per
+    # rolling 24 hours and debits per rolling minute; other account types are unlimited
+    DEBIT_LIMITS = {
+        'savings': {'daily_amount': 100000, 'per_minute': 10},
+        'current': {'daily_amount': 1000000, 'per_minute': 30},
+    }
+    # SQLite file shared by the worker processes (relative paths in the instance
+    # folder); ':memory:' keeps usage per process, for a single process only
+    LIMITS_STORE = os.environ.get('LIMITS_STORE', 'debit_limits.db')
@@ -1,9 +1,11 @@
-from app import create_app, db
-from app.model.adminmodel import Admin
-app = create_app()
+from app import create_app
 
-with app.app_context():
-    db.create_all()
+# Development server. Create the tables first with scripts/init_db.py; in
+# production run serve.py (prefork workers) instead.
+app = create_app()
 
 if __name__ == '__main__':
+    from app.utils import database
+
+    print('\n'.join(database.report(app)))
     app.run(debug=True)
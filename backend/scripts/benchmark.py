@@ -0,0 +1,96 @@
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import tempfile
+
+from benchmarks import harness
+
+# Seeds a throwaway database, drives the API with a weighted request mix and
+# prints per-endpoint throughput and latency percentiles. With --baseline the
+# run exits non-zero when an endpoint regresses beyond --tolerance.
+#
+#   python scripts/benchmark.py --mode client --customers 2000 --requests 5000
+#   python scripts/benchmark.py --mode server --workers 4 --save-baseline bench.json
+#   python scripts/benchmark.py --mode server --baseline bench.json
+
+
+def parse_mix(value):
+    # "profile=30,transfer=10" -> {'profile': 30, 'transfer': 10}
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in harness.OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+parser = argparse.ArgumentParser(description="Benchmark the banking API.")
+parser.add_argument('--mode', choices=['client', 'server', 'url'], default='client',
+                    help="client: in-process test client; server: serve.py's prefork server; "
+                         "url: an already running deployment (--url)")
+parser.add_argument('--url', help="base URL for --mode url; pass that deployment's --database-url so the "
+                                   "seeded accounts and tokens are valid there")
+parser.add_argument('--workers', type=int, default=4, help="server processes for --mode server")
+parser.add_argument('--database-url', help="database to seed (default: a temporary SQLite file)")
+parser.add_argument('--hash-method', default='pbkdf2:sha256:1000',
+                    help="password hash for seeded and registered users; production cost makes "
+                         "login and register dominate the run")
+parser.add_argument('--customers', type=int, default=1000)
+parser.add_argument('--transactions', type=int, default=20, help="history rows per customer")
+parser.add_argument('--requests', type=int, default=2000)
+parser.add_argument('--concurrency', type=int, default=8)
+parser.add_argument('--mix', type=parse_mix, default=harness.DEFAULT_MIX)
+parser.add_argument('--seed', type=int, default=42)
+parser.add_argument('--json', action='store_true', help="print the report as JSON")
+parser.add_argument('--baseline', help="report to compare against")
+parser.add_argument('--tolerance', type=float, default=0.2)
+parser.add_argument('--save-baseline', help="write this run's report to a file")
+args = parser.parse_args()
+
+workdir = tempfile.mkdtemp(prefix='avs-bench-')
+config = {
+    'SQLALCHEMY_DATABASE_URI': args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+    'PASSWORD_HASH_METHOD': args.hash_method,
+    'KYC_STORAGE_DIR': os.path.join(workdir, 'kyc'),
+    # Shared by the server's workers, as serve.py expects in production
+    'LIMITS_STORE': os.path.join(workdir, 'debit_limits.db'),
+    'METRICS_DIR': os.path.join(workdir, 'metrics'),
+}
+
+app = harness.make_app(config)
+print(f"Seeding {args.customers} customers x {args.transactions} transactions ...", file=sys.stderr)
+dataset = harness.seed(app, args.customers, args.transactions, args.seed)
+
+print(f"Running {args.requests} requests, concurrency {args.concurrency}, mode {args.mode} ...", file=sys.stderr)
+if args.mode == 'client':
+    report = harness.run(harness.TestClientDriver(app), dataset, args.mix, args.requests, args.concurrency, args.seed)
+elif args.mode == 'server':
+    with harness.LocalServer(config, args.workers) as server:
+        report = harness.run(harness.HTTPDriver(server.url), dataset, args.mix, args.requests,
+                             args.concurrency, args.seed)
+else:
+    if not args.url:
+        parser.error("--mode url requires --url")
+    report = harness.run(harness.HTTPDriver(args.url), dataset, args.mix, args.requests, args.concurrency, args.seed)
+
+report['mode'] = args.mode
+print(json.dumps(report, indent=2) if args.json else harness.format_report(report))
+
+if args.save_baseline:
+    with open(args.save_baseline, 'w') as f:
+        json.dump(report, f, indent=2)
+
+if args.baseline:
+    with open(args.baseline) as f:
+        regressions = harness.compare(report, json.load(f), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+    print("No regressions against baseline.", file=sys.stderr)
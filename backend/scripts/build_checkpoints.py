@@ -0,0 +1,20 @@
+import sys
+import os
+import argparse
+from datetime import date
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.utils import checkpoints
+
+parser = argparse.ArgumentParser(description='Rebuild daily balance checkpoints from transaction history.')
+parser.add_argument('--since', type=date.fromisoformat, help='only rebuild days on or after YYYY-MM-DD')
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    written = checkpoints.rebuild(since=args.since)
+    print(f"{written} checkpoints written.")
@@ -0,0 +1,41 @@
+import sys
+import os
+import argparse
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.model.kyc_request_model import KYCUpdateRequest
+from app.utils.kyc_derivatives import get_derivative_pipeline
+from app.utils.kyc_store import DOCUMENTS, StoredDocument
+
+parser = argparse.ArgumentParser(description='Build missing thumbnails/previews for stored KYC documents.')
+parser.add_argument('--status', default='pending', help="only requests with this status ('all' for every request)")
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    pipeline = get_derivative_pipeline()
+    if not pipeline.enabled:
+        sys.exit("Pillow is not installed; derivatives cannot be built.")
+
+    query = KYCUpdateRequest.query
+    if args.status != 'all':
+        query = query.filter_by(status=args.status)
+
+    futures = []
+    for kyc_request in query.yield_per(500):
+        documents = []
+        for document in DOCUMENTS:
+            sha256 = getattr(kyc_request, f'{document}_sha256')
+            if sha256:  # uploads from before the content-addressed store are skipped
+                path = getattr(kyc_request, f'{document}_image')
+                documents.append(StoredDocument(path, sha256, None, os.path.splitext(path)[1].lstrip('.')))
+        futures.extend(pipeline.submit(documents))
+
+    for future in futures:
+        future.result()
+    pipeline.shutdown(wait=True)
+    print(f"{len(futures)} documents processed.")
@@ -0,0 +1,30 @@
+import sys
+import os
+import argparse
+import json
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.utils import importer
+
+parser = argparse.ArgumentParser(description='Bulk-import customers from a CSV or NDJSON file.')
+parser.add_argument('path', help="file to import, or '-' for stdin")
+parser.add_argument('--format', choices=['csv', 'ndjson'], help='defaults to the file extension')
+parser.add_argument('--chunk-size', type=int, default=importer.DEFAULT_CHUNK_SIZE)
+args = parser.parse_args()
+
+fmt = args.format or importer.detect_format(args.path)
+app = create_app()
+
+with app.app_context():
+    if args.path == '-':
+        report = importer.import_customers(importer.iter_rows(sys.stdin.buffer, fmt), args.chunk_size)
+    else:
+        with open(args.path, 'rb') as stream:
+            report = importer.import_customers(importer.iter_rows(stream, fmt), args.chunk_size)
+
+    for error in report['errors']:
+        print(f"row {error['row']}: {error['msg']}", file=sys.stderr)
+    print(json.dumps({k: report[k] for k in ('created', 'failed', 'errors_truncated')}))
@@ -0,0 +1,27 @@
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.model import (  # noqa: F401 - register every table on db.metadata
+    account_sequence_model, adminmodel, balance_checkpoint_model, dashboard_stats_model,
+    idempotency_model, kyc_request_model, models, transactionmodel, update_request_model
+)
+from app.utils import account_numbers, dashboard_stats, database
+
+# Creates any missing tables. Run once per deploy, before starting run.py or
+# serve.py; neither touches the schema. Existing tables are left as they are
+# (scripts/sync_schema.py adds columns and indexes declared on them later).
+# It also starts the account number sequence and builds the dashboard
+# counters, one-off work that would otherwise fall on the first request.
+app = create_app()
+
+with app.app_context():
+    db.create_all()
+    account_numbers.create_sequence()
+    dashboard_stats.ensure_built()
+
+print('\n'.join(database.report(app)))
+print("Database initialised.")
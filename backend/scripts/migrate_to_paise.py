@@ -0,0 +1,41 @@
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import inspect, text
+
+from app import create_app, db
+
+# Converts databases created before balances moved to integer paise:
+#   user.initial_balance (FLOAT)  -> user.balance_paise (BIGINT)
+#   transaction.amount (FLOAT)    -> transaction.amount_paise (BIGINT)
+# Safe to run more than once. SQLite needs 3.35+ for DROP COLUMN.
+MIGRATIONS = [
+    ('user', 'initial_balance', 'balance_paise'),
+    ('transaction', 'amount', 'amount_paise'),
+]
+
+app = create_app()
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table, old_column, new_column in MIGRATIONS:
+            columns = {c['name'] for c in inspector.get_columns(table)}
+            if old_column not in columns:
+                print(f"{table}.{old_column}: already migrated")
+                continue
+
+            if new_column not in columns:
+                conn.execute(text(
+                    f'ALTER TABLE "{table}" ADD COLUMN {new_column} BIGINT NOT NULL DEFAULT 0'
+                ))
+            converted = conn.execute(text(
+                f'UPDATE "{table}" SET {new_column} = CAST(ROUND({old_column} * 100) AS BIGINT)'
+            )).rowcount
+            conn.execute(text(f'ALTER TABLE "{table}" DROP COLUMN {old_column}'))
+            print(f"{table}.{old_column} -> {new_column}: {converted} rows converted")
+
+    print("Migration to paise complete.")
@@ -0,0 +1,15 @@
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.utils.idempotency import purge_expired
+
+# Expired keys are ignored (and overwritten on reuse) anyway; run this from
+# cron to keep the table small.
+app = create_app()
+
+with app.app_context():
+    print(f"{purge_expired()} expired idempotency keys removed.")
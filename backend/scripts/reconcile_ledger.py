@@ -0,0 +1,35 @@
+import sys
+import os
+import argparse
+import json
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.utils import reconciliation
+
+# Compares every stored balance with the sum of its ledger entries and exits
+# non-zero when any account has drifted. Install NumPy for the fast path.
+parser = argparse.ArgumentParser(description='Reconcile account balances against the transaction ledger.')
+parser.add_argument('--chunk-size', type=int, default=reconciliation.CHUNK_SIZE, help='accounts per chunk')
+parser.add_argument('--backfill-openings', action='store_true',
+                    help='first post opening entries for accounts created before openings were recorded')
+parser.add_argument('--json', action='store_true', help='print the full report as JSON')
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    if args.backfill_openings:
+        print(f"{reconciliation.backfill_openings(args.chunk_size)} opening entries backfilled.")
+
+    report = reconciliation.reconcile(args.chunk_size)
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=2))
+    else:
+        print(f"{report.accounts} accounts checked in {report.seconds:.2f}s ({report.engine}); "
+              f"{report.drifted} drifted, net drift {report.net_drift_paise} paise.")
+        for user_id, balance, ledger_sum in report.drifts:
+            print(f"  user {user_id}: balance {balance}, ledger {ledger_sum}, drift {balance - ledger_sum}")
+    sys.exit(1 if report.drifted else 0)
@@ -0,0 +1,24 @@
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.utils.read_replica import REPLICA_ENGINE, snapshot_sqlite
+
+# Refreshes a local SQLite read replica (REPLICA_DATABASE_URL) from a SQLite
+# primary. Run it from cron; admin reads lag the primary by at most the
+# interval. With a real replica (e.g. PostgreSQL streaming replication) this
+# script is not needed.
+app = create_app()
+
+with app.app_context():
+    if REPLICA_ENGINE not in app.extensions:
+        sys.exit("REPLICA_DATABASE_URL is not set.")
+    primary_engine, replica_engine = db.engine, app.extensions[REPLICA_ENGINE]
+    if primary_engine.dialect.name != 'sqlite' or replica_engine.dialect.name != 'sqlite':
+        sys.exit("Snapshots are only supported from a SQLite primary to a SQLite replica.")
+
+    snapshot_sqlite(primary_engine.url.database, replica_engine.url.database)
+    print(f"Replica refreshed: {replica_engine.url.database}")
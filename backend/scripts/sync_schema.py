@@ -0,0 +1,56 @@
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+
+from app import create_app, db
+from app.utils import account_numbers, dashboard_stats, database
+from app.model import (  # noqa: F401 - register every table on db.metadata
+    adminmodel, models, transactionmodel, kyc_request_model, update_request_model
+)
+
+# db.create_all() creates missing tables but never alters existing ones. This
+# adds nullable columns and indexes that were declared on models after the
+# table was created. Anything else (type changes, NOT NULL columns) needs a
+# dedicated migration such as scripts/migrate_to_paise.py.
+#
+# It also widens VARCHAR columns that models now declare longer (see
+# app.utils.database.WIDENED_COLUMNS) and, on SQLite, pads timestamps stored
+# without microseconds (see app.utils.database.pad_sqlite_timestamps).
+app = create_app()
+
+with app.app_context():
+    db.create_all()
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    print(f"{table.name}.{column.name}: NOT NULL without default, skipped")
+                    continue
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}')
+                print(f"{table.name}.{column.name}: added")
+
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+    for table, column, old_length, new_length in database.widen_columns(db.engine):
+        print(f"{table}.{column}: widened from VARCHAR({old_length}) to VARCHAR({new_length})")
+
+    for table, column, padded in database.pad_sqlite_timestamps(db.engine):
+        print(f"{table}.{column}: padded {padded} timestamps")
+
+    # One-off work of init_db.py, for databases created before it did it
+    account_numbers.create_sequence()
+    dashboard_stats.ensure_built()
+
+    print("Schema up to date.")
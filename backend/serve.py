@@ -0,0 +1,319 @@
+import argparse
+import errno
+import fcntl
+import logging
+import os
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+log = logging.getLogger('avs.server')
+
+# Production entry point (run.py is the development server):
+#
+#   python scripts/init_db.py                      # once per deploy: create tables
+#   python serve.py --workers 4 --port 5000
+#
+# The master binds one listening socket and forks `workers` processes that
+# each serve it with a threaded werkzeug server, leaving the kernel to spread
+# connections across them. With preload (the default) the app is created once
+# in the master and inherited by every fork, so a new worker is serving within
+# milliseconds; with --no-preload each worker creates its own app after the
+# fork, which lets a reload pick up new code. Nothing here touches the schema.
+# Workers share debit limits through LIMITS_STORE and metrics through
+# METRICS_DIR; without METRICS_DIR a directory is created for the run.
+# Signals to the master:
+#   HUP        start a new set of workers, then retire the old ones gracefully
+#   TERM, INT  graceful shutdown: workers stop accepting and finish in-flight requests
+#   QUIT       immediate shutdown
+#   TTIN/TTOU  one worker more / fewer
+# Workers that die are replaced; a worker that cannot load the app stops the
+# server instead of being restarted in a loop.
+WORKER_BOOT_ERROR = 3
+KEEPALIVE = 5  # seconds an idle keep-alive connection may hold a worker thread
+SIGNALS = (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGQUIT,
+           signal.SIGTTIN, signal.SIGTTOU, signal.SIGCHLD)
+
+
+class RequestHandler(WSGIRequestHandler):
+    timeout = KEEPALIVE
+
+
+def bind(host, port, backlog=2048):
+    return socket.create_server((host, port), backlog=backlog)
+
+
+class Worker:
+    def __init__(self, listener, app):
+        self.listener = listener
+        self.app = app
+        self.ppid = os.getppid()
+
+    def run(self):
+        host, port = self.listener.getsockname()[:2]
+        server = make_server(host, port, self.app, threaded=True, request_handler=RequestHandler,
+                             fd=self.listener.fileno())
+        server.daemon_threads = False  # server_close() then waits for in-flight requests
+
+        def stop(*_):
+            # shutdown() blocks until serve_forever returns, so not from this thread
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGQUIT, lambda *_: os._exit(0))
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the master decides
+        threading.Thread(target=self._watch_master, args=(stop,), daemon=True).start()
+        server.serve_forever()
+
+    def _watch_master(self, stop):
+        # Orphaned workers (master killed outright) shut themselves down
+        while os.getppid() == self.ppid:
+            time.sleep(1)
+        stop()
+
+
+class BootError(Exception):
+    pass
+
+
+class Arbiter:
+    def __init__(self, load_app, listener, workers=2, preload=True, graceful_timeout=30):
+        self.load_app = load_app
+        self.listener = listener
+        self.num_workers = workers
+        self.preload = preload
+        self.graceful_timeout = graceful_timeout
+        self.app = None
+        self.generation = 0
+        self.workers = {}  # pid -> generation
+        self.retiring = {}  # pid -> deadline for SIGKILL
+        self.stopping = False
+        self._signals = []
+        self._wakeup = None
+
+    def run(self):
+        if self.preload:
+            self.app = self.load_app()
+        self._install_signals()
+        log.info("Listening on %s:%s, %d workers%s", *self.listener.getsockname()[:2], self.num_workers,
+                 " (preloaded)" if self.preload else "")
+        try:
+            self.manage_workers()
+            while True:
+                sig = self._wait_signal(1.0)
+                self.reap()
+                if sig in (signal.SIGTERM, signal.SIGINT):
+                    return self.stop(graceful=True)
+                if sig == signal.SIGQUIT:
+                    return self.stop(graceful=False)
+                if sig == signal.SIGHUP:
+                    self.reload()
+                elif sig == signal.SIGTTIN:
+                    self.num_workers += 1
+                elif sig == signal.SIGTTOU:
+                    self.num_workers = max(1, self.num_workers - 1)
+                self.manage_workers()
+        except BootError as exc:
+            log.error("%s", exc)
+            self.stop(graceful=False)
+            return 1
+
+    def _install_signals(self):
+        read_fd, write_fd = os.pipe()
+        for fd in (read_fd, write_fd):
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+        self._wakeup = (read_fd, write_fd)
+        for sig in SIGNALS:
+            signal.signal(sig, self._queue_signal)
+
+    def _queue_signal(self, sig, frame):
+        if sig != signal.SIGCHLD:
+            self._signals.append(sig)
+        try:
+            os.write(self._wakeup[1], b'.')
+        except OSError:
+            pass  # pipe full: the loop is already due to wake up
+
+    def _wait_signal(self, timeout):
+        if not self._signals:
+            try:
+                ready, _, _ = select.select([self._wakeup[0]], [], [], timeout)
+                if ready:
+                    while os.read(self._wakeup[0], 512):
+                        pass
+            except OSError as exc:
+                if exc.errno not in (errno.EAGAIN, errno.EINTR):
+                    raise
+        return self._signals.pop(0) if self._signals else None
+
+    def current(self):
+        return [pid for pid, generation in self.workers.items() if generation == self.generation]
+
+    def spawn(self):
+        # Signals stay blocked across the fork so none reaches the child
+        # while it still has the master's handlers
+        mask = signal.pthread_sigmask(signal.SIG_BLOCK, SIGNALS)
+        pid = os.fork()
+        if pid:
+            signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+            self.workers[pid] = self.generation
+            log.info("Started worker %d", pid)
+            return pid
+
+        # Worker process: never returns into the master's loop
+        for sig in SIGNALS:
+            signal.signal(sig, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+        os.close(self._wakeup[0])
+        os.close(self._wakeup[1])
+        try:
+            app = self.app if self.app is not None else self.load_app()
+        except BaseException:
+            log.exception("Worker %d failed to load the app", os.getpid())
+            os._exit(WORKER_BOOT_ERROR)
+        try:
+            Worker(self.listener, app).run()
+        except BaseException:
+            log.exception("Worker %d crashed", os.getpid())
+            os._exit(1)
+        os._exit(0)
+
+    def manage_workers(self):
+        current = self.current()
+        for _ in range(self.num_workers - len(current)):
+            self.spawn()
+        for pid in sorted(current)[:max(0, len(current) - self.num_workers)]:
+            self.retire(pid)
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now > deadline:
+                log.warning("Worker %d did not finish within %ss, killing it", pid, self.graceful_timeout)
+                self._kill(pid, signal.SIGKILL)
+                self.retiring.pop(pid)
+
+    def retire(self, pid):
+        self.workers[pid] = None  # no longer counted as current
+        self.retiring[pid] = time.monotonic() + self.graceful_timeout
+        self._kill(pid, signal.SIGTERM)
+
+    def reload(self):
+        # New workers first, so the socket is never left without one
+        log.info("Reloading workers")
+        old = list(self.workers)
+        self.generation += 1
+        for _ in range(self.num_workers):
+            self.spawn()
+        for pid in old:
+            if pid not in self.retiring:
+                self.retire(pid)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            generation = self.workers.pop(pid, None)
+            retired = self.retiring.pop(pid, None) is not None
+            code = os.waitstatus_to_exitcode(status)
+            if code == WORKER_BOOT_ERROR:
+                raise BootError(f"Worker {pid} failed to boot")
+            if not retired and generation is not None and not self.stopping:
+                log.warning("Worker %d exited with %s, replacing it", pid, code)
+
+    def stop(self, graceful=True):
+        self.stopping = True
+        sig = signal.SIGTERM if graceful else signal.SIGQUIT
+        for pid in list(self.workers):
+            self._kill(pid, sig)
+        deadline = time.monotonic() + (self.graceful_timeout if graceful else 2)
+        while self.workers and time.monotonic() < deadline:
+            try:
+                self.reap()
+            except BootError:
+                pass
+            time.sleep(0.05)
+        for pid in list(self.workers):
+            self._kill(pid, signal.SIGKILL)
+        self.listener.close()
+        log.info("Shut down")
+        return 0
+
+    def _kill(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            self.workers.pop(pid, None)
+
+
+def load_app(preload, config=None):
+    # Imported here so that without preload the master never loads app code
+    from app import create_app
+    from app.utils import database, limits
+
+    app = create_app(config)
+    if preload:
+        # Work every worker would otherwise repeat: build the debit limit
+        # windows from the ledger, then drop the master's connections so no
+        # pooled connection is shared across the fork
+        with app.app_context():
+            limits.get_limits()
+        for engine in database.engines(app).values():
+            engine.dispose()
+    return app
+
+
+def clear_metrics_snapshots(directory):
+    # Snapshots left by the previous run's workers would be summed into ours
+    if not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith('metrics-') and name.endswith('.json'):
+            os.remove(os.path.join(directory, name))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the banking API with prefork worker processes.")
+    parser.add_argument('--host', default=os.environ.get('HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 2)))
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help="create the app in each worker, so a reload (SIGHUP) loads new code")
+    parser.add_argument('--graceful-timeout', type=float, default=30,
+                        help="seconds a stopping worker gets to finish its requests")
+    args = parser.parse_args(argv)
+
+    workers = max(1, args.workers)
+    if workers > 1 and os.environ.get('LIMITS_STORE') == ':memory:':
+        parser.error("LIMITS_STORE=:memory: keeps debit limits per process; each of the workers would "
+                     "allow the full limit. Use a file or --workers 1.")
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(process)d %(levelname)s %(message)s')
+    # Workers must share metrics to report totals; set before the app (and
+    # its config) is loaded by the master or the workers
+    run_dir = None
+    if not os.environ.get('METRICS_DIR'):
+        run_dir = tempfile.mkdtemp(prefix='avs-serve-')
+        os.environ['METRICS_DIR'] = os.path.join(run_dir, 'metrics')
+    clear_metrics_snapshots(os.environ['METRICS_DIR'])
+    log.info("Metrics shared through %s", os.environ['METRICS_DIR'])
+    arbiter = Arbiter(lambda: load_app(args.preload), bind(args.host, args.port), workers=workers,
+                      preload=args.preload, graceful_timeout=args.graceful_timeout)
+    try:
+        return arbiter.run()
+    finally:
+        if run_dir:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -39,3 +39,123 @@ def db(app):
 def runner(app):
     """Create a test CLI runner"""
     return app.test_cli_runner()
+
+
+@pytest.fixture
+def bank_app(tmp_path):
+    """Create the real AVS Bank app backed by a throwaway SQLite file"""
+    from app import create_app, db as bank_db
+    from app.model import adminmodel, account_sequence_model  # noqa: F401 - register tables
+    from app.utils import account_numbers
+
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'bank.db'}",
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'KYC_STORAGE_DIR': str(tmp_path / 'kyc'),
+        'LIMITS_STORE': ':memory:',
+    })
+
+    with app.app_context():
+        bank_db.create_all()
+        account_numbers.create_sequence()  # as scripts/init_db.py does
+        yield app
+        bank_db.session.remove()
+        bank_db.drop_all()
+
+
+@pytest.fixture
+def bank_client(bank_app):
+    """Create a test client for the real AVS Bank app"""
+    return bank_app.test_client()
+
+
+@pytest.fixture
+def make_user(bank_app):
+    """Factory that inserts a customer and returns it"""
+    from app import db as bank_db
+    from app.model.models import User
+
+    counter = {'n': 0}
+
+    def _make_user(balance=1000.0, **fields):
+        counter['n'] += 1
+        n = counter['n']
+        password = fields.pop('password', 'Password1')
+        user = User(
+            name=fields.pop('name', f'Customer {n}'),
+            phone=fields.pop('phone', f'90000{n:05d}'),
+            gender=fields.pop('gender', 'Male'),
+            dob=fields.pop('dob', '1990-01-01'),
+            adhaar=fields.pop('adhaar', f'1000000{n:05d}'),
+            pan=fields.pop('pan', f'ABCDE{n:04d}F'),
+            account_type=fields.pop('account_type', 'savings'),
+            initial_balance=balance,
+            type_of_account=fields.pop('type_of_account', 'individual'),
+            account_number=fields.pop('account_number', None) or User.generate_account_number(),
+            **fields
+        )
+        user.set_password(password)
+        bank_db.session.add(user)
+        bank_db.session.commit()
+        return user
+
+    return _make_user
+
+
+@pytest.fixture
+def auth_headers(bank_app):
+    """Build an Authorization header for a customer"""
+    from flask_jwt_extended import create_access_token
+    from app.utils.principals import principal_claims
+
+    def _auth_headers(user):
+        token = create_access_token(
+            identity=str(user.account_number),
+            additional_claims=principal_claims('user', user.role)
+        )
+        return {'Authorization': f'Bearer {token}'}
+
+    return _auth_headers
+
+
+@pytest.fixture
+def admin_headers(bank_app):
+    """Insert an admin and return an Authorization header for it"""
+    from flask_jwt_extended import create_access_token
+    from app import db as bank_db
+    from app.model.adminmodel import Admin
+    from app.utils.principals import principal_claims
+
+    admin = Admin(username='admin', name='Test Admin')
+    admin.set_password('adminpass')
+    bank_db.session.add(admin)
+    bank_db.session.commit()
+
+    token = create_access_token(
+        identity=str(admin.id),
+        additional_claims=principal_claims('admin', 'admin')
+    )
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture(autouse=True)
+def query_budget(request):
+    """Fail tests whose requests go over their route's @query_budget or
+    repeat a SELECT with different parameters (a likely N+1)"""
+    if 'bank_app' not in request.fixturenames:
+        yield None
+        return
+
+    from app.utils import database
+    from app.utils.query_budget import QueryRecorder
+
+    app = request.getfixturevalue('bank_app')
+    with QueryRecorder(app, database.engines(app).values()) as recorder:
+        yield recorder
+
+    if request.node.get_closest_marker('no_query_budget'):
+        return
+    violations = recorder.violations()
+    if violations:
+        pytest.fail('SQL query budget:\n' + '\n'.join(violations), pytrace=False)
@@ -0,0 +1,84 @@
+"""
+Integration tests for the block-allocating account number generator
+"""
+import threading
+
+from app import db
+from app.model.account_sequence_model import AccountNumberSequence
+from app.model.models import User
+from app.utils.account_numbers import AccountNumberAllocator
+
+
+REGISTRATION = {
+    'name': 'New Customer',
+    'gender': 'Female',
+    'dob': '1995-05-05',
+    'account_type': 'savings',
+    'initial_balance': 0,
+    'type_of_account': 'individual',
+    'password': 'Password1',
+    'confirm_password': 'Password1',
+}
+
+
+def register(client, n):
+    return client.post('/register', json=dict(
+        REGISTRATION,
+        phone=f'80000{n:05d}',
+        adhaar=f'2000000{n:05d}',
+        pan=f'PQRST{n:04d}Z',
+    ))
+
+
+class TestAccountNumberAllocator:
+    """Account number allocation"""
+
+    def test_first_number_on_empty_table(self, bank_app):
+        assert AccountNumberAllocator().allocate() == 'AVS1001'
+
+    def test_continues_numerically_past_9999(self, bank_app, make_user):
+        make_user(account_number='AVS9998')
+        make_user(account_number='AVS9999')
+        db.session.delete(db.session.get(AccountNumberSequence, 'account_number'))  # an older database
+        db.session.commit()
+        allocator = AccountNumberAllocator()
+
+        assert allocator.allocate() == 'AVS10000'
+        assert allocator.allocate() == 'AVS10001'
+
+    def test_processes_get_disjoint_blocks(self, bank_app):
+        first = AccountNumberAllocator(block_size=5)
+        second = AccountNumberAllocator(block_size=5)
+
+        a = [first.allocate() for _ in range(7)]
+        b = [second.allocate() for _ in range(7)]
+
+        assert len(set(a) | set(b)) == 14
+        sequence = db.session.get(AccountNumberSequence, 'account_number')
+        assert sequence.next_value == 1001 + 20
+
+    def test_allocate_many_uses_current_block_then_one_reservation(self, bank_app):
+        allocator = AccountNumberAllocator(block_size=5)
+        allocator.allocate()
+
+        numbers = allocator.allocate_many(12)
+
+        assert numbers == [f'AVS{n}' for n in range(1002, 1014)]
+        assert db.session.get(AccountNumberSequence, 'account_number').next_value == 1014
+
+    def test_concurrent_registrations_get_unique_numbers(self, bank_app, bank_client):
+        statuses = []
+
+        def worker(n):
+            with bank_app.test_client() as client:
+                statuses.append(register(client, n).status_code)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert statuses == [201] * 12
+        numbers = [u.account_number for u in User.query.all()]
+        assert len(numbers) == len(set(numbers)) == 12
@@ -0,0 +1,84 @@
+"""
+Integration tests for claim-based role checks and the principal cache
+"""
+import re
+from contextlib import contextmanager
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import db
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class TestRoleClaims:
+    """role_required driven by token claims"""
+
+    def test_login_tokens_carry_role_claims(self, bank_client, make_user):
+        user = make_user(phone='9999900000', password='Secret123')
+        response = bank_client.post('/login', json={'phone': '9999900000', 'password': 'Secret123'})
+        token = response.get_json()['access_token']
+
+        from flask_jwt_extended import decode_token
+        claims = decode_token(token)
+        assert claims['sub'] == user.account_number
+        assert claims['ptype'] == 'user'
+        assert claims['role'] == 'user'
+
+    def test_customer_token_is_denied(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        response = bank_client.get('/admin/users', headers=auth_headers(user))
+        assert response.status_code == 403
+
+    def test_admin_role_check_is_cached(self, bank_client, admin_headers):
+        bank_client.get('/admin/update-requests', headers=admin_headers)
+
+        with count_queries() as statements:
+            response = bank_client.get('/admin/update-requests', headers=admin_headers)
+
+        assert response.status_code == 200
+        assert not any('FROM admin' in s for s in statements)
+
+    def test_claims_trusted_without_cache(self, bank_app, bank_client, admin_headers):
+        bank_app.config['PRINCIPAL_CACHE_TTL'] = 0
+
+        with count_queries() as statements:
+            response = bank_client.get('/admin/update-requests', headers=admin_headers)
+
+        assert response.status_code == 200
+        assert not any(re.search(r'FROM "?(admin|user)"?(\s|$)', s) for s in statements)
+
+    def test_legacy_token_without_claims(self, bank_client, admin_headers):
+        from app.model.adminmodel import Admin
+        admin = Admin.query.first()
+        token = create_access_token(identity=str(admin.id))
+
+        response = bank_client.get('/admin/update-requests', headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 200
+
+    def test_delete_user_invalidates_cached_principal(self, bank_client, make_user, admin_headers):
+        from app.utils.principals import get_principal_cache, resolve_role
+        user = make_user()
+        claims = {'ptype': 'user', 'role': 'user'}
+
+        assert resolve_role(user.account_number, claims) == 'user'
+        assert ('user', user.account_number) in get_principal_cache()
+
+        response = bank_client.delete(f'/admin/users/{user.id}', headers=admin_headers)
+
+        assert response.status_code == 200
+        assert ('user', user.account_number) not in get_principal_cache()
+        assert resolve_role(user.account_number, claims) is None
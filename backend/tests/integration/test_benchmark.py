@@ -0,0 +1,51 @@
+"""
+Integration test: a miniature benchmark run against the real app
+"""
+from benchmarks import harness
+
+
+class TestBenchmarkHarness:
+    """Seeding and the in-process driver"""
+
+    def test_seed_creates_customers_history_and_tokens(self, bank_app):
+        from app.model.models import User
+        from app.model.transactionmodel import Transaction
+        from app.utils import reconciliation
+
+        dataset = harness.seed(bank_app, customers=15, transactions_per_customer=3)
+
+        assert User.query.count() == 15
+        assert Transaction.query.count() == 15 * (3 + 1)  # history plus an opening entry
+        assert reconciliation.reconcile().drifted == 0
+        assert len(dataset.accounts) == len(dataset.user_tokens) == 15
+        assert len({phone for _, phone in dataset.accounts}) == 15
+
+    def test_every_operation_runs_without_server_errors(self, bank_app):
+        dataset = harness.seed(bank_app, customers=20, transactions_per_customer=2)
+        mix = {name: 1 for name in harness.OPERATIONS}
+
+        report = harness.run(harness.TestClientDriver(bank_app), dataset, mix, requests=80, concurrency=2)
+
+        assert report['requests'] == 80
+        assert set(report['endpoints']) == set(harness.OPERATIONS)
+        for name, endpoint in report['endpoints'].items():
+            assert endpoint['errors'] == 0, name
+            assert all(status.startswith(('2', '3')) for status in endpoint['statuses']), (name, endpoint)
+
+    def test_local_server_runs_the_production_arbiter(self, tmp_path):
+        config = {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'bench.db'}",
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            'KYC_STORAGE_DIR': str(tmp_path / 'kyc'),
+            'LIMITS_STORE': str(tmp_path / 'debit_limits.db'),
+            'METRICS_DIR': str(tmp_path / 'metrics'),
+        }
+        dataset = harness.seed(harness.make_app(config), customers=10, transactions_per_customer=2)
+
+        with harness.LocalServer(config, workers=2) as server:
+            report = harness.run(harness.HTTPDriver(server.url), dataset, {'profile': 1, 'deposit': 1},
+                                 requests=20, concurrency=2)
+
+        assert report['requests'] == 20
+        assert all(endpoint['errors'] == 0 for endpoint in report['endpoints'].values())
+        assert server.process.exitcode == 0  # the arbiter shut down gracefully
@@ -0,0 +1,133 @@
+"""
+Integration tests for bulk approve/reject of KYC and profile update requests
+"""
+from app import db
+from app.model.kyc_request_model import KYCUpdateRequest
+from app.model.models import User
+from app.model.update_request_model import UserUpdateRequest
+from app.utils import dashboard_stats
+
+
+def update_request(user, field, value):
+    req = UserUpdateRequest(user_id=user.id, field=field, old_value=getattr(user, field), new_value=value)
+    db.session.add(req)
+    db.session.commit()
+    return req
+
+
+def kyc_request(user):
+    req = KYCUpdateRequest(user_id=user.id, pancard_image='p.jpg', photo_image='f.png', signature_image='s.pdf')
+    db.session.add(req)
+    db.session.commit()
+    return req
+
+
+def by_id(response):
+    return {r['id']: r for r in response.get_json()['results']}
+
+
+class TestBulkUpdateRequests:
+    """/admin/update-requests/bulk"""
+
+    def test_approves_many_with_per_id_results(self, bank_client, make_user, admin_headers):
+        users = [make_user() for _ in range(3)]
+        reqs = [update_request(u, 'name', f'Renamed {n}') for n, u in enumerate(users)]
+        processed = update_request(users[0], 'dob', '1990-01-01')
+        processed.status = 'rejected'
+        db.session.commit()
+
+        response = bank_client.post('/admin/update-requests/bulk', headers=admin_headers,
+                                    json={'ids': [r.id for r in reqs] + [processed.id, 9999], 'action': 'approve'})
+
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['processed'] == 3 and body['failed'] == 2
+        results = by_id(response)
+        assert all(results[r.id]['status'] == 'approved' for r in reqs)
+        assert results[processed.id]['status'] == 'error'
+        assert results[9999]['msg'] == 'Request not found or already processed'
+
+        db.session.expire_all()
+        assert [db.session.get(User, u.id).name for u in users] == ['Renamed 0', 'Renamed 1', 'Renamed 2']
+
+    def test_unique_fields_checked_against_db_and_batch(self, bank_client, make_user, admin_headers):
+        existing = make_user(phone='8111111111')
+        first, second, third = make_user(), make_user(), make_user()
+        taken = update_request(first, 'phone', existing.phone)
+        winner = update_request(second, 'email', 'shared@example.com')
+        loser = update_request(third, 'email', 'shared@example.com')
+
+        response = bank_client.post('/admin/update-requests/bulk', headers=admin_headers,
+                                    json={'ids': [taken.id, winner.id, loser.id], 'action': 'approve'})
+
+        results = by_id(response)
+        assert results[taken.id] == {'id': taken.id, 'status': 'error', 'msg': 'Phone number already registered'}
+        assert results[winner.id]['status'] == 'approved'
+        assert results[loser.id]['msg'] == 'Email already registered'
+
+        db.session.expire_all()
+        assert db.session.get(User, second.id).email == 'shared@example.com'
+        assert db.session.get(UserUpdateRequest, loser.id).status == 'pending'
+
+    def test_gender_change_keeps_dashboard_counters(self, bank_client, make_user, admin_headers):
+        users = [make_user(gender='Male') for _ in range(2)]
+        dashboard_stats.ensure_built()
+        reqs = [update_request(u, 'gender', 'Female') for u in users]
+
+        bank_client.post('/admin/update-requests/bulk', headers=admin_headers,
+                         json={'ids': [r.id for r in reqs], 'action': 'approve'})
+
+        stats = bank_client.get('/admin/dashboard', headers=admin_headers).get_json()
+        assert stats['male_users'] == 0
+        assert stats['female_users'] == 2
+
+    def test_reject_leaves_users_untouched(self, bank_client, make_user, admin_headers):
+        user = make_user(name='Original')
+        req = update_request(user, 'name', 'Changed')
+
+        response = bank_client.post('/admin/update-requests/bulk', headers=admin_headers,
+                                    json={'ids': [req.id], 'action': 'reject'})
+
+        assert by_id(response)[req.id]['status'] == 'rejected'
+        db.session.expire_all()
+        assert db.session.get(User, user.id).name == 'Original'
+
+    def test_validates_payload(self, bank_client, admin_headers):
+        post = lambda body: bank_client.post('/admin/update-requests/bulk', headers=admin_headers, json=body)
+        assert post({'ids': [1], 'action': 'delete'}).status_code == 400
+        assert post({'ids': [], 'action': 'approve'}).status_code == 400
+        assert post({'ids': ['1'], 'action': 'approve'}).status_code == 400
+        assert post({'ids': list(range(1001)), 'action': 'approve'}).status_code == 400
+
+    def test_single_approval_reports_conflicts(self, bank_client, make_user, admin_headers):
+        existing = make_user(phone='8222222222')
+        req = update_request(make_user(), 'phone', existing.phone)
+
+        response = bank_client.post(f'/admin/update-requests/{req.id}', headers=admin_headers, json={'action': 'approve'})
+
+        assert response.status_code == 400
+        assert response.get_json()['msg'] == 'Phone number already registered'
+
+
+class TestBulkKYCRequests:
+    """/admin/kyc-requests/bulk"""
+
+    def test_approves_many(self, bank_client, make_user, admin_headers):
+        reqs = [kyc_request(make_user()) for _ in range(4)]
+
+        response = bank_client.post('/admin/kyc-requests/bulk', headers=admin_headers,
+                                    json={'ids': [r.id for r in reqs], 'action': 'approve'})
+
+        assert response.get_json()['processed'] == 4
+        db.session.expire_all()
+        assert {db.session.get(KYCUpdateRequest, r.id).status for r in reqs} == {'approved'}
+
+        again = bank_client.post('/admin/kyc-requests/bulk', headers=admin_headers,
+                                 json={'ids': [reqs[0].id], 'action': 'reject'})
+        assert again.get_json()['failed'] == 1
+
+    def test_requires_admin(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        response = bank_client.post('/admin/kyc-requests/bulk', headers=auth_headers(user),
+                                    json={'ids': [1], 'action': 'approve'})
+        assert response.status_code == 403
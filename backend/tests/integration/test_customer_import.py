@@ -0,0 +1,90 @@
+"""
+Integration tests for the bulk customer importer
+"""
+import io
+import json
+
+from app.model.models import User
+from app.utils import importer
+
+
+HEADER = 'name,phone,email,gender,dob,adhaar,pan,account_type,initial_balance,type_of_account,password\n'
+
+
+def csv_row(n, **overrides):
+    row = {
+        'name': f'Imported {n}', 'phone': f'70000{n:05d}', 'email': f'user{n}@example.com',
+        'gender': 'Female', 'dob': '1990-01-01', 'adhaar': f'3000000{n:05d}', 'pan': f'IMPRT{n:04d}A',
+        'account_type': 'savings', 'initial_balance': '100.50', 'type_of_account': 'individual',
+        'password': 'Password1',
+    }
+    row.update(overrides)
+    return ','.join(row[k] for k in HEADER.strip().split(',')) + '\n'
+
+
+class TestCustomerImport:
+    """Chunked, set-based customer import"""
+
+    def test_imports_across_chunks_and_reports_bad_rows(self, bank_app, make_user):
+        make_user(phone='7000000003')
+        body = HEADER + ''.join([
+            csv_row(1),
+            csv_row(2),
+            csv_row(3),                          # phone already registered
+            csv_row(4, pan='IMPRT0001A'),        # duplicate PAN within file
+            csv_row(5, initial_balance='abc'),
+            csv_row(6, name=''),
+            csv_row(7),
+        ])
+
+        report = importer.import_customers(importer.iter_rows(io.BytesIO(body.encode()), 'csv'), chunk_size=2)
+
+        assert report['created'] == 3
+        assert report['failed'] == 4
+        assert [e['row'] for e in report['errors']] == [3, 4, 5, 6]
+        assert report['errors'][0]['msg'] == 'Phone number already registered'
+        assert report['errors'][1]['msg'] == 'PAN already registered'
+        assert report['errors'][3]['msg'] == 'Missing fields: name'
+
+        imported = User.query.filter(User.name.like('Imported%')).all()
+        assert len({u.account_number for u in imported}) == 3
+        assert all(u.initial_balance == 100.5 for u in imported)
+        assert imported[0].check_password('Password1')
+
+    def test_imports_without_insert_returning(self, bank_app, monkeypatch):
+        from app import db
+        from app.utils import ledger, reconciliation
+
+        # MySQL: no RETURNING for multi-row inserts
+        monkeypatch.setattr(db.engine.dialect, 'insert_executemany_returning', False)
+        body = HEADER + csv_row(1) + csv_row(2) + csv_row(3)
+
+        report = importer.import_customers(importer.iter_rows(io.BytesIO(body.encode()), 'csv'), chunk_size=2)
+
+        assert report['created'] == 3
+        imported = User.query.filter(User.name.like('Imported%')).all()
+        assert [t.description for u in imported for t in u.transactions] == [ledger.OPENING] * 3
+        assert reconciliation.reconcile().drifted == 0
+
+    def test_admin_endpoint_accepts_ndjson_upload(self, bank_client, admin_headers):
+        lines = [
+            json.dumps({
+                'name': 'Json Customer', 'phone': '6000000001', 'gender': 'Male', 'dob': '1980-02-02',
+                'adhaar': '400000000001', 'pan': 'JSONX0001Z', 'account_type': 'current',
+                'initial_balance': 2500, 'type_of_account': 'business', 'password': 'Password1',
+            }),
+            'not json',
+        ]
+        data = {'file': (io.BytesIO('\n'.join(lines).encode()), 'customers.ndjson')}
+
+        response = bank_client.post('/admin/import-users', data=data, headers=admin_headers,
+                                    content_type='multipart/form-data')
+
+        assert response.status_code == 200
+        assert response.get_json()['created'] == 1
+        assert response.get_json()['errors'] == [{'row': 2, 'msg': 'Malformed row'}]
+        assert User.query.filter_by(phone='6000000001').one().initial_balance == 2500.0
+
+    def test_admin_endpoint_requires_file(self, bank_client, admin_headers):
+        response = bank_client.post('/admin/import-users', json={}, headers=admin_headers)
+        assert response.status_code == 400
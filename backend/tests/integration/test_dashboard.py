@@ -0,0 +1,139 @@
+"""
+Integration tests for the incrementally maintained dashboard counters
+"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import db
+from app.model.dashboard_stats_model import DashboardCounter
+from app.model.models import User
+from app.utils import dashboard_stats
+
+
+REGISTRATION = {
+    'name': 'Dash Customer', 'phone': '5000000001', 'gender': 'Female', 'dob': '1991-01-01',
+    'adhaar': '500000000001', 'pan': 'DASHX0001D', 'account_type': 'current',
+    'initial_balance': 300, 'type_of_account': 'individual',
+    'password': 'Password1', 'confirm_password': 'Password1',
+}
+
+
+def dashboard(client, headers):
+    response = client.get('/admin/dashboard', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+class TestDashboardStats:
+    """Counters stay equal to a full recomputation"""
+
+    @pytest.mark.no_query_budget  # the one-off build is over the steady-state budget
+    def test_first_read_builds_counters(self, bank_client, make_user, admin_headers):
+        make_user(balance=100.0, gender='Male', account_type='savings')
+        make_user(balance=50.5, gender='Female', account_type='current')
+
+        data = dashboard(bank_client, admin_headers)
+
+        assert data['total_users'] == 2
+        assert data['total_balance'] == 150.5
+        assert data['male_users'] == 1
+        assert data['female_users'] == 1
+        assert data['savings_accounts'] == 1
+        assert data['current_accounts'] == 1
+        assert data['stats_updated_at']
+
+    def test_counters_follow_every_change(self, bank_client, make_user, auth_headers, admin_headers):
+        alice = make_user(balance=1000.0, gender='Female', account_type='savings')
+        bob = make_user(balance=0.0, gender='Male', account_type='savings')
+        dashboard_stats.ensure_built()
+
+        bank_client.post('/register', json=REGISTRATION)
+        bank_client.post('/deposit', json={'amount': 25.25}, headers=auth_headers(alice))
+        bank_client.post('/withdraw', json={'amount': 5}, headers=auth_headers(alice))
+        bank_client.post('/transfer', json={'amount': 100, 'recipient_account': bob.account_number},
+                         headers=auth_headers(alice))
+        bank_client.put(f'/admin/users/{bob.id}', json={'account_type': 'current', 'initial_balance': 40},
+                        headers=admin_headers)
+        carol = make_user(balance=0.0)
+        dashboard_stats.apply(dashboard_stats.snapshot(carol), shard_key=carol.id)
+        db.session.commit()
+        bank_client.delete(f'/admin/users/{carol.id}', headers=admin_headers)
+
+        data = dashboard(bank_client, admin_headers)
+        expected = dashboard_stats.compute()
+        assert data['total_users'] == expected['total_users'] == 3
+        assert data['total_balance'] * 100 == expected['total_balance_paise']
+        assert data['current_accounts'] == expected['current_accounts'] == 2
+        assert data['savings_accounts'] == expected['savings_accounts'] == 1
+
+    def test_admins_and_non_customers_are_excluded(self, bank_app, make_user):
+        make_user(balance=10.0)
+        make_user(balance=999.0, role='staff')
+
+        assert dashboard_stats.compute()['total_balance_paise'] == 1000
+        assert dashboard_stats.compute()['total_users'] == 1
+
+    def test_read_touches_only_counter_rows(self, bank_app, make_user):
+        make_user(balance=10.0)
+        dashboard_stats.rebuild()
+
+        stats, _ = dashboard_stats.read()
+
+        assert stats['total_users'] == 1
+        assert DashboardCounter.query.count() == len(dashboard_stats.STATS) * 8 + 1  # and the build marker
+        assert User.query.count() == 1
+
+    def test_concurrent_readers_count_while_another_rebuilds(self, bank_app, make_user, monkeypatch):
+        make_user(balance=10.0)
+        assert dashboard_stats._claim_rebuild()  # another process is rebuilding
+        monkeypatch.setattr(dashboard_stats, 'rebuild', lambda **_: pytest.fail("rebuilt twice"))
+
+        stats, updated_at = dashboard_stats.read()
+
+        assert stats['total_users'] == 1
+        assert updated_at is None
+
+    def test_abandoned_rebuild_is_taken_over(self, bank_app, make_user):
+        make_user(balance=10.0)
+        assert dashboard_stats._claim_rebuild()
+        db.session.execute(update(DashboardCounter).where(DashboardCounter.name == dashboard_stats.BUILD_MARKER)
+                           .values(updated_at=datetime.utcnow() - timedelta(hours=1)))
+        db.session.commit()
+
+        stats, updated_at = dashboard_stats.read()
+
+        assert stats['total_users'] == 1
+        assert updated_at is not None
+
+    def test_postings_during_a_rebuild_are_kept(self, bank_app, make_user, monkeypatch):
+        user = make_user(balance=10.0)
+        dashboard_stats.rebuild()
+        compute = dashboard_stats.compute
+        workers = []
+
+        def deposit():
+            with bank_app.app_context():
+                db.session.execute(update(User).where(User.id == user.id)
+                                   .values(balance_paise=User.balance_paise + 500)
+                                   .execution_options(synchronize_session=False))
+                dashboard_stats.record_balance_change(user.id, 500)
+                db.session.commit()
+
+        def compute_while_posting():
+            worker = threading.Thread(target=deposit)
+            worker.start()
+            worker.join(0.5)
+            assert worker.is_alive()  # waiting for the rebuild's lock
+            workers.append(worker)
+            return compute()
+
+        monkeypatch.setattr(dashboard_stats, 'compute', compute_while_posting)
+        dashboard_stats.rebuild()
+        workers[0].join(10)
+        monkeypatch.undo()
+
+        stats, _ = dashboard_stats.read()
+        assert stats['total_balance_paise'] == dashboard_stats.compute()['total_balance_paise'] == 1500
@@ -0,0 +1,24 @@
+"""
+Integration tests for SQLite connection tuning and the startup report
+"""
+from app import db
+from app.utils import database
+
+
+class TestSQLiteTuning:
+    """PRAGMAs applied on every pooled connection"""
+
+    def test_connections_use_wal_and_busy_timeout(self, bank_app):
+        with db.engine.connect() as conn:
+            assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+            assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+            assert conn.exec_driver_sql('PRAGMA mmap_size').scalar() == 256 * 1024 * 1024
+
+    def test_startup_report_shows_effective_settings(self, bank_app):
+        lines = database.report(bank_app)
+
+        assert lines[0].startswith('database[default]: sqlite:///')
+        assert '  journal_mode = wal' in lines
+        assert '  synchronous = NORMAL' in lines
+        assert '  busy_timeout = 5000' in lines
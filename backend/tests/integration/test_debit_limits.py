@@ -0,0 +1,155 @@
+"""
+Integration tests for per-account-type debit limits
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.utils import ledger, limits
+
+
+@pytest.fixture
+def debit_limits(bank_app):
+    """Configure tight limits for savings accounts and start a fresh engine"""
+    bank_app.config['DEBIT_LIMITS'] = {'savings': {'daily_amount': 500, 'per_minute': 3}}
+    bank_app.extensions.pop('debit_limits', None)
+    return bank_app.config['DEBIT_LIMITS']
+
+
+def withdraw(client, headers, amount, **extra):
+    return client.post('/withdraw', json={'amount': amount}, headers={**headers, **extra})
+
+
+class TestDebitLimits:
+    """Withdrawals and transfers are refused once an account's limit is reached"""
+
+    def test_per_minute_limit_returns_429(self, bank_client, make_user, auth_headers, debit_limits):
+        user = make_user(balance=1000.0)
+        headers = auth_headers(user)
+
+        assert [withdraw(bank_client, headers, 1).status_code for _ in range(3)] == [200] * 3
+        response = withdraw(bank_client, headers, 1)
+
+        assert response.status_code == 429
+        assert 1 <= int(response.headers['Retry-After']) <= 60
+        db.session.refresh(user)
+        assert user.balance_paise == 99700
+
+    def test_daily_amount_returns_403(self, bank_client, make_user, auth_headers, debit_limits):
+        sender = make_user(balance=1000.0)
+        recipient = make_user(balance=0.0)
+
+        first = bank_client.post('/transfer', json={'amount': 400, 'recipient_account': recipient.account_number},
+                                 headers=auth_headers(sender))
+        second = withdraw(bank_client, auth_headers(sender), 100.01)
+
+        assert first.status_code == 200
+        assert second.status_code == 403
+        assert second.get_json()['msg'] == 'Daily debit limit of ₹500.00 exceeded'
+        assert withdraw(bank_client, auth_headers(sender), 100).status_code == 200
+
+    def test_insufficient_funds_does_not_use_the_limit(self, bank_client, make_user, auth_headers, debit_limits):
+        user = make_user(balance=50.0)
+        headers = auth_headers(user)
+
+        assert withdraw(bank_client, headers, 400).status_code == 400
+        assert withdraw(bank_client, headers, 400).status_code == 400
+
+        usage = limits.get_limits()
+        assert usage.reserve(user.id, 'savings', 50000, count=3) is None
+
+    def test_batch_counts_as_one_debit(self, bank_client, make_user, auth_headers, debit_limits):
+        sender = make_user(balance=1000.0)
+        recipient = make_user(balance=0.0)
+        headers = auth_headers(sender)
+        assert withdraw(bank_client, headers, 1).status_code == 200
+
+        response = bank_client.post('/transfer/batch', json={'payments': [
+            {'recipient_account': recipient.account_number, 'amount': 10} for _ in range(3)
+        ]}, headers=headers)
+
+        assert response.status_code == 200
+        assert withdraw(bank_client, headers, 1).status_code == 200
+        assert withdraw(bank_client, headers, 1).status_code == 429
+
+    def test_batch_larger_than_the_per_minute_limit_is_paid(self, bank_client, make_user, auth_headers,
+                                                            debit_limits):
+        sender = make_user(balance=1000.0)
+        recipient = make_user(balance=0.0)
+
+        response = bank_client.post('/transfer/batch', json={'payments': [
+            {'recipient_account': recipient.account_number, 'amount': 1} for _ in range(40)
+        ]}, headers=auth_headers(sender))
+
+        assert response.status_code == 200
+        db.session.refresh(recipient)
+        assert recipient.balance_paise == 4000
+
+    def test_rebuilt_windows_count_a_batch_once(self, bank_client, bank_app, make_user, auth_headers, debit_limits):
+        sender = make_user(balance=1000.0)
+        recipient = make_user(balance=0.0)
+        headers = auth_headers(sender)
+        bank_client.post('/transfer/batch', json={'payments': [
+            {'recipient_account': recipient.account_number, 'amount': 10} for _ in range(5)
+        ]}, headers=headers)
+
+        bank_app.extensions.pop('debit_limits')  # rebuilt from the ledger on next use
+
+        assert [withdraw(bank_client, headers, 1).status_code for _ in range(3)] == [200, 200, 429]
+
+    def test_unlisted_account_types_are_unlimited(self, bank_client, make_user, auth_headers, debit_limits):
+        user = make_user(balance=1000.0, account_type='Current')
+        headers = auth_headers(user)
+
+        assert all(withdraw(bank_client, headers, 200).status_code == 200 for _ in range(5))
+
+    def test_rate_limited_requests_are_not_replayed(self, bank_client, make_user, auth_headers, debit_limits):
+        user = make_user(balance=1000.0)
+        headers = auth_headers(user)
+        for _ in range(3):
+            withdraw(bank_client, headers, 1)
+
+        assert withdraw(bank_client, headers, 1, **{'Idempotency-Key': 'retry-me'}).status_code == 429
+        limits.get_limits().clock = lambda: time.time() + 61
+        assert withdraw(bank_client, headers, 1, **{'Idempotency-Key': 'retry-me'}).status_code == 200
+
+    def test_windows_are_rebuilt_from_the_ledger(self, bank_client, bank_app, make_user, auth_headers):
+        user = make_user(balance=1000.0)
+        ledger.post([
+            ledger.entry(user.id, -40000, 'Withdrawal', datetime.utcnow() - timedelta(hours=2)),
+            ledger.entry(user.id, -40000, 'Withdrawal', datetime.utcnow() - timedelta(hours=25)),
+            ledger.entry(user.id, -90000, ledger.ADJUSTMENT),
+        ])
+        db.session.commit()
+
+        bank_app.config['DEBIT_LIMITS'] = {'savings': {'daily_amount': 500}}
+        bank_app.extensions.pop('debit_limits', None)
+
+        assert withdraw(bank_client, auth_headers(user), 100.01).status_code == 403
+        assert withdraw(bank_client, auth_headers(user), 100).status_code == 200
+
+    def test_shared_store_across_workers(self, bank_client, bank_app, make_user, auth_headers, tmp_path):
+        user = make_user(balance=1000.0)
+        bank_app.config.update(DEBIT_LIMITS={'savings': {'per_minute': 2}}, LIMITS_STORE=str(tmp_path / 'limits.db'))
+        bank_app.extensions.pop('debit_limits', None)
+        assert withdraw(bank_client, auth_headers(user), 1).status_code == 200
+
+        # another worker process opening the same file sees the debit
+        bank_app.extensions.pop('debit_limits', None)
+        assert withdraw(bank_client, auth_headers(user), 1).status_code == 200
+        assert withdraw(bank_client, auth_headers(user), 1).status_code == 429
+
+    def test_default_store_is_a_shared_file_in_the_instance_folder(self, bank_client, bank_app, make_user,
+                                                                   auth_headers, tmp_path):
+        user = make_user(balance=1000.0)
+        bank_app.instance_path = str(tmp_path / 'instance')
+        bank_app.config.update(DEBIT_LIMITS={'savings': {'per_minute': 1}}, LIMITS_STORE='debit_limits.db')
+        bank_app.extensions.pop('debit_limits', None)
+
+        assert withdraw(bank_client, auth_headers(user), 1).status_code == 200
+
+        assert (tmp_path / 'instance' / 'debit_limits.db').exists()
+        bank_app.extensions.pop('debit_limits', None)  # as seen from another worker
+        assert withdraw(bank_client, auth_headers(user), 1).status_code == 429
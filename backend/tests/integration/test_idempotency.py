@@ -0,0 +1,136 @@
+"""
+Integration tests for Idempotency-Key handling on money-moving endpoints
+"""
+import threading
+from datetime import datetime, timedelta
+
+from app import db
+from app.model.idempotency_model import IdempotencyRecord
+from app.model.models import User
+from app.model.transactionmodel import Transaction
+from app.utils.idempotency import get_replay_cache
+
+
+def balance_of(user_id):
+    db.session.expire_all()
+    return db.session.get(User, user_id).initial_balance
+
+
+def keyed(headers, key):
+    return {**headers, 'Idempotency-Key': key}
+
+
+class TestIdempotencyKeys:
+    """Replay of recorded outcomes"""
+
+    def test_retry_is_replayed_without_posting_again(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=100)
+        headers = keyed(auth_headers(user), 'dep-1')
+
+        first = bank_client.post('/deposit', json={'amount': 50}, headers=headers)
+        retry = bank_client.post('/deposit', json={'amount': 50}, headers=headers)
+
+        assert first.status_code == retry.status_code == 200
+        assert retry.get_json() == first.get_json()
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert 'Idempotent-Replayed' not in first.headers
+        assert balance_of(user.id) == 150
+        assert Transaction.query.filter_by(user_id=user.id).count() == 1
+
+    def test_replay_survives_losing_the_process_cache(self, bank_app, bank_client, make_user, auth_headers):
+        sender, recipient = make_user(balance=100), make_user(balance=0)
+        headers = keyed(auth_headers(sender), 'pay-rent')
+        body = {'amount': 40, 'recipient_account': recipient.account_number}
+
+        first = bank_client.post('/transfer', json=body, headers=headers)
+        get_replay_cache().clear()
+        retry = bank_client.post('/transfer', json=body, headers=headers)
+
+        assert retry.get_json() == first.get_json()
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert balance_of(sender.id) == 60
+        assert balance_of(recipient.id) == 40
+
+    def test_client_errors_are_replayed(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=10)
+        headers = keyed(auth_headers(user), 'wd-1')
+
+        first = bank_client.post('/withdraw', json={'amount': 50}, headers=headers)
+        bank_client.post('/deposit', json={'amount': 100}, headers=auth_headers(user))
+        retry = bank_client.post('/withdraw', json={'amount': 50}, headers=headers)
+
+        assert first.status_code == retry.status_code == 400
+        assert retry.get_json() == {"msg": "Insufficient funds"}
+        assert balance_of(user.id) == 110
+
+    def test_key_reused_with_different_body_is_rejected(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=100)
+        headers = keyed(auth_headers(user), 'dep-2')
+
+        bank_client.post('/deposit', json={'amount': 5}, headers=headers)
+        response = bank_client.post('/deposit', json={'amount': 6}, headers=headers)
+
+        assert response.status_code == 422
+        assert balance_of(user.id) == 105
+
+    def test_keys_are_scoped_per_customer(self, bank_client, make_user, auth_headers):
+        first, second = make_user(balance=0), make_user(balance=0)
+
+        bank_client.post('/deposit', json={'amount': 5}, headers=keyed(auth_headers(first), 'same'))
+        response = bank_client.post('/deposit', json={'amount': 5}, headers=keyed(auth_headers(second), 'same'))
+
+        assert 'Idempotent-Replayed' not in response.headers
+        assert balance_of(first.id) == balance_of(second.id) == 5
+
+    def test_in_progress_key_returns_409(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=0)
+        headers = keyed(auth_headers(user), 'slow')
+        bank_client.post('/deposit', json={'amount': 5}, headers=headers)
+
+        record = db.session.get(IdempotencyRecord, (user.account_number, 'slow'))
+        record.status_code = None
+        db.session.commit()
+        get_replay_cache().clear()
+
+        response = bank_client.post('/deposit', json={'amount': 5}, headers=headers)
+        assert response.status_code == 409
+        assert response.headers['Retry-After'] == '1'
+        assert balance_of(user.id) == 5
+
+    def test_expired_key_executes_again(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=0)
+        headers = keyed(auth_headers(user), 'old')
+        bank_client.post('/deposit', json={'amount': 5}, headers=headers)
+
+        record = db.session.get(IdempotencyRecord, (user.account_number, 'old'))
+        record.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        get_replay_cache().clear()
+
+        response = bank_client.post('/deposit', json={'amount': 5}, headers=headers)
+        assert 'Idempotent-Replayed' not in response.headers
+        assert balance_of(user.id) == 10
+
+    def test_invalid_key(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        response = bank_client.post('/deposit', json={'amount': 5}, headers=keyed(auth_headers(user), 'k' * 256))
+        assert response.status_code == 400
+
+    def test_concurrent_retries_post_once(self, bank_app, make_user, auth_headers):
+        user = make_user(balance=0)
+        headers = keyed(auth_headers(user), 'storm')
+        statuses = []
+
+        def worker():
+            client = bank_app.test_client()
+            statuses.append(client.post('/deposit', json={'amount': 1}, headers=headers).status_code)
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert set(statuses) <= {200, 409}
+        assert balance_of(user.id) == 1
+        assert Transaction.query.filter_by(user_id=user.id).count() == 1
@@ -0,0 +1,96 @@
+"""
+Integration tests for serving KYC originals and derivatives
+"""
+import io
+
+from app.model.kyc_request_model import KYCUpdateRequest
+from app.utils.kyc_store import get_kyc_store
+
+JPEG = b'\xff\xd8\xff\xe0' + bytes(range(256)) * 8
+PNG = b'\x89PNG\r\n\x1a\n' + b'png-body' * 100
+PDF = b'%PDF-1.7\n' + b'pdf-body' * 100
+
+
+def submit_kyc(client, user, auth_headers):
+    data = {
+        'pancard': (io.BytesIO(JPEG), 'pan.jpg'),
+        'photo': (io.BytesIO(PNG), 'photo.png'),
+        'signature': (io.BytesIO(PDF), 'sig.pdf'),
+    }
+    response = client.post('/request-kyc-update', data=data, headers=auth_headers(user),
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    return KYCUpdateRequest.query.filter_by(user_id=user.id).one()
+
+
+class TestKYCDocumentServing:
+    """Authenticated, cacheable document endpoint"""
+
+    def test_owner_gets_original_with_etag_and_ranges(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        kyc = submit_kyc(bank_client, user, auth_headers)
+        url = f'/kyc-requests/{kyc.id}/documents/pancard'
+
+        response = bank_client.get(url, headers=auth_headers(user))
+        assert response.status_code == 200
+        assert response.data == JPEG
+        assert response.mimetype == 'image/jpeg'
+        assert response.get_etag()[0] == kyc.pancard_sha256
+        assert 'private' in response.headers['Cache-Control']
+        assert 'public' not in response.headers['Cache-Control']
+
+        cached = bank_client.get(url, headers={**auth_headers(user), 'If-None-Match': f'"{kyc.pancard_sha256}"'})
+        assert cached.status_code == 304
+        assert cached.data == b''
+
+        partial = bank_client.get(url, headers={**auth_headers(user), 'Range': 'bytes=4-13'})
+        assert partial.status_code == 206
+        assert partial.data == JPEG[4:14]
+        assert partial.headers['Content-Range'] == f'bytes 4-13/{len(JPEG)}'
+
+    def test_derivative_is_served_once_built(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        kyc = submit_kyc(bank_client, user, auth_headers)
+        url = f'/kyc-requests/{kyc.id}/documents/photo?variant=thumb'
+
+        # Not built yet: original is served and must not be cached as the thumb
+        fallback = bank_client.get(url, headers=auth_headers(user))
+        assert fallback.status_code == 200
+        assert fallback.data == PNG
+        assert 'no-cache' in fallback.headers['Cache-Control']
+
+        with open(get_kyc_store().derivative_path(kyc.photo_sha256, 'thumb'), 'wb') as f:
+            f.write(b'\xff\xd8\xff thumb')
+
+        response = bank_client.get(url, headers=auth_headers(user))
+        assert response.data == b'\xff\xd8\xff thumb'
+        assert response.get_etag()[0] == f'{kyc.photo_sha256}-thumb'
+        assert 'max-age=86400' in response.headers['Cache-Control']
+
+    def test_other_customers_are_denied_and_admins_allowed(self, bank_client, make_user, auth_headers, admin_headers):
+        owner, other = make_user(), make_user()
+        kyc = submit_kyc(bank_client, owner, auth_headers)
+        url = f'/kyc-requests/{kyc.id}/documents/signature'
+
+        assert bank_client.get(url, headers=auth_headers(other)).status_code == 403
+        response = bank_client.get(url, headers=admin_headers)
+        assert response.status_code == 200
+        assert response.data == PDF
+
+    def test_rejects_unknown_document_and_variant(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        kyc = submit_kyc(bank_client, user, auth_headers)
+
+        assert bank_client.get(f'/kyc-requests/{kyc.id}/documents/passport', headers=auth_headers(user)).status_code == 404
+        assert bank_client.get(f'/kyc-requests/{kyc.id}/documents/photo?variant=huge', headers=auth_headers(user)).status_code == 400
+        assert bank_client.get('/kyc-requests/9999/documents/photo', headers=auth_headers(user)).status_code == 404
+
+    def test_review_queue_links_to_documents_not_paths(self, bank_client, make_user, auth_headers, admin_headers):
+        user = make_user()
+        kyc = submit_kyc(bank_client, user, auth_headers)
+
+        [row] = bank_client.get('/admin/kyc-requests', headers=admin_headers).get_json()
+        assert row['pancard_image'] == f'/kyc-requests/{kyc.id}/documents/pancard'
+        assert row['photo_thumb'] == f'/kyc-requests/{kyc.id}/documents/photo?variant=thumb'
+        assert row['signature_preview'] == f'/kyc-requests/{kyc.id}/documents/signature?variant=preview'
+        assert row['pancard_size'] == len(JPEG)
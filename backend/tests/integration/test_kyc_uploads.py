@@ -0,0 +1,78 @@
+"""
+Integration tests for the streaming, content-addressed KYC document store
+"""
+import hashlib
+import io
+import os
+
+from app.model.kyc_request_model import KYCUpdateRequest
+
+JPEG = b'\xff\xd8\xff\xe0' + b'jpeg-body' * 100
+PNG = b'\x89PNG\r\n\x1a\n' + b'png-body' * 100
+PDF = b'%PDF-1.7\n' + b'pdf-body' * 100
+
+
+def upload(client, headers, pancard=JPEG, photo=PNG, signature=PDF, names=('pan.jpg', 'photo.png', 'sig.pdf')):
+    data = {}
+    for field, content, name in zip(('pancard', 'photo', 'signature'), (pancard, photo, signature), names):
+        if content is not None:
+            data[field] = (io.BytesIO(content), name)
+    return client.post('/request-kyc-update', data=data, headers=headers, content_type='multipart/form-data')
+
+
+class TestKYCUploads:
+    """Streaming upload, hashing, dedupe and limits"""
+
+    def test_same_filename_different_customers_do_not_collide(self, bank_app, bank_client, make_user, auth_headers):
+        first, second = make_user(), make_user()
+        other_jpeg = b'\xff\xd8\xff\xe1' + b'another-scan' * 50
+
+        assert upload(bank_client, auth_headers(first)).status_code == 200
+        assert upload(bank_client, auth_headers(second), pancard=other_jpeg).status_code == 200
+
+        a = KYCUpdateRequest.query.filter_by(user_id=first.id).one()
+        b = KYCUpdateRequest.query.filter_by(user_id=second.id).one()
+        assert a.pancard_image != b.pancard_image
+        assert open(a.pancard_image, 'rb').read() == JPEG
+        assert open(b.pancard_image, 'rb').read() == other_jpeg
+        assert a.pancard_sha256 == hashlib.sha256(JPEG).hexdigest()
+        assert a.pancard_size == len(JPEG)
+
+    def test_identical_documents_are_stored_once(self, bank_app, bank_client, make_user, auth_headers):
+        first, second = make_user(), make_user()
+        upload(bank_client, auth_headers(first))
+        upload(bank_client, auth_headers(second), names=('x.jpg', 'y.png', 'z.pdf'))
+
+        a = KYCUpdateRequest.query.filter_by(user_id=first.id).one()
+        b = KYCUpdateRequest.query.filter_by(user_id=second.id).one()
+        assert a.photo_image == b.photo_image
+
+        root = bank_app.config['KYC_STORAGE_DIR']
+        stored = [f for _, _, files in os.walk(root) for f in files]
+        assert len(stored) == 3
+        assert not any(f.startswith('.upload-') for f in stored)
+
+    def test_rejects_unsupported_type(self, bank_app, bank_client, make_user, auth_headers):
+        user = make_user()
+        response = upload(bank_client, auth_headers(user), photo=b'MZ\x90\x00 not an image at all')
+
+        assert response.status_code == 415
+        assert KYCUpdateRequest.query.count() == 0
+        root = bank_app.config['KYC_STORAGE_DIR']
+        assert [f for _, _, files in os.walk(root) for f in files] == []
+
+    def test_rejects_oversized_file_while_streaming(self, bank_app, bank_client, make_user, auth_headers):
+        bank_app.config['KYC_MAX_FILE_SIZE'] = 1024
+        bank_app.extensions.pop('kyc_store', None)
+        user = make_user()
+
+        response = upload(bank_client, auth_headers(user), pancard=b'\xff\xd8\xff' + b'x' * 2000)
+
+        assert response.status_code == 413
+        assert KYCUpdateRequest.query.count() == 0
+
+    def test_requires_all_three_files(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        response = upload(bank_client, auth_headers(user), signature=None)
+        assert response.status_code == 400
+        assert response.get_json()['msg'] == 'All three files are required'
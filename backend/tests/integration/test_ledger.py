@@ -0,0 +1,149 @@
+"""
+Integration tests for ledger postings and balance reconciliation
+"""
+import pytest
+from sqlalchemy import update
+
+from app import db
+from app.model.models import User
+from app.model.transactionmodel import Transaction
+from app.utils import dashboard_stats, ledger, reconciliation
+
+
+REGISTRATION = {
+    'name': 'Ledger Customer', 'phone': '8333333333', 'gender': 'Female', 'dob': '1991-02-03',
+    'adhaar': '555566667777', 'pan': 'LEDGR1234Q', 'account_type': 'savings',
+    'initial_balance': 750.25, 'type_of_account': 'individual',
+    'password': 'Password1', 'confirm_password': 'Password1',
+}
+
+
+def entries(user_id):
+    return [(t.type, t.amount_paise, t.description)
+            for t in Transaction.query.filter_by(user_id=user_id).order_by(Transaction.id)]
+
+
+class TestLedgerPostings:
+    """Every balance change is a ledger entry"""
+
+    def test_registration_posts_the_opening_balance(self, bank_client):
+        response = bank_client.post('/register', json=REGISTRATION)
+
+        assert response.status_code == 201
+        user = User.query.filter_by(phone='8333333333').one()
+        assert entries(user.id) == [('credit', 75025, ledger.OPENING)]
+        assert reconciliation.reconcile().drifted == 0
+
+    def test_zero_opening_balance_posts_nothing(self, bank_client):
+        bank_client.post('/register', json={**REGISTRATION, 'initial_balance': 0})
+
+        user = User.query.filter_by(phone='8333333333').one()
+        assert entries(user.id) == []
+
+    def test_admin_balance_edit_posts_an_adjustment(self, bank_client, admin_headers):
+        bank_client.post('/admin/create-user', json=REGISTRATION, headers=admin_headers)
+        user = User.query.filter_by(phone='8333333333').one()
+
+        bank_client.put(f'/admin/users/{user.id}', json={'initial_balance': 700}, headers=admin_headers)
+        bank_client.put(f'/admin/users/{user.id}', json={'name': 'Renamed'}, headers=admin_headers)
+
+        assert entries(user.id) == [
+            ('credit', 75025, ledger.OPENING),
+            ('debit', 5025, ledger.ADJUSTMENT),
+        ]
+        assert reconciliation.reconcile().drifted == 0
+
+    def test_deleting_a_funded_account_closes_it(self, bank_client, admin_headers, auth_headers):
+        dashboard_stats.ensure_built()
+        bank_client.post('/register', json=REGISTRATION)
+        bank_client.post('/register', json={**REGISTRATION, 'phone': '8444444444', 'adhaar': '555566668888',
+                                            'pan': 'LEDGR5678Q'})
+        user = User.query.filter_by(phone='8333333333').one()
+        payer = User.query.filter_by(phone='8444444444').one()
+
+        response = bank_client.delete(f'/admin/users/{user.id}', headers=admin_headers)
+
+        assert response.status_code == 200
+        db.session.refresh(user)
+        assert (user.role, user.balance_paise) == ('closed', 0)
+        assert entries(user.id) == [('credit', 75025, ledger.OPENING), ('debit', 75025, ledger.CLOSING)]
+        assert reconciliation.reconcile().drifted == 0
+        login = bank_client.post('/login', json={'phone': '8333333333', 'password': 'Password1'})
+        assert login.status_code == 401
+        transfer = bank_client.post('/transfer', json={'amount': 10, 'recipient_account': user.account_number},
+                                    headers=auth_headers(payer))
+        assert transfer.status_code == 404
+        assert bank_client.get('/admin/dashboard', headers=admin_headers).get_json()['total_users'] == 1
+        assert bank_client.delete(f'/admin/users/{user.id}', headers=admin_headers).status_code == 404
+
+    def test_accounts_without_entries_can_be_deleted(self, bank_client, admin_headers):
+        bank_client.post('/register', json={**REGISTRATION, 'initial_balance': 0})
+        user = User.query.filter_by(phone='8333333333').one()
+
+        response = bank_client.delete(f'/admin/users/{user.id}', headers=admin_headers)
+
+        assert response.status_code == 200
+        assert db.session.get(User, user.id) is None
+
+    def test_postings_keep_the_ledger_balanced(self, bank_client, auth_headers):
+        bank_client.post('/register', json=REGISTRATION)
+        bank_client.post('/register', json={**REGISTRATION, 'phone': '8444444444', 'adhaar': '555566668888',
+                                            'pan': 'LEDGR5678Q'})
+        alice = User.query.filter_by(phone='8333333333').one()
+        bob = User.query.filter_by(phone='8444444444').one()
+
+        bank_client.post('/deposit', json={'amount': 100}, headers=auth_headers(alice))
+        bank_client.post('/withdraw', json={'amount': 20}, headers=auth_headers(alice))
+        bank_client.post('/transfer', json={'amount': 30, 'recipient_account': bob.account_number},
+                         headers=auth_headers(alice))
+
+        assert reconciliation.reconcile().drifted == 0
+
+    def test_entries_are_append_only(self, bank_client):
+        bank_client.post('/register', json=REGISTRATION)
+        opening = Transaction.query.one()
+
+        opening.amount_paise = 1
+        with pytest.raises(ValueError):
+            db.session.flush()
+        db.session.rollback()
+
+
+class TestReconciliation:
+    """Stored balances against ledger sums"""
+
+    def _drift(self, user, paise):
+        db.session.execute(update(User).where(User.id == user.id).values(balance_paise=User.balance_paise + paise))
+        db.session.commit()
+
+    @pytest.mark.parametrize('use_numpy', [False, True])
+    def test_reports_drifted_accounts_across_chunks(self, bank_app, make_user, use_numpy):
+        if use_numpy:
+            pytest.importorskip('numpy')
+        users = [make_user(balance=10) for _ in range(7)]
+        ledger.open_accounts([(u.id, u.balance_paise) for u in users])
+        db.session.commit()
+        self._drift(users[1], 250)
+        self._drift(users[5], -100)
+
+        report = reconciliation.reconcile(chunk_size=3, use_numpy=use_numpy)
+
+        assert report.accounts == 7
+        assert report.drifted == 2
+        assert report.net_drift_paise == 150
+        assert report.drifts == [(users[1].id, 1250, 1000), (users[5].id, 900, 1000)]
+        assert report.as_dict()['drifts'][0]['drift_paise'] == 250
+
+    def test_backfill_opens_legacy_accounts_only(self, bank_app, make_user):
+        legacy = make_user(balance=40)
+        opened = make_user(balance=10)
+        ledger.open_accounts([(opened.id, opened.balance_paise)])
+        db.session.commit()
+        self._drift(opened, 5)
+
+        assert reconciliation.backfill_openings(chunk_size=1) == 1
+        assert entries(legacy.id) == [('credit', 4000, ledger.OPENING_BACKFILLED)]
+        assert reconciliation.backfill_openings() == 0
+
+        report = reconciliation.reconcile()
+        assert [user_id for user_id, _, _ in report.drifts] == [opened.id]
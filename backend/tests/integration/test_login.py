@@ -0,0 +1,54 @@
+"""
+Integration tests for login through the hashing pool
+"""
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.model.adminmodel import Admin
+from app.model.models import User
+from app.utils.hashing import HasherBusy, get_hasher
+
+
+class TestLogin:
+    """Login, rehash-on-login and backpressure"""
+
+    def test_outdated_hash_is_upgraded_on_login(self, bank_client, make_user):
+        user = make_user(phone='9000000001')
+        user.password_hash = generate_password_hash('Password1', method='pbkdf2:sha256:500')
+        db.session.commit()
+
+        response = bank_client.post('/login', json={'phone': '9000000001', 'password': 'Password1'})
+
+        assert response.status_code == 200
+        stored = db.session.get(User, user.id, populate_existing=True)
+        assert stored.password_hash.startswith('pbkdf2:sha256:1000$')
+        assert stored.check_password('Password1')
+
+    def test_admin_hash_is_upgraded_on_login(self, bank_client):
+        admin = Admin(username='boss', name='Boss')
+        admin.password_hash = generate_password_hash('adminpass', method='scrypt')
+        db.session.add(admin)
+        db.session.commit()
+
+        response = bank_client.post('/admin/login', json={'username': 'boss', 'password': 'adminpass'})
+
+        assert response.status_code == 200
+        stored = db.session.get(Admin, admin.id, populate_existing=True)
+        assert stored.password_hash.startswith('pbkdf2:sha256:1000$')
+
+    def test_wrong_password(self, bank_client, make_user):
+        make_user(phone='9000000002')
+        response = bank_client.post('/login', json={'phone': '9000000002', 'password': 'nope'})
+        assert response.status_code == 401
+
+    def test_saturated_pool_returns_503(self, bank_client, make_user, monkeypatch):
+        make_user(phone='9000000003')
+
+        def busy(*args):
+            raise HasherBusy()
+
+        monkeypatch.setattr(get_hasher(), '_run', busy)
+        response = bank_client.post('/login', json={'phone': '9000000003', 'password': 'Password1'})
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
@@ -0,0 +1,57 @@
+"""
+Integration tests for request instrumentation and /admin/metrics
+"""
+from app.utils.metrics import get_metrics
+
+
+class TestMetricsEndpoint:
+    """Middleware recording and the admin-only scrape endpoint"""
+
+    def test_requests_are_recorded_per_route(self, bank_app, bank_client, make_user, auth_headers):
+        user = make_user(balance=100)
+        headers = auth_headers(user)
+        bank_client.get('/profile', headers=headers)
+        bank_client.post('/deposit', json={'amount': 10}, headers=headers)
+        bank_client.get('/no-such-route')
+
+        with bank_app.test_request_context():
+            stats = get_metrics().collect()
+
+        profile = stats[('GET', '/profile')]
+        assert profile.requests == 1
+        assert profile.statements == 1
+        assert profile.response_bytes > 0
+        deposit = stats[('POST', '/deposit')]
+        assert deposit.statuses == {'200': 1}
+        assert deposit.statements >= 2
+        assert deposit.request_bytes > 0
+        assert stats[('GET', '<unmatched>')].statuses == {'404': 1}
+
+    def test_admin_scrapes_prometheus_text(self, bank_client, make_user, auth_headers, admin_headers):
+        user = make_user()
+        bank_client.get('/profile', headers=auth_headers(user))
+
+        response = bank_client.get('/admin/metrics', headers=admin_headers)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+        assert 'avs_http_requests_total{method="GET",endpoint="/profile",status="200"} 1' in text
+        assert '# TYPE avs_http_request_duration_seconds histogram' in text
+        assert 'avs_db_statement_seconds_total{method="GET",endpoint="/profile"}' in text
+
+    def test_customers_cannot_scrape(self, bank_client, make_user, auth_headers):
+        response = bank_client.get('/admin/metrics', headers=auth_headers(make_user()))
+
+        assert response.status_code == 403
+
+    def test_metrics_can_be_disabled(self, tmp_path):
+        from app import create_app
+
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'off.db'}",
+            'METRICS_ENABLED': False,
+        })
+
+        assert 'metrics' not in app.extensions
@@ -0,0 +1,97 @@
+"""
+Integration tests for the single-query, conditional /profile endpoint
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import db
+from app.model.kyc_request_model import KYCUpdateRequest
+from app.model.update_request_model import UserUpdateRequest
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def revalidate(client, headers, response):
+    return client.get('/profile', headers={**headers, 'If-None-Match': response.headers['ETag']})
+
+
+class TestProfile:
+    """Profile content, query count and validators"""
+
+    def test_profile_is_one_query(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=250.5)
+        headers = auth_headers(user)
+
+        with count_queries() as statements:
+            response = bank_client.get('/profile', headers=headers)
+
+        assert len(statements) == 1
+        body = response.get_json()
+        assert body['account_number'] == user.account_number
+        assert body['initial_balance'] == 250.5
+        assert body['has_pending_update_request'] is False
+        assert body['kyc_status'] == 'not_submitted'
+
+    def test_unchanged_profile_returns_304(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        headers = auth_headers(user)
+        first = bank_client.get('/profile', headers=headers)
+
+        assert first.headers['ETag']
+        assert first.headers['Last-Modified']
+        assert 'private' in first.headers['Cache-Control']
+
+        again = revalidate(bank_client, headers, first)
+        assert again.status_code == 304
+        assert again.data == b''
+        assert again.headers['ETag'] == first.headers['ETag']
+
+    def test_balance_change_invalidates_etag(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=100)
+        headers = auth_headers(user)
+        first = bank_client.get('/profile', headers=headers)
+
+        bank_client.post('/deposit', json={'amount': 5}, headers=headers)
+
+        response = revalidate(bank_client, headers, first)
+        assert response.status_code == 200
+        assert response.get_json()['initial_balance'] == 105
+
+    def test_request_state_invalidates_etag(self, bank_client, make_user, auth_headers, admin_headers):
+        user = make_user()
+        headers = auth_headers(user)
+        first = bank_client.get('/profile', headers=headers)
+
+        bank_client.post('/request-update', json={'name': 'New Name'}, headers=headers)
+        second = revalidate(bank_client, headers, first)
+        assert second.status_code == 200
+        assert second.get_json()['has_pending_update_request'] is True
+
+        db.session.add(KYCUpdateRequest(user_id=user.id, pancard_image='p', photo_image='f', signature_image='s'))
+        db.session.commit()
+        third = revalidate(bank_client, headers, second)
+        assert third.get_json()['kyc_status'] == 'pending'
+
+        kyc = KYCUpdateRequest.query.filter_by(user_id=user.id).one()
+        bank_client.post(f'/admin/kyc-requests/{kyc.id}', json={'action': 'approve'}, headers=admin_headers)
+        fourth = revalidate(bank_client, headers, third)
+        assert fourth.status_code == 200
+        assert fourth.get_json()['kyc_status'] == 'approved'
+
+        update = UserUpdateRequest.query.filter_by(user_id=user.id).one()
+        bank_client.post(f'/admin/update-requests/{update.id}', json={'action': 'reject'}, headers=admin_headers)
+        fifth = revalidate(bank_client, headers, fourth)
+        assert fifth.get_json()['has_pending_update_request'] is False
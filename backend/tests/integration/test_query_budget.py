@@ -0,0 +1,70 @@
+"""
+Integration tests for route query budgets and the slow-query log
+"""
+import logging
+
+import pytest
+from flask import jsonify
+
+from app import db
+from app.model.models import User
+from app.utils import slow_queries
+from app.utils.query_budget import budget_of, query_budget as budget
+
+
+class TestRouteBudgets:
+    """Every route declares a budget and the recorder enforces it"""
+
+    def test_every_route_declares_a_budget(self, bank_app):
+        missing = [
+            endpoint for endpoint, view in bank_app.view_functions.items()
+            if endpoint != 'static' and budget_of(view) is None
+        ]
+
+        assert missing == []
+
+    @pytest.mark.no_query_budget
+    def test_over_budget_n_plus_one_is_reported(self, bank_app, bank_client, make_user, query_budget):
+        @budget(2)
+        def names():
+            ids = [u.id for u in User.query.with_entities(User.id)]
+            return jsonify([db.session.get(User, user_id).name for user_id in ids])
+
+        bank_app.add_url_rule('/test/names', view_func=names)
+        for _ in range(4):
+            make_user()
+        db.session.expunge_all()
+
+        bank_client.get('/test/names')
+
+        [report] = query_budget.violations()
+        assert 'GET /test/names (names) issued 5 SQL statements, budget is 2' in report
+        assert 'likely N+1: 4x SELECT' in report
+
+    def test_requests_within_budget_pass(self, bank_client, make_user, auth_headers, query_budget):
+        bank_client.get('/profile', headers=auth_headers(make_user()))
+
+        [record] = query_budget.requests
+        assert record.endpoint == 'api.get_profile'
+        assert len(record.statements) <= record.budget
+        assert query_budget.violations() == []
+
+
+class TestSlowQueryLog:
+    """Statements over SLOW_QUERY_MS are logged with their plan"""
+
+    def test_slow_statement_is_logged_with_plan(self, bank_app, make_user, caplog):
+        make_user()
+        slow_queries.install(db.engine, 0)
+
+        with caplog.at_level(logging.WARNING, logger='app.utils.slow_queries'):
+            db.session.execute(db.select(User.id).where(User.phone == '9000000001')).all()
+
+        [record] = [r for r in caplog.records if 'FROM user' in r.getMessage()]
+        message = record.getMessage()
+        assert message.startswith('Slow query (')
+        assert "parameters: ('9000000001',)" in message
+        assert 'SEARCH user USING' in message  # SQLite's plan for the unique phone lookup
+
+    def test_off_by_default(self, bank_app):
+        assert bank_app.config['SLOW_QUERY_MS'] is None
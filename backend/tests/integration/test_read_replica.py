@@ -0,0 +1,110 @@
+"""
+Integration tests for routing admin reads to a read replica
+"""
+import pytest
+from flask import current_app
+
+from app import db
+from app.model.models import User
+from app.utils import dashboard_stats, database
+from app.utils.read_replica import REPLICA_ENGINE, snapshot_sqlite
+
+
+@pytest.fixture
+def bank_app(tmp_path):
+    """The bank app with a local SQLite snapshot configured as its replica"""
+    from app import create_app
+    from app.model import adminmodel, account_sequence_model  # noqa: F401 - register tables
+
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'bank.db'}",
+        'REPLICA_DATABASE_URL': f"sqlite:///{tmp_path / 'replica.db'}",
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'KYC_STORAGE_DIR': str(tmp_path / 'kyc'),
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        app.extensions[REPLICA_ENGINE].dispose()
+
+
+def refresh_replica():
+    db.session.commit()  # end the test's read transaction before copying
+    snapshot_sqlite(db.engine.url.database, current_app.extensions[REPLICA_ENGINE].url.database)
+
+
+def account_numbers(response):
+    return {u['account_number'] for u in response.get_json()}
+
+
+class TestReadReplica:
+    """Admin reads from the replica, writes and overrides on the primary"""
+
+    def test_admin_listing_reads_the_replica(self, bank_client, make_user, admin_headers):
+        first = make_user().account_number
+        refresh_replica()
+        second = make_user().account_number  # not in the snapshot yet
+
+        assert account_numbers(bank_client.get('/admin/users', headers=admin_headers)) == {first}
+
+        fresh = bank_client.get('/admin/users', headers={**admin_headers, 'X-Read-Your-Writes': '1'})
+        assert account_numbers(fresh) == {first, second}
+
+        refresh_replica()
+        assert account_numbers(bank_client.get('/admin/users', headers=admin_headers)) == {first, second}
+
+    def test_customer_requests_stay_on_the_primary(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=10)
+        refresh_replica()
+
+        bank_client.post('/deposit', json={'amount': 5}, headers=auth_headers(user))
+        profile = bank_client.get('/profile', headers=auth_headers(user)).get_json()
+
+        assert profile['initial_balance'] == 15
+
+    def test_writes_never_reach_the_replica(self, bank_client, make_user, admin_headers):
+        user = make_user(name='Before')
+        refresh_replica()
+
+        response = bank_client.put(f'/admin/users/{user.id}', json={'name': 'After'}, headers=admin_headers)
+        assert response.status_code == 200
+
+        db.session.expire_all()
+        assert db.session.get(User, user.id).name == 'After'
+        with current_app.extensions[REPLICA_ENGINE].connect() as conn:
+            assert conn.exec_driver_sql('SELECT name FROM user WHERE id = ?', (user.id,)).scalar() == 'Before'
+
+    @pytest.mark.no_query_budget  # the one-off build is over the steady-state budget
+    def test_dashboard_rebuilds_counters_on_the_primary(self, bank_client, make_user, admin_headers):
+        make_user(balance=100)
+        make_user(balance=50)
+        refresh_replica()  # replica has no counters yet
+
+        stats = bank_client.get('/admin/dashboard', headers=admin_headers).get_json()
+
+        assert stats['total_users'] == 2
+        assert stats['total_balance'] == 150
+        with db.engine.connect() as conn:
+            assert conn.exec_driver_sql('SELECT count(*) FROM dashboard_counter').scalar() > 0
+
+    def test_dashboard_reads_built_counters_from_the_primary_while_the_replica_lags(
+            self, bank_client, make_user, admin_headers, monkeypatch):
+        make_user(balance=100)
+        refresh_replica()  # replica has no counters
+        dashboard_stats.ensure_built()
+        monkeypatch.setattr(dashboard_stats, 'rebuild', lambda **_: pytest.fail("rebuilt again"))
+
+        stats = bank_client.get('/admin/dashboard', headers=admin_headers).get_json()
+
+        assert stats['total_users'] == 1
+        assert stats['stats_updated_at']
+
+    def test_startup_report_lists_the_replica(self, bank_app):
+        lines = database.report(bank_app)
+
+        replica = lines.index(next(line for line in lines if line.startswith('database[read_replica]: ')))
+        assert lines[replica].endswith('replica.db')
+        assert lines[replica + 1] == '  journal_mode = wal'
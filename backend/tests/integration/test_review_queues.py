@@ -0,0 +1,143 @@
+"""
+Integration tests for the paginated KYC and profile-update review queues
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import db
+from app.model.kyc_request_model import KYCUpdateRequest
+from app.model.update_request_model import UserUpdateRequest
+
+START = datetime(2024, 3, 1, 9, 0, 0)
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def add_kyc_requests(make_user, count, status='pending'):
+    rows = []
+    for n in range(count):
+        user = make_user()
+        rows.append(KYCUpdateRequest(
+            user_id=user.id, pancard_image='p.jpg', photo_image='f.png', signature_image='s.pdf',
+            status=status, timestamp=START + timedelta(hours=n)
+        ))
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def add_update_requests(user, count, status='pending'):
+    rows = [
+        UserUpdateRequest(user_id=user.id, field='email', old_value=None, new_value=f'u{n}@example.com',
+                          status=status, timestamp=START + timedelta(days=n))
+        for n in range(count)
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def all_pages(client, url, headers):
+    pages, cursor = [], None
+    while True:
+        response = client.get(url + (f'&cursor={cursor}' if cursor else ''), headers=headers)
+        assert response.status_code == 200
+        pages.append(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return pages
+
+
+class TestKYCQueue:
+    """/admin/kyc-requests"""
+
+    def test_pages_oldest_first_without_gaps(self, bank_client, make_user, admin_headers):
+        created = add_kyc_requests(make_user, 7)
+        add_kyc_requests(make_user, 2, status='approved')
+
+        pages = all_pages(bank_client, '/admin/kyc-requests?limit=3', admin_headers)
+
+        assert [len(p) for p in pages] == [3, 3, 1]
+        ids = [row['id'] for page in pages for row in page]
+        assert ids == [r.id for r in created]
+        assert pages[0][0]['account_number'] == created[0].user.account_number
+
+    def test_status_and_date_filters(self, bank_client, make_user, admin_headers):
+        add_kyc_requests(make_user, 3)
+        approved = add_kyc_requests(make_user, 2, status='approved')
+
+        rows = bank_client.get('/admin/kyc-requests?status=approved', headers=admin_headers).get_json()
+        assert [r['id'] for r in rows] == [r.id for r in approved]
+        assert {r['status'] for r in rows} == {'approved'}
+
+        rows = bank_client.get('/admin/kyc-requests?from=2024-03-01T10:00:00&to=2024-03-01T10:59:59',
+                               headers=admin_headers).get_json()
+        assert len(rows) == 1
+
+        assert bank_client.get('/admin/kyc-requests?status=lost', headers=admin_headers).status_code == 400
+        assert bank_client.get('/admin/kyc-requests?from=yesterday', headers=admin_headers).status_code == 400
+
+    def test_page_is_a_single_query(self, bank_client, make_user, admin_headers):
+        add_kyc_requests(make_user, 3)
+        bank_client.get('/admin/kyc-requests', headers=admin_headers)  # warm the principal cache
+        add_kyc_requests(make_user, 20)
+
+        with count_queries() as statements:
+            response = bank_client.get('/admin/kyc-requests', headers=admin_headers)
+
+        assert len(response.get_json()) == 23
+        assert len(statements) == 1
+
+
+class TestUpdateRequestQueue:
+    """/admin/update-requests"""
+
+    def test_pages_and_filters(self, bank_client, make_user, admin_headers):
+        user = make_user()
+        pending = add_update_requests(user, 5)
+        add_update_requests(user, 1, status='rejected')
+
+        pages = all_pages(bank_client, '/admin/update-requests?limit=2', admin_headers)
+        assert [r['id'] for page in pages for r in page] == [r.id for r in pending]
+        assert pages[0][0]['account_number'] == user.account_number
+
+        rows = bank_client.get('/admin/update-requests?to=2024-03-02', headers=admin_headers).get_json()
+        assert [r['id'] for r in rows] == [pending[0].id, pending[1].id]
+
+    def test_pages_through_requests_submitted_together(self, bank_client, make_user, auth_headers,
+                                                        admin_headers):
+        user = make_user()
+        response = bank_client.post('/request-update', json={
+            'name': 'New Name', 'email': 'new@example.com', 'gender': 'Female'
+        }, headers=auth_headers(user))
+        assert response.status_code == 200
+
+        pages = all_pages(bank_client, '/admin/update-requests?limit=2', admin_headers)
+
+        assert sorted(r['field'] for page in pages for r in page) == ['email', 'gender', 'name']
+
+    def test_page_is_a_single_query(self, bank_client, make_user, admin_headers):
+        users = [make_user() for _ in range(5)]
+        for user in users:
+            add_update_requests(user, 2)
+        bank_client.get('/admin/update-requests', headers=admin_headers)
+
+        with count_queries() as statements:
+            response = bank_client.get('/admin/update-requests', headers=admin_headers)
+
+        assert len(response.get_json()) == 10
+        assert len(statements) == 1
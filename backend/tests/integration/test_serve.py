@@ -0,0 +1,182 @@
+"""
+Integration tests for the prefork production server and the init command
+"""
+import os
+import queue
+import re
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="prefork needs os.fork")
+
+
+def tables(path):
+    with sqlite3.connect(path) as conn:
+        return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+@pytest.fixture
+def server_env(tmp_path):
+    """Environment pointing the app at a throwaway database"""
+    env = {**os.environ, 'DATABASE_URL': f"sqlite:///{tmp_path / 'bank.db'}",
+           'LIMITS_STORE': str(tmp_path / 'limits.db')}
+    env.pop('METRICS_DIR', None)
+    return env
+
+
+@pytest.fixture
+def init_db(server_env, tmp_path):
+    subprocess.run([sys.executable, 'scripts/init_db.py'], cwd=BACKEND, env=server_env, check=True,
+                   capture_output=True)
+    return tmp_path / 'bank.db'
+
+
+class Server:
+    def __init__(self, env, *args):
+        self.process = subprocess.Popen(
+            [sys.executable, 'serve.py', '--port', '0', '--graceful-timeout', '5', *args],
+            cwd=BACKEND, env=env, stderr=subprocess.PIPE, text=True
+        )
+        self.lines = queue.Queue()
+        self.output = []
+        threading.Thread(target=self._read, daemon=True).start()
+        self.port = int(self.wait_for(r'Listening on [^:]+:(\d+)').group(1))
+
+    def _read(self):
+        for line in self.process.stderr:
+            self.lines.put(line)
+
+    def wait_for(self, pattern, timeout=15):
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self.lines.get(timeout=max(0.01, deadline - time.monotonic()))
+            self.output.append(line)
+            match = re.search(pattern, line)
+            if match:
+                return match
+
+    def started_workers(self, n):
+        return {int(self.wait_for(r'Started worker (\d+)').group(1)) for _ in range(n)}
+
+    def get(self, path):
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                return urllib.request.urlopen(f'http://127.0.0.1:{self.port}{path}', timeout=5).status
+            except urllib.error.HTTPError as exc:
+                return exc.code
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def signal(self, sig):
+        self.process.send_signal(sig)
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+@pytest.fixture
+def start_server(server_env):
+    servers = []
+
+    def _start(*args, env=None):
+        server = Server(env or server_env, *args)
+        servers.append(server)
+        return server
+
+    yield _start
+    for server in servers:
+        server.stop()
+
+
+class TestInitCommand:
+    """Schema creation happens only when asked for"""
+
+    def test_importing_the_app_does_not_create_tables(self, server_env, tmp_path):
+        subprocess.run([sys.executable, '-c', 'import run'], cwd=BACKEND, env=server_env, check=True)
+
+        assert not (tmp_path / 'bank.db').exists() or not tables(tmp_path / 'bank.db')
+
+    def test_init_db_creates_every_table(self, init_db):
+        assert {'user', 'transaction', 'admin', 'idempotency_record', 'account_number_sequence'} <= tables(init_db)
+
+    def test_init_db_does_the_one_off_work_of_first_requests(self, init_db):
+        with sqlite3.connect(init_db) as conn:
+            assert conn.execute("SELECT next_value FROM account_number_sequence").fetchall() == [(1001,)]
+            assert conn.execute("SELECT value FROM dashboard_counter WHERE name = '_built'").fetchall() == [(1,)]
+
+
+class TestPreforkServer:
+    """Master process managing worker processes on one socket"""
+
+    def test_workers_serve_requests(self, init_db, start_server):
+        server = start_server('--workers', '2')
+        server.started_workers(2)
+
+        assert [server.get('/profile') for _ in range(4)] == [401] * 4
+
+    def test_reload_replaces_every_worker(self, init_db, start_server):
+        server = start_server('--workers', '2')
+        old = server.started_workers(2)
+
+        server.signal(signal.SIGHUP)
+        new = server.started_workers(2)
+
+        assert not old & new
+        assert server.get('/profile') == 401
+
+    def test_dead_workers_are_replaced(self, init_db, start_server):
+        server = start_server('--workers', '1')
+        [pid] = server.started_workers(1)
+
+        os.kill(pid, signal.SIGKILL)
+
+        assert server.started_workers(1) != {pid}
+        assert server.get('/profile') == 401
+
+    def test_terminate_shuts_down_cleanly(self, init_db, start_server):
+        server = start_server('--workers', '2')
+        server.started_workers(2)
+        server.get('/profile')
+
+        server.signal(signal.SIGTERM)
+
+        assert server.process.wait(10) == 0
+
+    def test_metrics_directory_is_created_for_the_run(self, init_db, start_server):
+        server = start_server('--workers', '2')
+        server.started_workers(2)
+        metrics_dir = next(re.search(r'Metrics shared through (\S+)', line).group(1)
+                           for line in server.output if 'Metrics shared' in line)
+
+        assert os.path.isdir(os.path.dirname(metrics_dir))
+        server.signal(signal.SIGTERM)
+        assert server.process.wait(10) == 0
+        assert not os.path.exists(os.path.dirname(metrics_dir))
+
+    def test_refuses_per_process_limits_with_several_workers(self, init_db, server_env):
+        result = subprocess.run([sys.executable, 'serve.py', '--port', '0', '--workers', '2'], cwd=BACKEND,
+                                env={**server_env, 'LIMITS_STORE': ':memory:'}, capture_output=True, text=True)
+
+        assert result.returncode == 2
+        assert 'LIMITS_STORE' in result.stderr
+
+    def test_worker_boot_failure_stops_the_server(self, init_db, start_server, server_env):
+        env = {**server_env, 'REPLICA_DATABASE_URL': 'nosuchdriver://replica'}
+        server = start_server('--workers', '2', '--no-preload', env=env)
+
+        assert server.process.wait(15) == 1
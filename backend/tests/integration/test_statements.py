@@ -0,0 +1,107 @@
+"""
+Integration tests for balance checkpoints and monthly statements
+"""
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from app import db
+from app.model.balance_checkpoint_model import BalanceCheckpoint
+from app.model.transactionmodel import Transaction
+from app.utils import checkpoints, database
+
+
+def post(user, when, txn_type, amount):
+    # Back-dated posting: adjust the balance and write the transaction
+    paise = round(amount * 100)
+    user.balance_paise += paise if txn_type == 'credit' else -paise
+    db.session.add(Transaction(user_id=user.id, amount=amount, type=txn_type,
+                               description='Test', timestamp=datetime.fromisoformat(when)))
+    db.session.commit()
+
+
+class TestCheckpoints:
+    """Daily checkpoints and balance-as-of"""
+
+    def test_postings_keep_todays_checkpoint_current(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=100.0)
+        other = make_user(balance=0.0)
+        headers = auth_headers(user)
+
+        bank_client.post('/deposit', json={'amount': 50}, headers=headers)
+        bank_client.post('/transfer', json={'amount': 30, 'recipient_account': other.account_number},
+                         headers=headers)
+
+        rows = {c.user_id: c.closing_balance_paise for c in BalanceCheckpoint.query.all()}
+        assert rows == {user.id: 12000, other.id: 3000}
+        assert BalanceCheckpoint.query.first().day == checkpoints.today()
+
+    def test_rebuild_and_balance_as_of(self, bank_app, make_user):
+        user = make_user(balance=100.0)
+        user.created_at = datetime(2026, 1, 1)
+        post(user, '2026-01-05 10:00:00', 'credit', 50)
+        post(user, '2026-01-05 18:00:00', 'debit', 20)
+        post(user, '2026-02-10 09:00:00', 'credit', 100)
+
+        # Without checkpoints the answer comes from walking back from now
+        assert checkpoints.closing_balance(user, date(2026, 1, 31)) == 13000
+
+        assert checkpoints.rebuild() == 2
+        assert db.session.get(BalanceCheckpoint, (user.id, date(2026, 1, 5))).closing_balance_paise == 13000
+        assert db.session.get(BalanceCheckpoint, (user.id, date(2026, 2, 10))).closing_balance_paise == 23000
+
+        assert checkpoints.closing_balance(user, date(2026, 1, 4)) == 10000
+        assert checkpoints.balance_as_of(user, datetime(2026, 1, 5, 12)) == 15000
+        assert checkpoints.closing_balance(user, date(2026, 1, 31)) == 13000
+        assert checkpoints.closing_balance(user, date(2026, 2, 10)) == 23000
+        assert checkpoints.balance_as_of(user, datetime(2025, 12, 31)) == 0
+
+
+class TestStatements:
+    """GET /statements/<yyyy-mm>"""
+
+    def test_monthly_statement(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=100.0)
+        user.created_at = datetime(2026, 1, 1)
+        post(user, '2026-01-20 10:00:00', 'credit', 25)
+        post(user, '2026-02-01 00:00:00', 'credit', 40)
+        post(user, '2026-02-14 12:00:00', 'debit', 15.5)
+        post(user, '2026-03-02 08:00:00', 'debit', 1)
+        checkpoints.rebuild()
+
+        response = bank_client.get('/statements/2026-02', headers=auth_headers(user))
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['opening_balance'] == 125.0
+        assert data['closing_balance'] == 149.5
+        assert data['total_credits'] == 40.0
+        assert data['total_debits'] == 15.5
+        assert [t['amount'] for t in data['transactions']] == [40.0, 15.5]
+
+    def test_entries_at_midnight_on_the_first_belong_to_the_new_month(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=100.0)
+        user.created_at = datetime(2026, 1, 1)
+        post(user, '2026-03-01 00:00:00', 'credit', 40)
+        # Stamped by the SQLite server default before timestamps were set in
+        # Python: no microseconds until sync_schema pads them
+        db.session.execute(text(
+            'INSERT INTO "transaction" (user_id, amount_paise, type, description, timestamp) '
+            "VALUES (:u, 2500, 'credit', 'Legacy', '2026-03-01 00:00:00')"
+        ), {'u': user.id})
+        user.balance_paise += 2500
+        db.session.commit()
+        assert database.pad_sqlite_timestamps(db.engine) == [('transaction', 'timestamp', 1)]
+        checkpoints.rebuild()
+
+        february = bank_client.get('/statements/2026-02', headers=auth_headers(user)).get_json()
+        march = bank_client.get('/statements/2026-03', headers=auth_headers(user)).get_json()
+
+        assert february['transactions'] == []
+        assert [t['amount'] for t in march['transactions']] == [40.0, 25.0]
+        assert (march['opening_balance'], march['closing_balance']) == (100.0, 165.0)
+
+    def test_invalid_month(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        assert bank_client.get('/statements/2026-13', headers=auth_headers(user)).status_code == 400
+        assert bank_client.get('/statements/2999-01', headers=auth_headers(user)).status_code == 400
@@ -0,0 +1,120 @@
+"""
+Integration tests for customer and admin transaction history paging
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app import db
+from app.model.transactionmodel import Transaction
+from app.utils import database
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+
+def add_transactions(user, rows):
+    for when, txn_type, amount in rows:
+        db.session.add(Transaction(
+            user_id=user.id, amount=amount, type=txn_type,
+            description=txn_type.title(), timestamp=datetime.fromisoformat(when)
+        ))
+    db.session.commit()
+
+
+def fetch_all(client, url, headers, max_pages=50, **params):
+    items, cursor = [], None
+    for _ in range(max_pages):
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        response = client.get(url, query_string=query, headers=headers)
+        assert response.status_code == 200
+        items.extend(response.get_json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return items
+    raise AssertionError(f"still paging after {max_pages} pages")
+
+
+class TestTransactionHistory:
+    """Keyset pages, filters and the supporting index"""
+
+    def test_pages_are_newest_first_with_same_second_ties(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        other = make_user()
+        add_transactions(user, [('2026-01-01 10:00:00', 'credit', n + 1) for n in range(5)])
+        add_transactions(user, [('2026-01-02 09:00:00', 'debit', 100)])
+        add_transactions(other, [('2026-01-03 09:00:00', 'credit', 7)])
+
+        items = fetch_all(bank_client, '/transactions', auth_headers(user), limit=2)
+
+        assert [t['amount'] for t in items] == [100, 5, 4, 3, 2, 1]
+        assert len({t['id'] for t in items}) == 6
+
+    def test_pages_through_entries_posted_in_the_same_second(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=0.0)
+        headers = auth_headers(user)
+        for n in range(5):
+            assert bank_client.post('/deposit', json={'amount': n + 1}, headers=headers).status_code == 200
+
+        items = fetch_all(bank_client, '/transactions', headers, limit=2)
+
+        assert [t['amount'] for t in items] == [5, 4, 3, 2, 1]
+
+    def test_date_and_type_filters(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        add_transactions(user, [
+            ('2026-02-27 23:59:59', 'credit', 1),
+            ('2026-02-28 00:00:00', 'debit', 2),
+            ('2026-02-28 23:59:59', 'credit', 3),
+            ('2026-03-01 00:00:00', 'credit', 4),
+        ])
+        headers = auth_headers(user)
+
+        day = fetch_all(bank_client, '/transactions', headers, **{'from': '2026-02-28', 'to': '2026-02-28'})
+        assert [t['amount'] for t in day] == [3, 2]
+
+        credits = fetch_all(bank_client, '/transactions', headers, type='credit')
+        assert [t['amount'] for t in credits] == [4, 3, 1]
+
+        assert bank_client.get('/transactions?type=refund', headers=headers).status_code == 400
+        assert bank_client.get('/transactions?from=yesterday', headers=headers).status_code == 400
+
+    def test_date_bounds_include_entries_at_exactly_midnight(self, bank_client, make_user, auth_headers):
+        user = make_user()
+        add_transactions(user, [('2026-03-01 00:00:00', 'credit', 1)])
+        # A legacy row stamped by the SQLite server default, padded by sync_schema
+        db.session.execute(text(
+            'INSERT INTO "transaction" (user_id, amount_paise, type, description, timestamp) '
+            "VALUES (:u, 200, 'credit', 'Legacy', '2026-03-01 00:00:00')"
+        ), {'u': user.id})
+        db.session.commit()
+        database.pad_sqlite_timestamps(db.engine)
+        headers = auth_headers(user)
+
+        def amounts(**params):
+            return sorted(t['amount'] for t in fetch_all(bank_client, '/transactions', headers, **params))
+
+        assert amounts(**{'from': '2026-03-01'}) == [1, 2]
+        assert amounts(**{'to': '2026-03-01T00:00:00'}) == [1, 2]
+        assert amounts(**{'to': '2026-02-28'}) == []
+
+    def test_admin_endpoint_keeps_latest_ten_default(self, bank_client, make_user, admin_headers):
+        user = make_user()
+        add_transactions(user, [(f'2026-01-01 10:00:{n:02d}', 'credit', n) for n in range(12)])
+
+        response = bank_client.get(f'/admin/users/{user.id}/transactions', headers=admin_headers)
+
+        assert [t['amount'] for t in response.get_json()] == list(range(11, 1, -1))
+        assert response.headers.get(NEXT_CURSOR_HEADER)
+        rest = bank_client.get(f'/admin/users/{user.id}/transactions',
+                               query_string={'cursor': response.headers[NEXT_CURSOR_HEADER]},
+                               headers=admin_headers)
+        assert [t['amount'] for t in rest.get_json()] == [1, 0]
+
+    def test_history_query_uses_composite_index(self, bank_app, make_user):
+        user = make_user()
+        plan = db.session.execute(text(
+            'EXPLAIN QUERY PLAN SELECT * FROM "transaction" WHERE user_id = :u '
+            'ORDER BY timestamp DESC, id DESC LIMIT 11'
+        ), {'u': user.id}).all()
+
+        assert any('ix_transaction_user_timestamp_id' in row[-1] for row in plan)
+        assert not any('TEMP B-TREE' in row[-1] for row in plan)
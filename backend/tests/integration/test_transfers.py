@@ -0,0 +1,216 @@
+"""
+Integration tests for the transfer engine
+Runs deposit/withdraw/transfer against the real app and a SQLite file database
+"""
+import threading
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.model.models import User
+from app.model.transactionmodel import Transaction
+from app.utils import transfers
+
+
+def balance_of(user_id):
+    return db.session.get(User, user_id, populate_existing=True).initial_balance
+
+
+class TestTransferEndpoints:
+    """Money movement through the HTTP API"""
+
+    def test_deposit_returns_new_balance(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=100.0)
+        response = bank_client.post('/deposit', json={'amount': 50}, headers=auth_headers(user))
+
+        assert response.status_code == 200
+        assert response.get_json()['new_balance'] == 150.0
+        assert Transaction.query.filter_by(user_id=user.id, type='credit').count() == 1
+
+    def test_amounts_finer_than_a_paisa_are_refused(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=100.0)
+        response = bank_client.post('/deposit', json={'amount': 10.555}, headers=auth_headers(user))
+
+        assert response.status_code == 400
+        assert balance_of(user.id) == 100.0
+        assert Transaction.query.count() == 0
+
+    def test_replies_state_the_amount_posted(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=100.0)
+        response = bank_client.post('/deposit', json={'amount': 10.5}, headers=auth_headers(user))
+
+        assert response.get_json()['msg'] == 'Deposited ₹10.50 successfully'
+
+    def test_withdraw_insufficient_funds(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=10.0)
+        response = bank_client.post('/withdraw', json={'amount': 50}, headers=auth_headers(user))
+
+        assert response.status_code == 400
+        assert response.get_json()['msg'] == 'Insufficient funds'
+        assert balance_of(user.id) == 10.0
+        assert Transaction.query.count() == 0
+
+    def test_transfer_moves_money_both_ways(self, bank_client, make_user, auth_headers):
+        sender = make_user(balance=500.0)
+        recipient = make_user(balance=0.0)
+
+        response = bank_client.post(
+            '/transfer',
+            json={'amount': 200, 'recipient_account': recipient.account_number},
+            headers=auth_headers(sender)
+        )
+
+        assert response.status_code == 200
+        assert response.get_json()['new_balance'] == 300.0
+        assert balance_of(recipient.id) == 200.0
+        assert Transaction.query.count() == 2
+
+
+class TestTransferEngine:
+    """Concurrency and retry behaviour of app.utils.transfers"""
+
+    def test_concurrent_withdrawals_never_overdraw(self, bank_app, make_user):
+        user = make_user(balance=100.0)
+        user_id = user.id
+        outcomes = []
+
+        def worker():
+            with bank_app.app_context():
+                try:
+                    transfers.withdraw(db.session.get(User, user_id), 1000)
+                    outcomes.append('ok')
+                except transfers.InsufficientFunds:
+                    outcomes.append('insufficient')
+
+        threads = [threading.Thread(target=worker) for _ in range(15)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert outcomes.count('ok') == 10
+        assert outcomes.count('insufficient') == 5
+        assert balance_of(user_id) == 0.0
+        assert Transaction.query.filter_by(user_id=user_id).count() == 10
+
+    def test_opposite_transfers_keep_total(self, bank_app, make_user):
+        a = make_user(balance=1000.0)
+        b = make_user(balance=1000.0)
+        ids = (a.id, b.id)
+
+        def worker(src, dst):
+            with bank_app.app_context():
+                for _ in range(10):
+                    transfers.transfer(db.session.get(User, src), db.session.get(User, dst), 500)
+
+        threads = [
+            threading.Thread(target=worker, args=ids),
+            threading.Thread(target=worker, args=ids[::-1]),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert balance_of(a.id) + balance_of(b.id) == 2000.0
+
+    def test_retries_busy_errors(self, bank_app, monkeypatch):
+        monkeypatch.setattr(transfers, 'BACKOFF_SECONDS', 0)
+        calls = {'n': 0}
+
+        def flaky():
+            calls['n'] += 1
+            if calls['n'] < 3:
+                raise OperationalError('UPDATE', {}, Exception('database is locked'))
+            return 'done'
+
+        assert transfers.run_in_transaction(flaky) == 'done'
+        assert calls['n'] == 3
+
+    def test_does_not_retry_other_errors(self, bank_app):
+        def broken():
+            raise OperationalError('UPDATE', {}, Exception('no such table: user'))
+
+        with pytest.raises(OperationalError):
+            transfers.run_in_transaction(broken)
+
+
+class TestBatchTransfer:
+    """Fan-out payments through /transfer/batch"""
+
+    def test_batch_pays_every_valid_recipient(self, bank_client, make_user, auth_headers):
+        sender = make_user(balance=1000.0)
+        first = make_user(balance=0.0)
+        second = make_user(balance=0.0)
+
+        response = bank_client.post('/transfer/batch', json={'payments': [
+            {'recipient_account': first.account_number, 'amount': 100},
+            {'recipient_account': second.account_number, 'amount': 250},
+            {'recipient_account': first.account_number, 'amount': 50},
+            {'recipient_account': 'AVS9999999', 'amount': 10},
+            {'recipient_account': sender.account_number, 'amount': 10},
+            {'recipient_account': second.account_number, 'amount': -5},
+        ]}, headers=auth_headers(sender))
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['total'] == 400
+        assert data['new_balance'] == 600.0
+        assert [r['status'] for r in data['results']] == ['ok', 'ok', 'ok', 'failed', 'failed', 'failed']
+        assert data['results'][3]['msg'] == 'Recipient account not found'
+        assert data['results'][4]['msg'] == 'Cannot transfer to your own account'
+        assert data['results'][5]['msg'] == 'Invalid transfer amount'
+        assert balance_of(first.id) == 150.0
+        assert balance_of(second.id) == 250.0
+        assert Transaction.query.count() == 6
+
+    def test_batch_checks_total_against_balance(self, bank_client, make_user, auth_headers):
+        sender = make_user(balance=100.0)
+        recipient = make_user(balance=0.0)
+
+        response = bank_client.post('/transfer/batch', json={'payments': [
+            {'recipient_account': recipient.account_number, 'amount': 60},
+            {'recipient_account': recipient.account_number, 'amount': 60},
+        ]}, headers=auth_headers(sender))
+
+        assert response.status_code == 400
+        assert response.get_json()['msg'] == 'Insufficient funds'
+        assert balance_of(sender.id) == 100.0
+        assert Transaction.query.count() == 0
+
+    def test_batch_rejects_recipients_that_are_not_account_numbers(self, bank_client, make_user, auth_headers):
+        sender = make_user(balance=100.0)
+        recipient = make_user(balance=0.0)
+
+        response = bank_client.post('/transfer/batch', json={'payments': [
+            {'recipient_account': [recipient.account_number], 'amount': 10},
+            {'recipient_account': {'account': recipient.account_number}, 'amount': 10},
+            {'recipient_account': True, 'amount': 10},
+            {'recipient_account': recipient.account_number, 'amount': 10},
+        ]}, headers=auth_headers(sender))
+
+        assert response.status_code == 200
+        results = response.get_json()['results']
+        assert [r['status'] for r in results] == ['failed', 'failed', 'failed', 'ok']
+        assert {r['msg'] for r in results[:3]} == {'Invalid recipient account number'}
+        assert balance_of(recipient.id) == 10.0
+
+    def test_batch_requires_payments(self, bank_client, make_user, auth_headers):
+        sender = make_user()
+        response = bank_client.post('/transfer/batch', json={'payments': []}, headers=auth_headers(sender))
+        assert response.status_code == 400
+
+
+class TestPaiseLedger:
+    """Balances are stored as integer paise and reported in rupees"""
+
+    def test_repeated_small_deposits_do_not_drift(self, bank_client, make_user, auth_headers):
+        user = make_user(balance=0.0)
+        for _ in range(30):
+            response = bank_client.post('/deposit', json={'amount': 0.1}, headers=auth_headers(user))
+
+        assert response.get_json()['new_balance'] == 3.0
+        stored = db.session.get(User, user.id, populate_existing=True)
+        assert stored.balance_paise == 300
+        assert stored.initial_balance == 3.0
@@ -0,0 +1,58 @@
+"""
+Integration tests for keyset-paginated and streamed /admin/users
+"""
+import json
+
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+
+class TestUserListing:
+    """Cursor pages and NDJSON export"""
+
+    def test_pages_cover_every_customer_once(self, bank_client, make_user, admin_headers):
+        created = [make_user(balance=n).account_number for n in range(7)]
+        make_user(role='staff')
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            response = bank_client.get('/admin/users', query_string=params, headers=admin_headers)
+            assert response.status_code == 200
+            page = response.get_json()
+            assert len(page) <= 3
+            seen.extend(u['account_number'] for u in page)
+            pages += 1
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+
+        assert seen == created
+        assert pages == 3
+
+    def test_page_size_is_capped(self, bank_client, make_user, admin_headers):
+        make_user()
+        response = bank_client.get('/admin/users?limit=100000', headers=admin_headers)
+        assert response.status_code == 200
+        assert NEXT_CURSOR_HEADER not in response.headers
+
+    def test_invalid_cursor(self, bank_client, admin_headers):
+        response = bank_client.get('/admin/users?cursor=%%%', headers=admin_headers)
+        assert response.status_code == 400
+
+    def test_ndjson_export_streams_all_rows(self, bank_client, make_user, admin_headers):
+        for n in range(5):
+            make_user(balance=10.5)
+
+        response = bank_client.get('/admin/users?format=ndjson', headers=admin_headers)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.is_streamed
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert len(rows) == 5
+        assert rows[0]['initial_balance'] == 10.5
+        assert set(rows[0]) >= {'id', 'account_number', 'phone', 'pan'}
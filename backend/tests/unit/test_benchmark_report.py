@@ -0,0 +1,83 @@
+"""
+Unit tests for benchmark percentiles and baseline comparison
+"""
+import itertools
+import random
+
+from benchmarks.harness import Dataset, _op_register, compare, percentile, summarize
+
+
+def _report(p95_ms, rps, errors=0):
+    return {'endpoints': {'profile': {'p95_ms': p95_ms, 'rps': rps, 'errors': errors}}}
+
+
+class TestPercentile:
+    """Nearest-rank percentiles"""
+
+    def test_nearest_rank(self):
+        values = [5, 1, 4, 2, 3, 6, 7, 8, 9, 10]
+
+        assert percentile(values, 50) == 5
+        assert percentile(values, 95) == 10
+        assert percentile(values, 10) == 1
+
+    def test_single_sample(self):
+        assert percentile([0.25], 99) == 0.25
+
+
+class TestSummarize:
+    """Per-endpoint report"""
+
+    def test_counts_server_and_connection_errors(self):
+        report = summarize(
+            {'profile': [0.01, 0.02, 0.03, 0.04]},
+            {'profile': {200: 2, 503: 1, 'connection error': 1}},
+            wall=2.0
+        )
+
+        profile = report['endpoints']['profile']
+        assert profile['requests'] == 4
+        assert profile['rps'] == 2.0
+        assert profile['p50_ms'] == 20.0
+        assert profile['errors'] == 2
+        assert report['rps'] == 2.0
+
+
+class TestCompare:
+    """Baseline regressions"""
+
+    def test_within_tolerance_passes(self):
+        assert compare(_report(11.9, 81), _report(10, 100), tolerance=0.2) == []
+
+    def test_slower_p95_regresses(self):
+        regressions = compare(_report(12.5, 100), _report(10, 100), tolerance=0.2)
+
+        assert len(regressions) == 1
+        assert 'p95' in regressions[0]
+
+    def test_lower_throughput_regresses(self):
+        regressions = compare(_report(10, 70), _report(10, 100), tolerance=0.2)
+
+        assert len(regressions) == 1
+        assert 'req/s' in regressions[0]
+
+    def test_new_errors_regress(self):
+        assert compare(_report(10, 100, errors=1), _report(10, 100)) != []
+
+    def test_endpoints_missing_from_run_are_skipped(self):
+        assert compare({'endpoints': {}}, _report(10, 100)) == []
+
+
+class TestRegistrations:
+    """Generated signups"""
+
+    def test_pans_stay_unique_and_ten_characters_past_ten_thousand_signups(self):
+        dataset = Dataset([], {}, None)
+        dataset.run_id = 9999
+        dataset._registrations = itertools.count(9990)
+        rng = random.Random(1)
+
+        pans = [_op_register(dataset, rng)[2]['pan'] for _ in range(20)]
+
+        assert len(set(pans)) == 20
+        assert all(len(pan) == 10 for pan in pans)
@@ -0,0 +1,88 @@
+"""
+Unit tests for environment-driven database configuration
+"""
+import importlib
+
+from sqlalchemy import create_engine
+
+import config
+from app.model.adminmodel import Admin
+from app.model.models import User
+from app.utils.database import engine_options, sqlite_pragmas, widen_column_ddl, widen_columns
+
+
+class TestEngineOptions:
+    """Derived SQLAlchemy engine options"""
+
+    def test_server_databases_get_a_sized_pool(self):
+        options = engine_options({
+            'SQLALCHEMY_DATABASE_URI': 'postgresql://bank:secret@db/bank',
+            'DB_POOL_SIZE': 5,
+            'DB_MAX_OVERFLOW': 2,
+            'DB_POOL_TIMEOUT': 10,
+            'DB_POOL_RECYCLE': 600,
+            'DB_POOL_PRE_PING': True,
+        })
+        assert options == {
+            'pool_size': 5, 'max_overflow': 2, 'pool_timeout': 10,
+            'pool_recycle': 600, 'pool_pre_ping': True,
+        }
+
+    def test_explicit_engine_options_win(self):
+        options = engine_options({
+            'SQLALCHEMY_DATABASE_URI': 'mysql://bank@db/bank',
+            'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 50, 'echo': True},
+        })
+        assert options['pool_size'] == 50
+        assert options['echo'] is True
+        assert options['pool_pre_ping'] is True
+
+    def test_sqlite_gets_no_pool_sizing(self):
+        assert engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite:///bank.db'}) == {}
+
+    def test_pragmas_skip_unset_values(self):
+        pragmas = sqlite_pragmas({'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': None, 'SQLITE_BUSY_TIMEOUT_MS': 100})
+        assert pragmas == [('journal_mode', 'WAL'), ('busy_timeout', 100)]
+
+
+class TestEnvironment:
+    """config.Config reads the environment"""
+
+    def test_database_settings_come_from_environment(self, monkeypatch):
+        monkeypatch.setenv('DATABASE_URL', 'postgresql://bank@db/bank')
+        monkeypatch.setenv('DB_POOL_SIZE', '3')
+        monkeypatch.setenv('DB_POOL_PRE_PING', 'false')
+        monkeypatch.setenv('SQLITE_JOURNAL_MODE', 'DELETE')
+        try:
+            reloaded = importlib.reload(config).Config
+            assert reloaded.SQLALCHEMY_DATABASE_URI == 'postgresql://bank@db/bank'
+            assert reloaded.DB_POOL_SIZE == 3
+            assert reloaded.DB_POOL_PRE_PING is False
+            assert reloaded.SQLITE_JOURNAL_MODE == 'DELETE'
+        finally:
+            monkeypatch.undo()
+            importlib.reload(config)
+
+    def test_defaults(self):
+        assert config.Config.SQLALCHEMY_DATABASE_URI == 'sqlite:///bank.db'
+        assert config.Config.SQLITE_JOURNAL_MODE == 'WAL'
+
+
+class TestWidenedColumns:
+    """ALTER statements for columns declared wider than old databases have them"""
+
+    def test_mysql_restates_nullability(self):
+        ddl = widen_column_ddl('mysql', User.__table__, User.__table__.c.account_number)
+        assert ddl == 'ALTER TABLE `user` MODIFY `account_number` VARCHAR(16) NOT NULL'
+
+    def test_postgresql_alters_the_type(self):
+        ddl = widen_column_ddl('postgresql', User.__table__, User.__table__.c.account_number)
+        assert ddl == 'ALTER TABLE "user" ALTER COLUMN "account_number" TYPE VARCHAR(16)'
+
+    def test_password_hashes_are_widened_for_users_and_admins(self):
+        for table in (User.__table__, Admin.__table__):
+            ddl = widen_column_ddl('postgresql', table, table.c.password_hash)
+            assert ddl == f'ALTER TABLE "{table.name}" ALTER COLUMN "password_hash" TYPE VARCHAR(255)'
+
+    def test_sqlite_has_nothing_to_widen(self):
+        assert widen_columns(create_engine('sqlite://')) == []
@@ -0,0 +1,94 @@
+"""
+Unit tests for the KYC thumbnail/preview pipeline
+"""
+import os
+import threading
+
+from app.utils.kyc_derivatives import VARIANTS, DerivativePipeline
+from app.utils.kyc_store import KYCDocumentStore, StoredDocument
+
+
+def stored(store, content, extension):
+    sha256 = 'ab' + str(len(content)).rjust(62, '0')
+    path = store.path_for(sha256, extension)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return StoredDocument(path, sha256, len(content), extension)
+
+
+class TestDerivativePipeline:
+    """Background derivative generation"""
+
+    def test_builds_every_variant_next_to_the_original(self, tmp_path):
+        store = KYCDocumentStore(str(tmp_path), 1024)
+        calls = []
+
+        def render(source, target, max_side, quality):
+            calls.append(max_side)
+            with open(target, 'wb') as f:
+                f.write(b'derived-%d' % max_side)
+
+        pipeline = DerivativePipeline(store, workers=2, render=render)
+        doc = stored(store, b'image-bytes', 'jpg')
+        for future in pipeline.submit([doc]):
+            future.result()
+
+        for variant, (max_side, _) in VARIANTS.items():
+            with open(store.derivative_path(doc.sha256, variant), 'rb') as f:
+                assert f.read() == b'derived-%d' % max_side
+        assert sorted(calls) == sorted(side for side, _ in VARIANTS.values())
+
+        # Already built: nothing is rendered again
+        for future in pipeline.submit([doc]):
+            future.result()
+        assert len(calls) == len(VARIANTS)
+        pipeline.shutdown(wait=True)
+
+    def test_pdfs_are_skipped_and_failures_leave_no_partial_files(self, tmp_path):
+        store = KYCDocumentStore(str(tmp_path), 1024)
+
+        def render(source, target, max_side, quality):
+            with open(target, 'wb') as f:
+                f.write(b'half')
+            raise OSError("decoder error")
+
+        pipeline = DerivativePipeline(store, workers=1, render=render)
+        pdf = stored(store, b'%PDF-1.7', 'pdf')
+        png = stored(store, b'\x89PNG\r\n\x1a\nbody', 'png')
+
+        futures = pipeline.submit([pdf, png])
+        assert len(futures) == 1
+        futures[0].result()
+
+        leftovers = [f for _, _, files in os.walk(tmp_path) for f in files]
+        assert sorted(leftovers) == sorted([os.path.basename(pdf.path), os.path.basename(png.path)])
+        pipeline.shutdown(wait=True)
+
+    def test_concurrent_submissions_of_one_document_render_once(self, tmp_path):
+        store = KYCDocumentStore(str(tmp_path), 1024)
+        release = threading.Event()
+        calls = []
+
+        def render(source, target, max_side, quality):
+            release.wait(5)
+            calls.append(max_side)
+            with open(target, 'wb') as f:
+                f.write(b'x')
+
+        pipeline = DerivativePipeline(store, workers=2, render=render)
+        doc = stored(store, b'image-bytes', 'jpg')
+        futures = pipeline.submit([doc]) + pipeline.submit([doc])
+        release.set()
+        for future in futures:
+            future.result()
+
+        assert len(futures) == 1
+        assert len(calls) == len(VARIANTS)
+        pipeline.shutdown(wait=True)
+
+    def test_disabled_without_a_renderer(self, tmp_path, monkeypatch):
+        monkeypatch.setattr('app.utils.kyc_derivatives.Image', None)
+        pipeline = DerivativePipeline(KYCDocumentStore(str(tmp_path), 1024))
+        assert not pipeline.enabled
+        assert pipeline.submit([StoredDocument('x.jpg', 'ab' * 32, 1, 'jpg')]) == []
@@ -0,0 +1,149 @@
+"""
+Unit tests for the sliding-window debit limits engine
+"""
+from app.utils.limits import LimitsEngine, MemoryStore, SlidingWindow, SQLiteStore
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+RULES = {'Savings': {'daily_amount': 1000, 'per_minute': 3}}
+
+
+class TestSlidingWindow:
+    """Bucketed window arithmetic"""
+
+    def test_values_expire_after_the_span(self):
+        window = SlidingWindow(60, 12)
+        window.add(1000.0, 5)
+        window.add(1030.0, 2)
+
+        assert window.current(1059.0) == 7
+        assert window.current(1061.0) == 2
+        assert window.current(1095.0) == 0
+
+    def test_long_idle_gap_resets(self):
+        window = SlidingWindow(60, 12)
+        window.add(1000.0, 5)
+
+        assert window.current(10_000.0) == 0
+
+    def test_backdated_values_outside_the_window_are_ignored(self):
+        window = SlidingWindow(60, 12)
+        window.add(1000.0, 1, at=930.0)
+        window.add(1000.0, 4, at=990.0)
+
+        assert window.current(1000.0) == 4
+
+    def test_state_round_trips(self):
+        window = SlidingWindow(60, 12)
+        window.add(1000.0, 3)
+
+        assert SlidingWindow(60, 12, window.state()).current(1010.0) == 3
+
+    def test_retry_after_covers_the_oldest_bucket(self):
+        window = SlidingWindow(60, 12)
+        window.add(1000.0, 1)
+        window.add(1020.0, 1)
+
+        wait = window.seconds_until_below(1030.0, 1)
+        assert 30 <= wait <= 31
+        assert window.current(1030.0 + wait) == 1
+
+
+class TestLimitsEngine:
+    """Per-account-type rules over a store"""
+
+    def test_per_minute_count(self):
+        clock = FakeClock()
+        engine = LimitsEngine(RULES, MemoryStore(), clock)
+
+        for _ in range(3):
+            assert engine.reserve(1, 'savings', 10) is None
+        refusal = engine.reserve(1, 'savings', 10)
+
+        assert refusal.status == 429
+        assert int(refusal.headers()['Retry-After']) >= 1
+        assert engine.reserve(2, 'savings', 10) is None  # other accounts unaffected
+        clock.now += 61
+        assert engine.reserve(1, 'savings', 10) is None
+
+    def test_daily_amount(self):
+        clock = FakeClock()
+        engine = LimitsEngine(RULES, MemoryStore(), clock)
+
+        assert engine.reserve(1, 'savings', 60000) is None
+        refusal = engine.reserve(1, 'savings', 40001)
+
+        assert refusal.status == 403
+        assert '1,000.00' in refusal.msg
+        assert engine.reserve(1, 'savings', 40000) is None
+        clock.now += 86400
+        assert engine.reserve(1, 'savings', 100000) is None
+
+    def test_requests_that_can_never_fit_are_not_retryable(self):
+        engine = LimitsEngine(RULES, MemoryStore(), FakeClock())
+
+        too_many = engine.reserve(1, 'savings', 10, count=4)
+        too_much = engine.reserve(1, 'savings', 100001)
+
+        assert (too_many.status, too_many.headers()) == (403, {})
+        assert (too_much.status, too_much.headers()) == (403, {})
+        assert engine.reserve(1, 'savings', 100000, count=3) is None  # nothing was counted
+
+    def test_release_returns_headroom(self):
+        engine = LimitsEngine(RULES, MemoryStore(), FakeClock())
+        engine.reserve(1, 'savings', 100000)
+
+        engine.release(1, 'savings', 100000)
+
+        assert engine.reserve(1, 'savings', 100000) is None
+
+    def test_account_types_without_rules_are_unlimited(self):
+        engine = LimitsEngine(RULES, MemoryStore(), FakeClock())
+
+        assert all(engine.reserve(1, 'current', 10 ** 9) is None for _ in range(10))
+
+    def test_rebuild_replays_recent_debits(self):
+        clock = FakeClock()
+        engine = LimitsEngine(RULES, MemoryStore(), clock)
+
+        engine.rebuild(lambda: [(1, clock.now - 3600, 90000), (1, clock.now - 90000, 90000)])
+
+        assert engine.reserve(1, 'savings', 10001).status == 403
+        assert engine.reserve(1, 'savings', 10000) is None
+
+    def test_sqlite_store_is_shared_between_engines(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / 'limits.db')
+        worker_a = LimitsEngine(RULES, SQLiteStore(path), clock)
+        worker_b = LimitsEngine(RULES, SQLiteStore(path), clock)
+
+        assert worker_a.reserve(1, 'savings', 10) is None
+        assert worker_b.reserve(1, 'savings', 10) is None
+        assert worker_a.reserve(1, 'savings', 10) is None
+        assert worker_b.reserve(1, 'savings', 10).status == 429
+
+    def test_sqlite_store_is_rebuilt_once(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / 'limits.db')
+        engine = LimitsEngine(RULES, SQLiteStore(path), clock)
+
+        assert engine.rebuild(lambda: [(1, clock.now, 100000)]) is True
+        assert LimitsEngine(RULES, SQLiteStore(path), clock).rebuild(lambda: []) is False
+        assert engine.reserve(1, 'savings', 1).status == 403
+
+    def test_sqlite_store_built_for_another_database_is_rebuilt(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / 'limits.db')
+        LimitsEngine(RULES, SQLiteStore(path), clock).rebuild(lambda: [(1, clock.now, 100000)], source='sqlite:///old.db')
+
+        engine = LimitsEngine(RULES, SQLiteStore(path), clock)
+
+        assert engine.rebuild(lambda: [], source='sqlite:///new.db') is True
+        assert engine.reserve(1, 'savings', 100000) is None
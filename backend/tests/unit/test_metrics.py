@@ -0,0 +1,73 @@
+"""
+Unit tests for the request metrics registry and Prometheus rendering
+"""
+from app.utils import metrics
+from app.utils.metrics import MetricsRegistry
+
+
+def _line(text, prefix):
+    return next(line for line in text.splitlines() if line.startswith(prefix))
+
+
+class TestMetricsRegistry:
+    """Aggregation and exposition"""
+
+    def test_samples_fold_into_endpoint_totals(self):
+        registry = MetricsRegistry()
+        registry.record('GET', '/profile', 200, 0.004, statements=1, request_bytes=0, response_bytes=300)
+        registry.record('GET', '/profile', 304, 0.02, statements=1)
+        registry.record('POST', '/deposit', 200, 0.3, statements=4, statement_seconds=0.01, request_bytes=20)
+
+        stats = registry.collect()
+
+        profile = stats[('GET', '/profile')]
+        assert profile.requests == 2
+        assert profile.statuses == {'200': 1, '304': 1}
+        assert profile.statements == 2
+        assert profile.response_bytes == 300
+        assert stats[('POST', '/deposit')].request_bytes == 20
+
+    def test_inline_fold_once_backlog_is_full(self):
+        registry = MetricsRegistry()
+        for _ in range(metrics.FOLD_AT):
+            registry.record('GET', '/profile', 200, 0.001)
+
+        assert len(registry._pending) == 0
+        assert registry._endpoints[('GET', '/profile')].requests == metrics.FOLD_AT
+
+    def test_histograms_are_cumulative(self):
+        registry = MetricsRegistry()
+        registry.record('GET', '/profile', 200, 0.004, statements=1)
+        registry.record('GET', '/profile', 200, 0.2, statements=12)
+        registry.record('GET', '/profile', 200, 30.0, statements=1)
+
+        text = registry.render()
+
+        labels = 'method="GET",endpoint="/profile"'
+        assert _line(text, f'avs_http_request_duration_seconds_bucket{{{labels},le="0.005"}}').endswith(' 1')
+        assert _line(text, f'avs_http_request_duration_seconds_bucket{{{labels},le="0.25"}}').endswith(' 2')
+        assert _line(text, f'avs_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}').endswith(' 3')
+        assert _line(text, f'avs_http_request_duration_seconds_count{{{labels}}}').endswith(' 3')
+        assert _line(text, f'avs_db_statements_per_request_bucket{{{labels},le="1"}}').endswith(' 2')
+        assert _line(text, f'avs_db_statements_per_request_sum{{{labels}}}').endswith(' 14')
+        assert '# TYPE avs_http_requests_total counter' in text
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.record('GET', 'a"b\\c', 200, 0.001)
+
+        assert 'endpoint="a\\"b\\\\c"' in registry.render()
+
+    def test_workers_sum_through_snapshot_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(metrics.os, 'getpid', lambda: 1)
+        other = MetricsRegistry(str(tmp_path))
+        other.record('GET', '/profile', 200, 0.01)
+        other.collect()  # writes metrics-1.json
+
+        monkeypatch.setattr(metrics.os, 'getpid', lambda: 2)
+        registry = MetricsRegistry(str(tmp_path))
+        registry.record('GET', '/profile', 500, 0.01)
+
+        profile = registry.collect()[('GET', '/profile')]
+        assert profile.requests == 2
+        assert profile.statuses == {'200': 1, '500': 1}
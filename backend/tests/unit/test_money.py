@@ -0,0 +1,40 @@
+"""
+Unit tests for the paise conversion helpers
+"""
+import pytest
+
+from app.utils.money import from_paise, parse_amount, to_paise
+
+
+class TestMoney:
+    """Rupee <-> paise conversion"""
+
+    @pytest.mark.parametrize('rupees, paise', [
+        (0, 0),
+        (1, 100),
+        (0.1, 10),
+        (0.1 + 0.2, 30),
+        (20.05, 2005),
+        (1234567.89, 123456789),
+        ('99.995', 10000),
+    ])
+    def test_to_paise(self, rupees, paise):
+        assert to_paise(rupees) == paise
+
+    def test_from_paise_round_trips(self):
+        assert from_paise(2005) == 20.05
+        assert from_paise(0) == 0.0
+        assert from_paise(None) is None
+
+    @pytest.mark.parametrize('value', [None, 0, -5, 0.004, 0.005, 10.555, True, '10', float('nan'), float('inf')])
+    def test_parse_amount_rejects(self, value):
+        assert parse_amount(value) is None
+
+    def test_parse_amount_accepts(self):
+        assert parse_amount(10) == 1000
+        assert parse_amount(0.01) == 1
+        assert parse_amount(10.55) == 1055
+
+    def test_sums_are_exact(self):
+        total = sum(to_paise(0.1) for _ in range(1000))
+        assert from_paise(total) == 100.0
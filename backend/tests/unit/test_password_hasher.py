@@ -0,0 +1,58 @@
+"""
+Unit tests for the bounded password hashing pool
+"""
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app.utils.hashing import HasherBusy, PasswordHasher
+
+
+class TestPasswordHasher:
+    """Hashing, verification and backpressure"""
+
+    @pytest.mark.parametrize('executor', ['thread', 'process'])
+    def test_hash_and_verify(self, executor):
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=2, executor=executor)
+        try:
+            password_hash = hasher.hash('Secret123')
+            assert password_hash.startswith('pbkdf2:sha256:1000$')
+            assert hasher.verify(password_hash, 'Secret123')
+            assert not hasher.verify(password_hash, 'wrong')
+        finally:
+            hasher.shutdown()
+
+    def test_needs_rehash_when_parameters_change(self):
+        hasher = PasswordHasher(method='pbkdf2:sha256:2000')
+        assert hasher.needs_rehash(generate_password_hash('x', method='pbkdf2:sha256:1000'))
+        assert hasher.needs_rehash(generate_password_hash('x', method='scrypt'))
+        assert not hasher.needs_rehash(generate_password_hash('x', method='pbkdf2:sha256:2000'))
+
+    def test_default_method_is_normalized(self):
+        hasher = PasswordHasher(method='scrypt')
+        assert hasher.normalized_method == 'scrypt:32768:8:1'
+        assert not hasher.needs_rehash(generate_password_hash('x', method='scrypt'))
+
+    def test_rejects_when_saturated(self):
+        hasher = PasswordHasher(workers=1, max_pending=1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocker():
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        result = {}
+        worker = threading.Thread(target=lambda: result.update(value=hasher._run(blocker)))
+        worker.start()
+        started.wait(5)
+        try:
+            with pytest.raises(HasherBusy):
+                hasher.hash('Secret123')
+        finally:
+            release.set()
+            worker.join()
+            hasher.shutdown()
+        assert result['value'] == 'done'
@@ -0,0 +1,47 @@
+"""
+Unit tests for query budgets and the N+1 detector
+"""
+from functools import wraps
+
+from app.utils.query_budget import budget_of, normalize, query_budget, repeated_statements
+
+
+def passthrough(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+class TestQueryBudget:
+    """Declaring budgets and spotting repeated statements"""
+
+    def test_budget_survives_stacked_decorators(self):
+        @passthrough
+        @query_budget(3)
+        def view():
+            pass
+
+        assert budget_of(view) == 3
+        assert budget_of(passthrough(lambda: None)) is None
+
+    def test_in_lists_and_whitespace_normalize_away(self):
+        assert normalize("SELECT id FROM user\n  WHERE id IN (?, ?, ?)") == "SELECT id FROM user WHERE id IN (...)"
+        assert normalize("SELECT id FROM user WHERE id IN (%(id_1)s)") == "SELECT id FROM user WHERE id IN (...)"
+
+    def test_select_per_row_is_reported(self):
+        statements = [("SELECT * FROM user WHERE user.id = ?", (n,)) for n in range(4)]
+
+        assert repeated_statements(statements) == [("SELECT * FROM user WHERE user.id = ?", 4)]
+
+    def test_same_parameters_and_writes_are_not_reported(self):
+        statements = [("SELECT * FROM user WHERE user.id = ?", (1,))] * 4
+        statements += [("UPDATE dashboard_counter SET value = value + ? WHERE name = ?", (1, name))
+                       for name in ('a', 'b', 'c', 'd')]
+
+        assert repeated_statements(statements) == []
+
+    def test_below_threshold_is_not_reported(self):
+        statements = [("SELECT * FROM user WHERE user.id = ?", (n,)) for n in range(2)]
+
+        assert repeated_statements(statements) == []
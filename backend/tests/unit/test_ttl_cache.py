@@ -0,0 +1,44 @@
+"""
+Unit tests for the in-process TTL/LRU cache
+"""
+from app.utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Expiry and eviction"""
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+        cache.set('a', 1)
+
+        clock.now = 4.9
+        assert cache.get('a') == 1
+        clock.now = 5.0
+        assert cache.get('a') is None
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert len(cache) == 2
+
+    def test_cached_none_is_distinguishable(self):
+        cache = TTLCache()
+        cache.set('gone', None)
+        assert 'gone' in cache
+        assert cache.pop('gone', 'default') is None
+        assert cache.pop('gone', 'default') == 'default'
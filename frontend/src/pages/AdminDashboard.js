@@ -93,6 +93,16 @@ function AdminDashboard() {
     }
   };
 
+  const openKycDocument = async (url) => {
+    try {
+      const resp = await adminAPI.getKycDocument(url);
+      window.open(URL.createObjectURL(resp.data), '_blank', 'noreferrer');
+    } catch (error) {
+      console.error('KYC document error:', error);
+      setKycMessage('Failed to load KYC document');
+    }
+  };
+
   const handleApproveUpdate = async (updateId) => {
     try {
       const resp = await adminAPI.processUpdateRequest(updateId, 'approve');
@@ -193,9 +203,9 @@ function AdminDashboard() {
                       <td>{user.phone || 'N/A'}</td>
                       <td>
                         <div style={{ display: 'flex', gap: '8px', flexDirection: 'column' }}>
-                          <a href={req.pancard_image} target="_blank" rel="noreferrer">View PAN</a>
-                          <a href={req.photo_image} target="_blank" rel="noreferrer">View Photo</a>
-                          <a href={req.signature_image} target="_blank" rel="noreferrer">View Signature</a>
+                          <button type="button" onClick={() => openKycDocument(req.pancard_preview)}>View PAN</button>
+                          <button type="button" onClick={() => openKycDocument(req.photo_preview)}>View Photo</button>
+                          <button type="button" onClick={() => openKycDocument(req.signature_preview)}>View Signature</button>
                         </div>
                       </td>
                       <td>{req.timestamp}</td>
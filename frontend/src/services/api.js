@@ -28,6 +28,18 @@ api.interceptors.request.use(
   }
 );
 
+// Follow X-Next-Cursor until the last page of a paginated list endpoint
+const fetchAllPages = async (url, params = {}) => {
+  const items = [];
+  let cursor;
+  do {
+    const response = await api.get(url, { params: { ...params, cursor } });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return { data: items };
+};
+
 // User APIs
 export const userAPI = {
   // Register a new user
@@ -57,6 +69,9 @@ export const userAPI = {
     });
   },
   
+  // Transaction history (newest first); pass { cursor } from X-Next-Cursor for older pages
+  getTransactions: (params = {}) => api.get('/transactions', { params }),
+
   // Request profile update
   requestUpdate: (updateData) => api.post('/request-update', updateData),
 };
@@ -67,7 +82,7 @@ export const adminAPI = {
   login: (credentials) => api.post('/admin/login', credentials),
   
   // Get all users
-  listUsers: () => api.get('/admin/users'),
+  listUsers: () => fetchAllPages('/admin/users', { limit: 500 }),
   
   // Update user
   updateUser: (userId, userData) => api.put(`/admin/users/${userId}`, userData),
@@ -78,17 +93,26 @@ export const adminAPI = {
   // Get dashboard data
   getDashboard: () => api.get('/admin/dashboard'),
   
-  // List pending KYC requests
-  listKycRequests: () => api.get('/admin/kyc-requests'),
+  // List pending KYC requests (every page of the queue)
+  listKycRequests: () => fetchAllPages('/admin/kyc-requests', { limit: 100 }),
 
   // Process a KYC request (approve/reject)
   processKycRequest: (requestId, action) => api.post(`/admin/kyc-requests/${requestId}`, { action }),
+
+  // Approve/reject many KYC requests at once; returns per-id results
+  processKycRequests: (ids, action) => api.post('/admin/kyc-requests/bulk', { ids, action }),
+
+  // Fetch a KYC document (URL from listKycRequests) with the auth header
+  getKycDocument: (url) => api.get(url, { responseType: 'blob' }),
   
-  // List pending profile update requests
-  listUpdateRequests: () => api.get('/admin/update-requests'),
+  // List pending profile update requests (every page of the queue)
+  listUpdateRequests: () => fetchAllPages('/admin/update-requests', { limit: 100 }),
   
   // Process a profile update request (approve/reject)
   processUpdateRequest: (requestId, action) => api.post(`/admin/update-requests/${requestId}`, { action }),
+
+  // Approve/reject many profile update requests at once; returns per-id results
+  processUpdateRequests: (ids, action) => api.post('/admin/update-requests/bulk', { ids, action }),
   
   // Create a new user
   createUser: (userData) => api.post('/admin/create-user', userData),